@@ -1,14 +1,29 @@
 """# Admin IHM"""
 
 
-from datetime import date
+from datetime import date, datetime, time
 
 from django.contrib.admin import SimpleListFilter, StackedInline
 from django.contrib.admin.decorators import register
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.exceptions import ValidationError
+from django.db.models import Count, DateTimeField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.forms import ModelForm
+from django.utils.text import slugify
+from django.utils.timezone import make_aware
 from django.utils.translation import ugettext_lazy as _
 from polymorphic.admin import PolymorphicChildModelAdmin, PolymorphicParentModelAdmin
 
-from action.models import Action, Event, RecurrentAction, Note, Step, Log
+from action.models import Action, ActionClosure, Event, RecurrentAction, Note, Step, Log
+from action.pagination import CURSOR_VAR, KeysetChangeList, KeysetPaginator
+from action.search import get_backend
+from action.sqlite import retry_on_lock
+from todolist.autocomplete import PrefixAutocompleteJsonView
+
+
+TODO_STATUSES = Action.OPEN_STATUSES
+DROPPED_STATUSES = tuple(status for status, _ in Action.STATUSES if status not in Action.WORKFLOW_STATUSES)
 
 
 def month_list_filter_factory(field_name, title, parameter_name, duration_unit):
@@ -22,31 +37,28 @@ def month_list_filter_factory(field_name, title, parameter_name, duration_unit):
         """
 
         def lookups(self, request, model_admin):
-            """Generator that get used months and format it"""
-            for month in model_admin.get_queryset(request).dates(field_name, duration_unit, order="DESC"):
+            """Generator that get used months (cached, see ActionQuerySet.used_dates) and format it"""
+            for month in model_admin.model.objects.used_dates(field_name, duration_unit):
                 yield (month.strftime("%m-%Y"), month.strftime("%B %Y"))
 
         def queryset(self, request, queryset):
-            """Query set to get actually used months"""
+            """Half-open range on the filtered field, so that its index can be used"""
             value = self.value()
-            if value is None:
+            if value is None or duration_unit != "month":
                 return queryset
 
             try:
                 start_month, start_year = map(int, value.split("-"))
+                start = date(start_year, start_month, 1)
             except ValueError:
                 return queryset
 
-            if duration_unit == "month":
-                if start_month == 12:
-                    end_month, end_year = 1, start_year + 1
-                else:
-                    end_month, end_year = start_month + 1, start_year
+            end = date(start_year + start_month // 12, start_month % 12 + 1, 1)
+            field = queryset.model._meta.get_field(field_name)  # pylint: disable=protected-access
+            if isinstance(field, DateTimeField):
+                start, end = (make_aware(datetime.combine(day, time.min)) for day in (start, end))
 
-                return queryset.filter(date__gte=date(start_year, start_month, 1),
-                                       date__lt=date(end_year, end_month, 1))
-
-            return queryset
+            return queryset.filter(**{field_name + "__gte": start, field_name + "__lt": end})
 
     # Human-readable title which will be displayed in the right admin sidebar just above the filter options.
     MonthListFilter.title = title
@@ -57,6 +69,28 @@ def month_list_filter_factory(field_name, title, parameter_name, duration_unit):
     return MonthListFilter
 
 
+def dependency_counter(field_name, **filters):
+    """Number of dependency edges of an action, from the side of field_name"""
+    edges = Action.dependency_set.through.objects.filter(**{field_name: OuterRef("pk")}, **filters)
+    return Coalesce(
+        Subquery(edges.order_by().values(field_name).annotate(count=Count("pk")).values("count")[:1]),
+        Value(0),
+        output_field=IntegerField(),
+    )
+
+
+class ActionForm(ModelForm):
+    """Action form rejecting dependency cycles before saving"""
+
+    def clean_dependency_set(self):
+        """An action cannot depend on an action it blocks"""
+        dependencies = self.cleaned_data["dependency_set"]
+        if self.instance.pk and ActionClosure.objects.creates_cycle(
+                (dependency.pk, self.instance.pk) for dependency in dependencies):
+            raise ValidationError(_("An action cannot depend on itself, even indirectly."), code="cycle")
+        return dependencies
+
+
 class NoteInline(StackedInline):
     """Note inline configuration class"""
 
@@ -79,6 +113,7 @@ class StepInline(StackedInline):
             )
         }),
     )
+    readonly_fields = ("number",)
     min_num = 0
     extra = 0
 
@@ -95,10 +130,28 @@ class LogInline(StackedInline):
             )
         }),
     )
+    readonly_fields = ("number",)
     min_num = 0
     extra = 1
 
 
+class ActionChangeList(KeysetChangeList):
+    """
+    ## Action changelist
+
+    The sum (cl.sum) of the estimates and durations of the listed actions, with a single aggregate query.
+    """
+
+    sum = None
+
+    def get_results(self, request):
+        """Results, with the total estimate and duration of every filtered action"""
+        super().get_results(request)
+        totals = self.queryset.time_totals()
+        labels = {name: Action.minutes_label(totals[name + "_total"]) for name in ("estimate", "duration")}
+        self.sum = _("estimate %(estimate)s, duration %(duration)s") % labels
+
+
 class ActionMixin:
     """Mixing to avoid repeating property twice"""
 
@@ -110,16 +163,32 @@ class ActionMixin:
 
     @staticmethod
     def dependency_status(obj):
-        """Shortcut to the category of the source, for list view"""
+        """Dependency counters annotated by get_queryset, for list view"""
         return "{todo}/{dropped}{total}//{subordinate}".format(
-            todo=obj.dependency_set.filter(status__in=["E", "F"]).count(),
-            dropped=obj.dependency_set.filter(status__in=["V", "W", "X", "Y", "Z"]).count(),
-            total=obj.dependency_set.all().count(),
-            subordinate=obj.subordinate_set.all().count(),
+            todo=obj.dependency_todo_count,
+            dropped=obj.dependency_dropped_count,
+            total=obj.dependency_count,
+            subordinate=obj.subordinate_count,
         )
     dependency_status.short_description = _("dependency status")  # "todo/dropped/total/subordinate"
 
+    def get_queryset(self, request):
+        """
+        Fetch everything the list columns need with the page query itself.
+
+        Dependency counters are correlated subqueries instead of four COUNT queries per row
+        (and instead of a GROUP BY of the whole table, so that only the rows of the page are counted),
+        project and category are joined instead of being fetched per row.
+        """
+        return super().get_queryset(request).select_related("project__category").annotate(
+            dependency_todo_count=dependency_counter("from_action", to_action__status__in=TODO_STATUSES),
+            dependency_dropped_count=dependency_counter("from_action", to_action__status__in=DROPPED_STATUSES),
+            dependency_count=dependency_counter("from_action"),
+            subordinate_count=dependency_counter("to_action"),
+        )
+
     base_model = Action
+    form = ActionForm
     inlines = [NoteInline, StepInline, LogInline]
     search_fields = ("project__category__name", "project__name", "label", "deadline", "planned_on")
     autocomplete_fields = ("project", "dependency_set")
@@ -145,6 +214,66 @@ class ActionMixin:
         "status",
     )
 
+    show_full_result_count = False  # No COUNT(*) of the whole table on every page
+    change_list_template = "admin/transaction/change_list.html"  # Shows the total (cl.sum)
+
+    def get_changelist(self, request, **kwargs):
+        """Changelist paginated by cursor, with the total estimate and duration"""
+        return ActionChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        """Seek to the cursor of the query string, count approximately beyond a threshold"""
+        return KeysetPaginator(
+            queryset, per_page, cursor=request.GET.get(CURSOR_VAR), orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index (when the database has one), best matches first unless a column is sorted"""
+        backend = get_backend(queryset.db)
+        if not search_term or backend is None:
+            return super().get_search_results(request, queryset, search_term)
+
+        queryset = backend.search(queryset, search_term)
+        if ORDER_VAR in request.GET:
+            return queryset, False
+        return queryset.order_by("search_rank", "-id"), False
+
+    def autocomplete_view(self, request):
+        """Cached prefix autocomplete of the dependency pickers, see todolist.autocomplete"""
+        return PrefixAutocompleteJsonView.as_view(model_admin=self)(request)
+
+    def autocomplete_rows(self, term, offset, limit):
+        """(id, name) of the actions of the admin model with title words starting like the term, newest first"""
+        actions = self.model.objects.non_polymorphic()
+        if not term:
+            return actions.order_by("-pk").values_list("pk", "name")[offset:offset + limit]
+        backend = get_backend(actions.db)
+        if backend is None:  # Slug prefix, on its unique index
+            actions = actions.filter(slug__startswith=slugify(term)).order_by("slug")
+            return actions.values_list("pk", "name")[offset:offset + limit]
+        ids = backend.title_search(self.model, term, offset, limit)
+        names = dict(actions.filter(pk__in=ids).values_list("pk", "name"))
+        return [(pk, names[pk]) for pk in ids if pk in names]
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        """Start the whole form processing over when SQLite reports a lock"""
+        return retry_on_lock(super().changeform_view)(request, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        """Start the whole deletion over when SQLite reports a lock"""
+        return retry_on_lock(super().delete_view)(request, object_id, extra_context)
+
+    def save_formset(self, request, form, formset, change):
+        """Number all the new inline rows from a single reserved block"""
+        instances = formset.save(commit=False)
+        for obj in formset.deleted_objects:
+            obj.delete()
+        Action.objects.assign_numbers(formset.new_objects)
+        for instance in instances:
+            instance.save()
+        formset.save_m2m()
+
     def has_module_permission(self, request):  # pylint: disable=no-self-use,unused-argument
         """Can be accessed from home page"""
         return True
@@ -269,3 +398,8 @@ class ContactParentAdmin(ActionMixin, PolymorphicParentModelAdmin):
         }),
     )
     child_models = (Action, Event, RecurrentAction)
+    polymorphic_list = False
+
+    def get_queryset(self, request):
+        """Shallow rows for the changelist, the change form upcasts through the child admin"""
+        return super().get_queryset(request).shallow()
@@ -0,0 +1,83 @@
+"""
+# Audit log
+
+Changes of the tracked fields of an action (Action.TRACKED_FIELDS) and of its dependencies are written to its
+log book. The stored values are remembered when the action is loaded (Action.from_db, no extra query), the
+signals compare them with the saved ones.
+
+Log rows are not written one by one: they are buffered per database connection until the transaction commits,
+then numbered and inserted with a single bulk_create, so that an admin save with many inlines costs one insert.
+Logs of a rolled back transaction or savepoint are never written: each log registers its own commit callback
+(transaction.on_commit), that the connection drops with the savepoint, and the buffer only keeps weak references
+to them. When the transaction commits, the first callback inserts the logs whose callback is still alive.
+"""
+
+from weakref import ref
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.transaction import atomic, on_commit
+from django.utils.timezone import now
+
+from action import search
+from action.models import Action, Log
+from todolist import changes
+
+
+class LogCommit:
+    """
+    ## Commit callback of a log
+
+    Alive while the connection keeps it, until the commit or the rollback of its savepoint.
+    """
+
+    __slots__ = ("buffer", "__weakref__")
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __call__(self):
+        """Insert the committed logs, the callbacks of the other ones were dropped"""
+        self.buffer.flush()
+
+
+class LogBuffer:
+    """
+    ## Logs waiting for a commit
+
+    Logs are kept with a weak reference to their commit callback, the ones whose callback is gone were rolled back.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.logs = []
+
+    def add(self, log):
+        """Buffer a log until the commit, return its commit callback"""
+        if self.logs and self.logs[0][0]() is None:  # Forget the logs of rolled back transactions
+            self.logs = [(callback, pending) for callback, pending in self.logs if callback() is not None]
+        callback = LogCommit(self)
+        self.logs.append((ref(callback), log))
+        return callback
+
+    def flush(self):
+        """Number and insert the committed logs"""
+        logs = [log for callback, log in self.logs if callback() is not None]
+        self.logs = []
+        if not logs:
+            return
+        with atomic(using=self.using):
+            Action.objects.db_manager(self.using).assign_numbers(logs)
+            Log.objects.db_manager(self.using).bulk_create(logs)
+        backend = search.get_backend(self.using)
+        if backend is not None:
+            backend.index_notes({log.action_id for log in logs})
+        changes.touch(Log)
+
+
+def record(action_id, content, using=DEFAULT_DB_ALIAS):
+    """Log a change of an action when the current transaction commits (right away outside of a transaction)"""
+    connection = connections[using]
+    buffer = getattr(connection, "audit_log_buffer", None)
+    if buffer is None:
+        buffer = connection.audit_log_buffer = LogBuffer(using)
+    on_commit(buffer.add(Log(action_id=action_id, date=now(), content=content)), using=using)
@@ -0,0 +1,336 @@
+"""
+# Admin benchmark
+
+Synthetic data is seeded with the factories (actions of every type with notes, steps, logs and dependency
+chains, spread over projects and categories), then the hot paths of every admin are requested through the
+test client: changelist, search, autocomplete, change form and save (when the admin allows changes).
+
+Each path is requested once to warm caches up, once to count queries, once under tracemalloc to get the peak
+memory, then `repeat` times to get the p50 / p95 latency. Results are plain dicts, ready to be dumped as JSON
+and compared across commits.
+"""
+
+import tracemalloc
+from html.parser import HTMLParser
+from itertools import islice
+from contextlib import contextmanager
+from math import ceil
+from threading import Thread
+from time import perf_counter
+
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, reset_queries
+from django.db.transaction import atomic
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from action.factories import (
+    ActionRowFactory,
+    EventRowFactory,
+    RecurrentActionRowFactory,
+    NoteFactory,
+    StepFactory,
+    LogFactory,
+)
+from action.importer import import_actions
+from action.models import Action, Event, RecurrentAction, Note, Step, Log
+from action.search import get_backend
+from action.sqlite import retry_on_lock
+from category.factories import CategoryFactory
+from category.models import Category
+from project.factories import ProjectFactory
+from project.models import Project
+
+
+BENCHMARKED_MODELS = (Action, Event, RecurrentAction, Project, Category)
+
+ROW_FACTORIES = (ActionRowFactory, EventRowFactory, RecurrentActionRowFactory)
+
+SUFFIXES = {"k": 1000, "m": 1000000}
+
+
+def parse_scale(value):
+    """Number of actions from a scale such as 500, 10k or 1m"""
+    value = value.strip().lower()
+    if value[-1:] in SUFFIXES:
+        return int(float(value[:-1]) * SUFFIXES[value[-1]])
+    return int(value)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non empty list of values"""
+    values = sorted(values)
+    return values[max(ceil(len(values) * percent / 100) - 1, 0)]
+
+
+#
+# Seeding
+#
+
+
+def action_rows(projects, count):
+    """Importer rows of count actions of every type, chained by dependencies in groups of 10"""
+    previous = None
+    for i in range(count):
+        row = ROW_FACTORIES[i % len(ROW_FACTORIES)](project=projects[i % len(projects)].name)
+        if i % 10 and previous is not None:
+            row["dependencies"] = [previous]
+        previous = row["slug"]
+        yield row
+
+
+def seed(count, notes=2, steps=1, logs=1, chunk_size=1000):
+    """
+    Create count actions with their notes, steps and logs (besides the creation log),
+    100 actions per project and 10 projects per category.
+    """
+    categories = CategoryFactory.create_batch(max(count // 1000, 1))
+    projects = [
+        ProjectFactory(category=categories[i % len(categories)]) for i in range(max(count // 100, 1))
+    ]
+    import_actions(action_rows(projects, count), chunk_size=chunk_size)
+
+    ids = iter(
+        Action.objects.non_polymorphic().filter(project__in=projects).order_by("pk").values_list("pk", flat=True)
+    )
+    while True:
+        chunk = list(islice(ids, chunk_size))
+        if not chunk:
+            break
+        for factory, model, number_count, first in (
+                (NoteFactory, Note, notes, 1), (StepFactory, Step, steps, 1), (LogFactory, Log, logs, 2)):
+            model.objects.bulk_create([
+                factory.build(action_id=pk, number=number)
+                for pk in chunk
+                for number in range(first, first + number_count)
+            ])
+        Action.objects.filter(pk__in=chunk).update(note_counter=notes, step_counter=steps, log_counter=logs + 1)
+
+    backend = get_backend()
+    if backend is not None:
+        backend.rebuild()
+
+
+#
+# Measures
+#
+
+
+class FormParser(HTMLParser):  # pylint: disable=abstract-method
+    """Data a browser would post from the forms of a page"""
+
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+        self.select = None
+        self.textarea = None
+        self.text = []
+
+    def add(self, name, value):
+        """Add a posted value"""
+        self.data.setdefault(name, []).append(value)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        kind = attrs.get("type", "text")
+        if tag == "input" and attrs.get("name") and kind not in ("submit", "button", "file", "image"):
+            if kind not in ("checkbox", "radio"):
+                self.add(attrs["name"], attrs.get("value", ""))
+            elif "checked" in attrs:
+                self.add(attrs["name"], attrs.get("value", "on"))
+        elif tag == "select":
+            self.select = {"name": attrs.get("name"), "multiple": "multiple" in attrs, "first": None, "found": False}
+        elif tag == "option" and self.select is not None:
+            if self.select["first"] is None:
+                self.select["first"] = attrs.get("value", "")
+            if "selected" in attrs:
+                self.select["found"] = True
+                self.add(self.select["name"], attrs.get("value", ""))
+        elif tag == "textarea":
+            self.textarea, self.text = attrs.get("name"), []
+
+    def handle_endtag(self, tag):
+        if tag == "select" and self.select is not None:
+            select, self.select = self.select, None
+            if not select["found"] and not select["multiple"] and select["first"] is not None:
+                self.add(select["name"], select["first"])
+        elif tag == "textarea" and self.textarea:
+            text = "".join(self.text)
+            self.add(self.textarea, text[1:] if text.startswith("\n") else text)
+            self.textarea = None
+
+    def handle_data(self, data):
+        if self.textarea:
+            self.text.append(data)
+
+
+def form_data(html):
+    """Data posted by the forms of a page"""
+    parser = FormParser()
+    parser.feed(html)
+    return parser.data
+
+
+class AdminBenchmark:
+    """
+    ## Hot paths of the admins
+
+    Requests are made by a superuser (created if needed) through the test client, without the debug toolbar.
+    """
+
+    def __init__(self, repeat=20, models=BENCHMARKED_MODELS):
+        self.repeat = repeat
+        self.models = models
+        self.client = Client()
+        user = User.objects.filter(username="benchmark").first() or User.objects.create_superuser(
+            "benchmark", "benchmark@example.com", "benchmark"
+        )
+        self.client.force_login(user)
+
+    def request(self, method, url, data):
+        """Issue a request, return its status code"""
+        return getattr(self.client, method)(url, data).status_code
+
+    def measure(self, method, url, data=None):
+        """Query count, status code, peak memory and latency percentiles of a request"""
+        self.request(method, url, data)
+
+        reset_queries()  # The query log is bounded, a full one would make the capture empty
+        with CaptureQueriesContext(connection) as context:
+            status = self.request(method, url, data)
+        queries = len(context.captured_queries)  # Read from the query log, which the next request resets
+
+        tracemalloc.start()
+        try:
+            self.request(method, url, data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        timings = []
+        for _ in range(self.repeat):
+            start = perf_counter()
+            self.request(method, url, data)
+            timings.append((perf_counter() - start) * 1000)
+
+        return {
+            "status": status,
+            "queries": queries,
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def search_term(model, instance):
+        """A word that some rows match"""
+        text = instance.description if isinstance(instance, Action) else instance.name
+        return text.split()[0].strip(".,")
+
+    def paths(self, model):
+        """(name, method, url, data) of the hot paths of the admin of a model"""
+        opts = model._meta  # pylint: disable=protected-access
+        prefix = "admin:{}_{}_".format(opts.app_label, opts.model_name)
+        queryset = model.objects.non_polymorphic() if issubclass(model, Action) else model.objects.all()
+        instance = queryset.order_by("pk")[queryset.count() // 2]
+        changelist = reverse(prefix + "changelist")
+        change = reverse(prefix + "change", args=[instance.pk])
+        term = self.search_term(model, instance)
+
+        yield "changelist", "get", changelist, None
+        yield "search", "get", changelist, {"q": term}
+        yield "autocomplete", "get", reverse(prefix + "autocomplete"), {"term": term[:3]}
+        yield "change_form", "get", change, None
+        if site._registry[model].has_change_permission(None, instance):  # pylint: disable=protected-access
+            yield "save", "post", change, form_data(self.client.get(change).content.decode())
+
+    def run(self):
+        """{admin: {path: measures}} for every benchmarked admin"""
+        results = {}
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["testserver"]):
+            for model in self.models:
+                opts = model._meta  # pylint: disable=protected-access
+                results["{}.{}".format(opts.app_label, opts.model_name)] = {
+                    name: self.measure(method, url, data) for name, method, url, data in self.paths(model)
+                }
+        return results
+
+
+#
+# Concurrent writes
+#
+
+
+@contextmanager
+def temporary_database(path, alias="benchmark"):
+    """
+    Migrated file database, a copy of the default database settings with another name, under its own alias.
+
+    The settings of the other aliases are left untouched, the alias is removed on exit.
+    """
+    connections.databases[alias] = dict(connections.databases[DEFAULT_DB_ALIAS], NAME=path)
+    try:
+        call_command("migrate", database=alias, interactive=False, verbosity=0)
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+        ContentType.objects.clear_cache()
+
+
+def concurrent_writes(threads=8, writes=50, retry=True, using=DEFAULT_DB_ALIAS):
+    """
+    Save actions (with a note, as the admin does) from concurrent threads, each with its own connection.
+
+    Return the number of successful and failed saves, the saves per second and the p50 / p95 latency.
+    """
+    category = Category.objects.db_manager(using).create(name="writers")
+    project = Project.objects.db_manager(using).create(category=category, name="writers")
+    actions = Action.objects.db_manager(using)
+    timings, failures = [], []
+
+    def save(label):
+        """One admin-like save: an action, its creation log and search document, and a note"""
+        with atomic(using=using):
+            action = actions.create(project=project, label=label, description="Concurrent write")
+            note = Note(action=action, content="Concurrent note")
+            actions.assign_numbers([note])
+            note.save(using=using)
+
+    if retry:
+        save = retry_on_lock(save, using=using)
+
+    def writer(index):
+        """Save actions in a loop"""
+        try:
+            for i in range(writes):
+                start = perf_counter()
+                try:
+                    save("w{}-{}".format(index, i))
+                except OperationalError:
+                    failures.append(index)
+                else:
+                    timings.append((perf_counter() - start) * 1000)
+        finally:
+            connections[using].close()
+
+    workers = [Thread(target=writer, args=(index,)) for index in range(threads)]
+    start = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = perf_counter() - start
+
+    return {
+        "saves": len(timings),
+        "failures": len(failures),
+        "saves_per_second": round(len(timings) / seconds, 1),
+        "p50_ms": round(percentile(timings, 50), 3) if timings else None,
+        "p95_ms": round(percentile(timings, 95), 3) if timings else None,
+    }
@@ -0,0 +1,135 @@
+"""
+# Dependency closure
+
+Maintenance of the materialized transitive closure of the action dependencies (ActionClosure rows),
+the paths being computed by action.graph.
+"""
+
+from collections import defaultdict
+
+from django.apps import apps
+from django.db.models import Manager
+
+from action.graph import ancestor_depths
+
+
+class ActionClosureManager(Manager):
+    """Maintenance of the materialized dependency closure"""
+
+    def ancestor_map(self, descendant_ids):
+        """Stored {descendant: {ancestor: depth}} of the given descendants"""
+        result = defaultdict(dict)
+        rows = self.filter(descendant__in=descendant_ids).values_list("ancestor", "descendant", "depth")
+        for ancestor, descendant, depth in rows:
+            result[descendant][ancestor] = depth
+        return result
+
+    def descendant_map(self, ancestor_ids):
+        """Stored {ancestor: {descendant: depth}} of the given ancestors"""
+        result = defaultdict(dict)
+        rows = self.filter(ancestor__in=ancestor_ids).values_list("ancestor", "descendant", "depth")
+        for ancestor, descendant, depth in rows:
+            result[ancestor][descendant] = depth
+        return result
+
+    def cycle_edge(self, edges):
+        """
+        First of those new (ancestor, descendant) dependency edges that would close a cycle, None if none would.
+
+        The stored paths between the ends of the edges are read in one query, then the edges are added in order.
+        """
+        edges = list(edges)
+        if not edges:
+            return None
+        nodes = {node for edge in edges for node in edge}
+        successors = defaultdict(set)
+        for ancestor, descendant in self.filter(ancestor__in=nodes, descendant__in=nodes).values_list(
+                "ancestor", "descendant"):
+            successors[ancestor].add(descendant)
+
+        for ancestor, descendant in edges:
+            reached, queue = {descendant}, [descendant]
+            while queue:
+                following = successors[queue.pop()] - reached
+                reached.update(following)
+                queue.extend(following)
+            if ancestor in reached:
+                return ancestor, descendant
+            successors[ancestor].add(descendant)
+        return None
+
+    def creates_cycle(self, edges):
+        """Tell whether adding those (ancestor, descendant) dependency edges would close a cycle"""
+        return self.cycle_edge(edges) is not None
+
+    def link(self, edges):
+        """Add the paths created by new (ancestor, descendant) dependency edges"""
+        edges = list(edges)
+        if not edges:
+            return
+        above = self.ancestor_map({ancestor for ancestor, _ in edges})
+        below = self.descendant_map({descendant for _, descendant in edges})
+
+        paths = {}
+        for ancestor, descendant in edges:
+            sources = dict(above[ancestor])
+            sources[ancestor] = 0
+            targets = dict(below[descendant])
+            targets[descendant] = 0
+            for source, source_depth in sources.items():
+                for target, target_depth in targets.items():
+                    depth = source_depth + 1 + target_depth
+                    if paths.get((source, target), depth + 1) > depth:
+                        paths[(source, target)] = depth
+
+        shortened = []
+        existing = self.filter(
+            ancestor__in={source for source, _ in paths},
+            descendant__in={target for _, target in paths},
+        )
+        for row in existing:
+            depth = paths.pop((row.ancestor_id, row.descendant_id), None)
+            if depth is not None and depth < row.depth:
+                row.depth = depth
+                shortened.append(row)
+        self.bulk_update(shortened, ["depth"])
+        self.bulk_create([
+            self.model(ancestor_id=source, descendant_id=target, depth=depth)
+            for (source, target), depth in paths.items()
+        ])
+
+    def refresh(self, action_ids):
+        """Recompute the paths of those actions and of everything they block, after their dependencies changed"""
+        action_ids = set(action_ids)
+        for depths in self.descendant_map(action_ids).values():
+            action_ids.update(depths)
+        self.rebuild(action_ids)
+
+    def rebuild(self, descendant_ids=None):
+        """Recompute the rows of the given descendants (the whole table when None) from the dependency edges"""
+        edges = apps.get_model("action", "Action").dependency_set.through.objects.using(self.db).all()
+        rows = self.all()
+        if descendant_ids is not None:
+            descendant_ids = set(descendant_ids)
+            edges = edges.filter(from_action__in=descendant_ids)
+            rows = rows.filter(descendant__in=descendant_ids)
+
+        dependencies = defaultdict(set)
+        for descendant, ancestor in edges.values_list("from_action", "to_action"):
+            dependencies[descendant].add(ancestor)
+
+        known = {}
+        if descendant_ids is None:
+            descendant_ids = set(dependencies)
+        else:
+            outside = set().union(*dependencies.values()) - descendant_ids
+            if outside:
+                known = self.ancestor_map(outside)
+
+        closure = ancestor_depths(descendant_ids, dependencies, known)
+        rows.delete()
+        self.bulk_create([
+            self.model(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+            for descendant, depths in closure.items()
+            for ancestor, depth in depths.items()
+        ])
@@ -0,0 +1,147 @@
+"""
+# Streaming export of actions
+
+Actions are walked by primary key chunks (keyset pagination), the related rows of each chunk being fetched
+with one query per relation. The number of queries only depends on the number of chunks and memory use
+only depends on the chunk size, whatever the size of the tables.
+Records use the format read by the importer, plus the notes, steps and logs of each action.
+They start with the categories and projects of the exported actions, with their slugs,
+so that an export can be imported back into an empty database.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, prefetch_related_objects
+
+from action.models import Action, Event, RecurrentAction
+from category.models import Category
+from project.models import Project
+
+
+SKIPPED_FIELDS = (
+    "polymorphic_ctype", "action_ptr", "project", "note_counter", "step_counter", "log_counter", "reminded_on",
+)
+
+INLINE_FIELDS = {
+    "notes": ("note_set", ("number", "content")),
+    "steps": ("step_set", ("number", "planned_on", "content")),
+    "logs": ("log_set", ("number", "date", "content")),
+}
+
+
+def exported_fields(model):
+    """Attribute names of the exported columns of a model"""
+    return [
+        field.attname for field in model._meta.concrete_fields  # pylint: disable=protected-access
+        if field.name not in SKIPPED_FIELDS
+    ]
+
+
+COLUMNS = ["type", "category", "project"] + exported_fields(Action)
+COLUMNS += [name for model in (Event, RecurrentAction) for name in exported_fields(model) if name not in COLUMNS]
+COLUMNS += ["dependencies"] + list(INLINE_FIELDS)
+
+
+def keyset_chunks(queryset, chunk_size):
+    """Yield lists of rows of a queryset, by primary key chunks"""
+    queryset = queryset.order_by("pk")
+    last = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]["pk"] if isinstance(chunk[-1], dict) else chunk[-1].pk
+
+
+def iter_chunks(queryset=None, chunk_size=1000):
+    """Yield lists of actions, with their related rows prefetched"""
+    for chunk in keyset_chunks(Action.objects.all() if queryset is None else queryset, chunk_size):
+        prefetch_related_objects(
+            chunk,
+            "project__category",
+            "note_set",
+            "step_set",
+            "log_set",
+            Prefetch("dependency_set", queryset=Action.objects.non_polymorphic().only("pk", "slug")),
+        )
+        yield chunk
+
+
+def iter_parent_records(queryset=None, chunk_size=1000):
+    """Yield the records of the categories, then of the projects, of the exported actions"""
+    projects = Project.objects.all()
+    if queryset is not None:
+        projects = projects.filter(pk__in=queryset.order_by().values("project"))
+    categories = Category.objects.filter(pk__in=projects.values("category"))
+    for chunk in keyset_chunks(categories.values("pk", "name", "slug"), chunk_size):
+        for row in chunk:
+            yield {"type": "category", "name": row["name"], "slug": row["slug"]}
+    for chunk in keyset_chunks(projects.values("pk", "category__name", "name", "slug"), chunk_size):
+        for row in chunk:
+            yield {"type": "project", "category": row["category__name"], "name": row["name"], "slug": row["slug"]}
+
+
+def to_record(action):
+    """Serializable representation of an action"""
+    record = {
+        "type": action._meta.model_name,  # pylint: disable=protected-access
+        "category": action.project.category.name,
+        "project": action.project.name,
+    }
+    for name in exported_fields(type(action)):
+        record[name] = getattr(action, name)
+    record["dependencies"] = [dependency.slug for dependency in action.dependency_set.all()]
+    for key, (related_name, fields) in INLINE_FIELDS.items():
+        record[key] = [
+            {field: getattr(row, field) for field in fields}
+            for row in getattr(action, related_name).all()
+        ]
+    return record
+
+
+def iter_records(queryset=None, chunk_size=1000):
+    """Yield the record of each category and project, then of each action"""
+    yield from iter_parent_records(queryset, chunk_size)
+    for chunk in iter_chunks(queryset, chunk_size):
+        for action in chunk:
+            yield to_record(action)
+
+
+class Echo:  # pylint: disable=too-few-public-methods
+    """File-like object that only gives back what is written, so that csv can be streamed"""
+
+    @staticmethod
+    def write(value):
+        """Give back the written value"""
+        return value
+
+
+def jsonl_lines(records):
+    """Render records as JSON lines"""
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def csv_lines(records):
+    """Render records as CSV lines, related lists being JSON encoded"""
+    writer = csv.DictWriter(Echo(), fieldnames=COLUMNS, extrasaction="ignore")
+    yield writer.writeheader()
+    for record in records:
+        if "dependencies" in record:
+            record["dependencies"] = " ".join(record["dependencies"])
+            for key in INLINE_FIELDS:
+                record[key] = json.dumps(record[key], cls=DjangoJSONEncoder, ensure_ascii=False)
+        yield writer.writerow(record)
+
+
+WRITERS = {"csv": csv_lines, "jsonl": jsonl_lines}
+
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+def export_actions(export_format="jsonl", queryset=None, chunk_size=1000):
+    """Yield the lines of an export of actions"""
+    return WRITERS[export_format](iter_records(queryset, chunk_size))
@@ -0,0 +1,84 @@
+"""
+# Factories
+
+Actions are built as importer rows (see action.importer), so that large data sets are inserted in bulk.
+Notes, steps and logs are built unsaved, to be inserted with bulk_create.
+"""
+
+from django.utils.text import slugify
+from django.utils.timezone import utc
+from factory import DictFactory, Faker, Iterator, LazyAttribute, Sequence
+from factory.django import DjangoModelFactory
+
+from action.models import Action, RecurrentAction, Note, Step, Log
+
+
+class ActionRowFactory(DictFactory):
+    """Importer row of an action, the project (name) must be given"""
+
+    type = "action"
+    project = None
+    label = Sequence("task-{}".format)
+    slug = LazyAttribute(lambda row: slugify("{}__{}".format(row.project, row.label)))
+    description = Faker("paragraph", nb_sentences=5)
+    priority = Iterator([priority for priority, _ in Action.PRIORITIES])
+    status = Iterator([status for status, _ in Action.STATUSES])
+    deadline = Faker("date_between", start_date="-1y", end_date="+1y")
+    planned_on = Faker("date_time_between", start_date="-1y", end_date="+1y", tzinfo=utc)
+    estimate = Faker("random_int", min=1, max=12)
+    estimate_unit = Iterator([unit for unit, _ in Action.TIME_DELTA_UNITS])
+    duration = Faker("random_int", min=1, max=12)
+    duration_unit = Iterator([unit for unit, _ in Action.TIME_DELTA_UNITS])
+
+
+class EventRowFactory(ActionRowFactory):
+    """Importer row of an event"""
+
+    type = "event"
+    location = Faker("city")
+    departure_time = Faker("time_object")
+    send_reminder = Faker("boolean", chance_of_getting_true=10)
+
+
+class RecurrentActionRowFactory(ActionRowFactory):
+    """Importer row of a recurrent action, with a bounded number of occurrences"""
+
+    type = "recurrentaction"
+    frequency = Iterator([frequency for frequency, _ in RecurrentAction.FREQUENCY])
+    active = True
+    count = Faker("random_int", min=1, max=12)
+
+
+class NoteFactory(DjangoModelFactory):
+    """Note, action and number must be given"""
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """NoteFactory Meta class"""
+
+        model = Note
+
+    content = Faker("sentence")
+
+
+class StepFactory(DjangoModelFactory):
+    """Step, action and number must be given"""
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """StepFactory Meta class"""
+
+        model = Step
+
+    planned_on = Faker("date_time_between", start_date="-1y", end_date="+1y", tzinfo=utc)
+    content = Faker("sentence")
+
+
+class LogFactory(DjangoModelFactory):
+    """Log, action and number must be given"""
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """LogFactory Meta class"""
+
+        model = Log
+
+    date = Faker("date_time_between", start_date="-1y", end_date="now", tzinfo=utc)
+    content = Faker("sentence")
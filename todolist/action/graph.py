@@ -0,0 +1,116 @@
+"""
+# Dependency graph algorithms
+
+Pure python helpers working on plain action ids.
+They do not touch the database, so they can be used by models, signals and migrations alike.
+"""
+
+from array import array
+from collections import defaultdict, deque
+from operator import add
+
+
+def topological_order(nodes, dependencies):
+    """
+    Order nodes so that each node comes after its own dependencies (Kahn's algorithm).
+
+    Only dependencies that are themselves in nodes are taken into account.
+    A ValueError is raised if those nodes contain a cycle.
+    """
+    nodes = set(nodes)
+    waiting = {node: 0 for node in nodes}
+    subordinates = defaultdict(list)
+    for node in nodes:
+        for dependency in dependencies.get(node, ()):
+            if dependency in nodes:
+                waiting[node] += 1
+                subordinates[dependency].append(node)
+
+    queue = deque(node for node, count in waiting.items() if not count)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for subordinate in subordinates[node]:
+            waiting[subordinate] -= 1
+            if not waiting[subordinate]:
+                queue.append(subordinate)
+
+    if len(order) != len(nodes):
+        raise ValueError("Dependency graph contains a cycle")
+    return order
+
+
+def ancestor_depths(nodes, dependencies, known=None):
+    """
+    Compute the transitive dependencies of each node with the length of the shortest path.
+
+    dependencies maps a node to its direct dependencies.
+    known maps nodes outside of nodes to their already computed {ancestor: depth}.
+    Return {node: {ancestor: depth}}.
+    """
+    known = known or {}
+    result = {}
+    for node in topological_order(nodes, dependencies):
+        depths = {}
+        for dependency in dependencies.get(node, ()):
+            if depths.get(dependency, 2) > 1:
+                depths[dependency] = 1
+            inherited = result[dependency] if dependency in result else known.get(dependency, {})
+            for ancestor, depth in inherited.items():
+                if depths.get(ancestor, depth + 2) > depth + 1:
+                    depths[ancestor] = depth + 1
+        result[node] = depths
+    return result
+
+
+def critical_path_method(durations, edges, releases=None, dues=None):
+    """
+    Schedule nodes 0..n-1 as soon as possible (critical path method).
+
+    durations holds the duration of each node, edges (dependency, subordinate) index pairs.
+    releases optionally holds the earliest start of each node, dues its latest finish (None when free):
+    a node finishing after its due date gets a negative slack.
+    Successors are kept as compact arrays: the ones of node i are targets[starts[i]:starts[i + 1]].
+    Return (order, earliest, latest): a topological order and the earliest and latest start of each node,
+    the slack of a node being latest - earliest. A ValueError is raised on cycles.
+    """
+    count = len(durations)
+    durations = list(durations)  # Lists are faster to index than arrays, that box every value
+    waiting = [0] * count
+    for _, subordinate in edges:
+        waiting[subordinate] += 1
+    starts = array("q", [0]) * (count + 1)
+    for dependency, _ in edges:
+        starts[dependency + 1] += 1
+    for node in range(count):
+        starts[node + 1] += starts[node]
+    targets = array("q", [0]) * starts[count]
+    filled = list(starts)
+    for dependency, subordinate in edges:
+        targets[filled[dependency]] = subordinate
+        filled[dependency] += 1
+    starts = list(starts)
+
+    earliest = list(releases) if releases is not None else [0] * count
+    order = [node for node in range(count) if not waiting[node]]
+    for node in order:  # Forward pass, order grows as nodes become ready (Kahn's algorithm)
+        finish = earliest[node] + durations[node]
+        for subordinate in targets[starts[node]:starts[node + 1]]:
+            if earliest[subordinate] < finish:
+                earliest[subordinate] = finish
+            waiting[subordinate] -= 1
+            if not waiting[subordinate]:
+                order.append(subordinate)
+    if len(order) != count:
+        raise ValueError("Dependency graph contains a cycle")
+
+    end = max(map(add, earliest, durations), default=0)
+    latest = [0] * count
+    for node in reversed(order):  # Backward pass
+        finish = end if dues is None or dues[node] is None else dues[node]
+        for subordinate in targets[starts[node]:starts[node + 1]]:
+            if latest[subordinate] < finish:
+                finish = latest[subordinate]
+        latest[node] = finish - durations[node]
+    return array("q", order), array("q", earliest), array("q", latest)
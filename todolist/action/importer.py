@@ -0,0 +1,297 @@
+"""
+# Bulk import of actions
+
+Actions are read from CSV or JSON lines sources and inserted chunk by chunk with bulk queries.
+The creation signals are not sent by bulk queries, so their work (name, slug, creation log, dependency closure,
+occurrences, reminders, search index) is done here, in memory and with one query per table and per chunk.
+Memory use only depends on the chunk size, not on the size of the source.
+Category and project rows (see action.exporter) create the ones that do not exist yet, with their slugs.
+"""
+
+import csv
+import json
+from collections import Counter, namedtuple
+from itertools import islice
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import AutoField, BooleanField, DateTimeField
+from django.db.transaction import atomic
+from django.utils.timezone import is_naive, make_aware
+
+from action.models import Action, ActionClosure, ActionRollup, Event, RecurrentAction, Occurrence, Log
+from action.querysets import forget_used_dates
+from action.reminders import notify
+from action.search import get_backend
+from action.signals import action_pre_created, creation_log
+from category.models import Category
+from project.models import Project
+from todolist import changes, slugs
+
+
+MODELS = {
+    model._meta.model_name: model  # pylint: disable=protected-access
+    for model in (Action, Event, RecurrentAction)
+}
+
+
+class ImportReport(namedtuple("ImportReport", ("rows", "chunks", "seconds"))):
+    """Import statistics"""
+
+    __slots__ = ()
+
+    @property
+    def throughput(self):
+        """Imported rows per second"""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def read_csv(stream):
+    """Rows of a CSV source with a header line, dependencies being separated by spaces"""
+    for row in csv.DictReader(stream):
+        row = {key: value for key, value in row.items() if value != ""}
+        if "dependencies" in row:
+            row["dependencies"] = row["dependencies"].split()
+        yield row
+
+
+def read_jsonl(stream):
+    """Rows of a JSON lines source, one JSON object per line"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def to_python(field, value):
+    """Convert a serialized value to the python value of a model field"""
+    if value is None:
+        return None
+    if isinstance(field, BooleanField) and isinstance(value, str):
+        return value.lower() in ("1", "t", "true", "y", "yes")
+    value = field.to_python(value)
+    if isinstance(field, DateTimeField) and settings.USE_TZ and is_naive(value):
+        value = make_aware(value)
+    return value
+
+
+class ActionImporter:
+    """
+    ## Chunked bulk import
+
+    Each chunk is imported in its own transaction.
+    Dependencies are given by slugs, they can target existing actions, actions of the same chunk
+    or actions of previous chunks. Dependencies to later rows are kept aside and retried after each chunk:
+    at most chunk_size of them can wait at once, and the ones still unknown at the end are refused.
+    Dependencies closing a cycle are refused, naming the row.
+    """
+
+    def __init__(self, chunk_size=1000, using=DEFAULT_DB_ALIAS):
+        self.chunk_size = chunk_size
+        self.using = using
+        self.projects = {}
+        self.pending = []
+
+    def run(self, rows, progress=None):
+        """Import all rows, return an ImportReport"""
+        start = perf_counter()
+        count = chunks = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            with atomic(using=self.using):
+                self.import_chunk(chunk)
+            forget_used_dates()
+            changes.touch(Action, Log)
+            count += len(chunk)
+            chunks += 1
+            if progress is not None:
+                progress(ImportReport(count, chunks, perf_counter() - start))
+
+        with atomic(using=self.using):
+            self.link(self.pending, strict=True)
+        self.pending = []
+        return ImportReport(count, chunks, perf_counter() - start)
+
+    def import_chunk(self, rows):
+        """Insert one chunk of rows"""
+        parents = {"category": [], "project": []}
+        actions = []
+        for row in rows:
+            parents.get(row.get("type"), actions).append(row)
+        self.import_categories(parents["category"])
+        self.import_projects(parents["project"])
+        if not actions:
+            return
+        rows = actions
+
+        self.load_projects({row["project"] for row in rows})
+        instances = [self.build(row) for row in rows]
+        slugs.assign_slugs(instances, lambda instance: instance.project.name + "__" + instance.label, self.using)
+        for instance in instances:
+            action_pre_created(
+                sender=type(instance), instance=instance, raw=False, using=self.using, update_fields=None
+            )
+
+        self.insert(instances)
+        Log.objects.using(self.using).bulk_create([creation_log(instance) for instance in instances])
+        ActionRollup.objects.db_manager(self.using).apply(
+            Counter((instance.project_id, instance.status) for instance in instances)
+        )
+        backend = get_backend(self.using)
+        if backend is not None:
+            backend.index(instance.pk for instance in instances)
+
+        pending, self.pending = self.pending, []
+        self.link(pending + [
+            (slug, instance.slug)
+            for row, instance in zip(rows, instances)
+            for slug in row.get("dependencies") or ()
+        ])
+        if len(self.pending) > self.chunk_size:
+            raise ValueError("More than {} dependencies on rows not imported yet, first one: {} of {}".format(
+                self.chunk_size, *self.pending[0]
+            ))
+
+    def import_categories(self, rows):
+        """Create the categories of a chunk that do not exist yet"""
+        if rows:
+            create_missing(Category, [Category(name=row["name"], slug=row.get("slug", "")) for row in rows],
+                           lambda category: category.name, self.using)
+
+    def import_projects(self, rows):
+        """Create the projects of a chunk that do not exist yet, their categories must exist"""
+        if not rows:
+            return
+        names = {row["category"] for row in rows}
+        categories = dict(Category.objects.using(self.using).filter(name__in=names).values_list("name", "pk"))
+        if names - set(categories):
+            raise ValueError("Unknown categories: {}".format(", ".join(sorted(names - set(categories)))))
+        create_missing(
+            Project,
+            [Project(category_id=categories[row["category"]], name=row["name"], slug=row.get("slug", ""))
+             for row in rows],
+            lambda project: slugs.name_of(Category, project.category_id, self.using) + "__" + project.name,
+            self.using,
+        )
+
+    def load_projects(self, names):
+        """Fetch the unknown projects of a chunk in a single query"""
+        missing = set(names) - set(self.projects)
+        if not missing:
+            return
+        for project in Project.objects.using(self.using).filter(name__in=missing):
+            self.projects[project.name] = project
+        missing.difference_update(self.projects)
+        if missing:
+            raise ValueError("Unknown projects: {}".format(", ".join(sorted(missing))))
+
+    def build(self, row):
+        """Build an unsaved instance, its name and slug are computed by the chunk"""
+        model = MODELS[row.get("type", "action")]
+        instance = model(project=self.projects[row["project"]])
+        for field in model._meta.concrete_fields:  # pylint: disable=protected-access
+            if field.name in row and field.editable and not field.primary_key and field.name != "project":
+                setattr(instance, field.attname, to_python(field, row[field.name]))
+        instance.normalise_durations()
+        instance.polymorphic_ctype = ContentType.objects.db_manager(self.using).get_for_model(
+            model, for_concrete_model=False
+        )
+        return instance
+
+    def insert(self, instances):
+        """Insert the action rows, then the rows of the child tables"""
+        insert_rows(Action, instances, self.using)
+
+        ids = dict(
+            Action.objects.db_manager(self.using).non_polymorphic().filter(
+                slug__in=[instance.slug for instance in instances]
+            ).values_list("slug", "pk")
+        )
+        for instance in instances:
+            instance.pk = instance.id = ids[instance.slug]
+
+        for model in (Event, RecurrentAction):
+            children = [instance for instance in instances if isinstance(instance, model)]
+            if children:
+                insert_rows(model, children, self.using)
+                if model is RecurrentAction:
+                    Occurrence.objects.db_manager(self.using).refresh(children)
+                else:
+                    notify(child for child in children if child.send_reminder)
+
+    def link(self, edges, strict=False):
+        """Insert (dependency slug, dependent slug) edges and refresh the dependency closure"""
+        if not edges:
+            return
+        slugs = {slug for edge in edges for slug in edge}
+        ids = dict(
+            Action.objects.db_manager(self.using).non_polymorphic().filter(slug__in=slugs).values_list("slug", "pk")
+        )
+
+        resolved = []
+        for dependency, dependent in edges:
+            if dependency in ids:
+                resolved.append((ids[dependency], ids[dependent]))
+            elif strict:
+                raise ValueError("Unknown dependency: {}".format(dependency))
+            else:
+                self.pending.append((dependency, dependent))
+        if not resolved:
+            return
+        cycle = ActionClosure.objects.db_manager(self.using).cycle_edge(resolved)
+        if cycle is not None:
+            names = {pk: slug for slug, pk in ids.items()}
+            raise ValueError("Dependency cycle: {} cannot depend on {}".format(names[cycle[1]], names[cycle[0]]))
+
+        through = Action.dependency_set.through
+        through.objects.using(self.using).bulk_create([
+            through(from_action_id=dependent, to_action_id=dependency) for dependency, dependent in resolved
+        ])
+        ActionClosure.objects.db_manager(self.using).refresh({dependent for _, dependent in resolved})
+
+
+def create_missing(model, instances, text, using):
+    """
+    Bulk create the categories or projects whose name is not taken yet.
+
+    Their slugs are kept when free, built from text(instance) otherwise.
+    """
+    names = {instance.name for instance in instances}
+    names.difference_update(model.objects.using(using).filter(name__in=names).values_list("name", flat=True))
+    instances = list({instance.name: instance for instance in instances if instance.name in names}.values())
+    if not instances:
+        return
+    taken = set(model.objects.using(using).filter(
+        slug__in=[instance.slug for instance in instances]
+    ).values_list("slug", flat=True))
+    for instance in instances:
+        if instance.slug in taken:
+            instance.slug = ""
+    slugs.assign_slugs(instances, text, using)
+    model.objects.using(using).bulk_create(instances)
+    changes.touch(model)
+
+
+def insert_rows(model, instances, using):
+    """Insert the rows of the table of a model only, bulk_create cannot do this with multi-table inheritance"""
+    fields = [
+        field for field in model._meta.local_concrete_fields  # pylint: disable=protected-access
+        if not isinstance(field, AutoField)
+    ]
+    batch_size = connections[using].ops.bulk_batch_size(fields, instances) or len(instances)
+    for start in range(0, len(instances), batch_size):
+        model._base_manager._insert(  # pylint: disable=protected-access
+            instances[start:start + batch_size], fields=fields, using=using
+        )
+
+
+def import_actions(rows, chunk_size=1000, using=DEFAULT_DB_ALIAS, progress=None):
+    """Import actions from an iterable of dicts (see ActionImporter), return an ImportReport"""
+    return ActionImporter(chunk_size=chunk_size, using=using).run(rows, progress=progress)
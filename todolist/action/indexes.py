@@ -0,0 +1,212 @@
+"""
+# Index audit
+
+Each index of the action tables is checked against the queries the application actually issues:
+a representative workload (admin changelists, change forms, autocomplete, signals and workers) is run
+in a transaction that is rolled back, every captured statement is explained by the database, and the
+indexes named by the query plans are reported. An index that no plan uses only slows writes down.
+
+The insert benchmark measures the cost of index maintenance on writes, in the same rolled back way.
+"""
+
+import re
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from time import perf_counter
+
+from django.apps import apps
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.transaction import atomic
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from action.importer import import_actions
+from action.models import Action, Event, RecurrentAction, Occurrence, Note, Step, Log
+from action.reminders import ReminderScheduler
+from category.models import Category
+from project.models import Project
+
+
+AUDITED_APPS = ("action", "project", "category")
+
+EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+PLAN_INDEX = re.compile(r"(?:USING (?:COVERING )?INDEX|Index (?:Only )?Scan using|Bitmap Index Scan on) (\w+)")
+
+EXPLAINED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+class Rollback(Exception):
+    """Raised to roll back the audit and benchmark transactions"""
+
+
+IndexUsage = namedtuple("IndexUsage", ("table", "name", "columns", "unique", "statements"))
+
+InsertReport = namedtuple("InsertReport", ("rows", "seconds", "indexes"))
+
+
+def audited_tables(using=DEFAULT_DB_ALIAS):
+    """Tables of the audited apps, auto-created many to many tables included"""
+    tables = set()
+    for app_label in AUDITED_APPS:
+        for model in apps.get_app_config(app_label).get_models(include_auto_created=True):
+            tables.add(model._meta.db_table)  # pylint: disable=protected-access
+    existing = set(connections[using].introspection.table_names())
+    return sorted(tables & existing)
+
+
+def sqlite_indexes(cursor, table):
+    """{index name: (columns, unique)} of a SQLite table, with the names query plans use"""
+    # Introspection gives unnamed constraints for unique columns instead of their sqlite_autoindex_* index
+    result = {}
+    cursor.execute("PRAGMA index_list({})".format(cursor.db.ops.quote_name(table)))
+    for _, name, unique, origin, _ in cursor.fetchall():
+        if origin != "pk":
+            cursor.execute("PRAGMA index_info({})".format(cursor.db.ops.quote_name(name)))
+            result[name] = (tuple(row[2] for row in cursor.fetchall()), bool(unique))
+    return result
+
+
+def table_indexes(using=DEFAULT_DB_ALIAS):
+    """{(table, index name): (columns, unique)} of the audited tables, primary keys excluded"""
+    connection = connections[using]
+    result = {}
+    with connection.cursor() as cursor:
+        for table in audited_tables(using):
+            if connection.vendor == "sqlite":
+                indexes = sqlite_indexes(cursor, table)
+            else:
+                indexes = {
+                    name: (tuple(constraint["columns"]), constraint["unique"])
+                    for name, constraint in connection.introspection.get_constraints(cursor, table).items()
+                    if not constraint["primary_key"] and (constraint["index"] or constraint["unique"])
+                }
+            for name, index in indexes.items():
+                result[(table, name)] = index
+    return result
+
+
+def explain(sql, using=DEFAULT_DB_ALIAS):
+    """Query plan of a statement, as text"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(EXPLAIN[connections[using].vendor] + sql)
+        return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def run_workload(using=DEFAULT_DB_ALIAS):
+    """
+    Issue the queries of the admin, of the signals and of the workers, return the captured statements.
+
+    The rows created to do so are rolled back.
+    """
+    factory = RequestFactory()
+    user = User(username="audit", is_staff=True, is_superuser=True, is_active=True)
+
+    def get(view, path="/", **params):
+        request = factory.get(path, params)
+        request.user = user
+        response = view(request)
+        if hasattr(response, "render"):
+            response.render()
+
+    statements = []
+    try:
+        with atomic(using=using):
+            category = Category.objects.create(name="Audit category")
+            project = Project.objects.create(name="Audit project", category=category)
+            with CaptureQueriesContext(connections[using]) as context:
+                # Signals: creations, inline rows, dependencies, updates
+                action = Action.objects.create(project=project, label="Audit action", description="-")
+                event = Event.objects.create(
+                    project=project, label="Audit event", description="-", planned_on=now() + timedelta(days=1),
+                    send_reminder=True,
+                )
+                recurrent = RecurrentAction.objects.create(
+                    project=project, label="Audit recurrence", description="-", planned_on=now(),
+                    frequency="w", active=True, count=0,
+                )
+                rows = [model(action=action, content="-") for model in (Note, Step, Log)]
+                Action.objects.assign_numbers(rows)
+                for row in rows:
+                    row.save()
+                event.dependency_set.add(action)
+                recurrent.dependency_set.add(event)
+                action.status = "D"
+                action.save()
+
+                # Admin: changelists (filtered, searched), change forms, autocomplete
+                for model in (Action, Event, RecurrentAction):
+                    model_admin = site._registry[model]  # pylint: disable=protected-access
+                    get(model_admin.changelist_view)
+                    get(model_admin.changelist_view, project__id__exact=project.pk)
+                    get(model_admin.changelist_view, project__category__id__exact=category.pk)
+                    get(model_admin.changelist_view, deadline=now().strftime("%m-%Y"))
+                    get(model_admin.changelist_view, planned_on=now().strftime("%m-%Y"))
+                    get(model_admin.changelist_view, q="audit")
+                    get(model_admin.autocomplete_view, term="audit")
+                get(site._registry[Project].autocomplete_view, term="audit")  # pylint: disable=protected-access
+                get(site._registry[Category].changelist_view)  # pylint: disable=protected-access
+                for instance in (action, event, recurrent):
+                    model_admin = site._registry[type(instance)]  # pylint: disable=protected-access
+                    get(lambda request, admin=model_admin, pk=instance.pk: admin.change_view(request, str(pk)))
+
+                # Workers
+                ReminderScheduler(backend=object()).load()
+                list(Occurrence.objects.between(now(), now() + timedelta(days=7)))
+
+                # Deletions
+                recurrent.dependency_set.remove(event)
+                action.delete()
+
+            for query in context.captured_queries:
+                if query["sql"].lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+                    statements.append((query["sql"], explain(query["sql"], using)))
+            raise Rollback
+    except Rollback:
+        pass
+    return statements
+
+
+def audit(using=DEFAULT_DB_ALIAS):
+    """Usage of every index of the audited tables by the workload, as a list of IndexUsage"""
+    used = defaultdict(list)
+    for sql, plan in run_workload(using):
+        for name in set(PLAN_INDEX.findall(plan)):
+            used[name].append(sql)
+    return [
+        IndexUsage(table, name, columns, unique, used.get(name, []))
+        for (table, name), (columns, unique) in sorted(table_indexes(using).items())
+    ]
+
+
+def insert_benchmark(count=1000, using=DEFAULT_DB_ALIAS):
+    """
+    Time the import of count actions (each with its creation log) and the bulk insert of count notes,
+    return an InsertReport. The rows are rolled back.
+    """
+    indexes = sum(
+        1 for table, _ in table_indexes(using)
+        if table in (Action._meta.db_table, Note._meta.db_table, Log._meta.db_table)  # pylint: disable=protected-access
+    )
+    try:
+        with atomic(using=using):
+            category = Category.objects.using(using).create(name="Benchmark category")
+            project = Project.objects.using(using).create(name="Benchmark project", category=category)
+            start = perf_counter()
+            import_actions(
+                ({"project": project.name, "label": "Benchmark {}".format(i), "description": "Lorem ipsum " * 20}
+                 for i in range(count)),
+                using=using,
+            )
+            actions = Action.objects.db_manager(using).non_polymorphic().filter(project=project).values_list("pk")
+            Note.objects.using(using).bulk_create(
+                [Note(action_id=pk, number=1, content="Lorem ipsum " * 20) for pk, in actions]
+            )
+            seconds = perf_counter() - start
+            raise Rollback
+    except Rollback:
+        pass
+    return InsertReport(count * 3, seconds, indexes)
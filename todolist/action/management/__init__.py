@@ -0,0 +1 @@
+"""Action management commands"""
@@ -0,0 +1,47 @@
+"""# Audit indexes command"""
+
+from django.core.management.base import BaseCommand
+
+from action.indexes import audit, insert_benchmark
+
+
+class Command(BaseCommand):
+    """Report which indexes the queries of the application use"""
+
+    help = (
+        "Explain the queries issued by the admin, the signals and the workers (in a rolled back transaction) "
+        "and report the indexes each one uses. Unused indexes only slow writes down."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias")
+        parser.add_argument(
+            "--insert-benchmark", type=int, default=0, metavar="COUNT",
+            help="Also time the insert of COUNT actions, logs and notes (rolled back)",
+        )
+
+    def handle(self, *args, **options):
+        unused = 0
+        for usage in audit(options["database"]):
+            line = "{:<36} {:<48} ({}){} {} queries".format(
+                usage.table, usage.name, ", ".join(usage.columns), " unique" if usage.unique else "",
+                len(usage.statements),
+            )
+            if usage.statements:
+                self.stdout.write(line)
+            else:
+                unused += 1
+                self.stdout.write(self.style.WARNING(line))
+            if options["verbosity"] > 1:
+                for sql in usage.statements:
+                    self.stdout.write("    " + sql)
+
+        self.stdout.write("{} unused indexes (unique ones may still be needed as constraints)".format(unused))
+
+        if options["insert_benchmark"]:
+            report = insert_benchmark(options["insert_benchmark"], options["database"])
+            self.stdout.write(self.style.SUCCESS(
+                "Inserted {} rows in {:.3f}s ({:.0f} rows/s), {} indexes on the action, log and note tables".format(
+                    report.rows, report.seconds, report.rows / report.seconds, report.indexes
+                )
+            ))
@@ -0,0 +1,62 @@
+"""# Benchmark command"""
+
+import json
+from time import perf_counter
+
+import django
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from action.benchmark import AdminBenchmark, parse_scale, seed
+
+
+class Command(BaseCommand):
+    """Benchmark the hot paths of the admins on synthetic data"""
+
+    help = (
+        "Seed a throwaway test database at each scale and report, for every admin path, the query count, "
+        "p50 / p95 latency and peak memory as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", action="append", dest="scales", metavar="SCALE",
+            help="Number of actions, such as 1k, 10k or 100k (repeatable, default: 1k)",
+        )
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per path")
+        parser.add_argument("--notes", type=int, default=2, help="Notes per action")
+        parser.add_argument("--steps", type=int, default=1, help="Steps per action")
+        parser.add_argument("--logs", type=int, default=1, help="Logs per action, besides the creation log")
+        parser.add_argument("--output", help="JSON file to write, the standard output by default")
+
+    def handle(self, *args, **options):
+        try:
+            scales = [parse_scale(scale) for scale in options["scales"] or ["1k"]]
+        except ValueError as error:
+            raise CommandError("Invalid scale: {}".format(error))
+
+        report = {"django": django.get_version(), "database": connection.vendor, "repeat": options["repeat"]}
+        report["scales"] = {str(scale): self.bench(scale, options) for scale in scales}
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                stream.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def bench(self, scale, options):
+        """Results at one scale, on a fresh test database"""
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        ContentType.objects.clear_cache()
+        try:
+            start = perf_counter()
+            seed(scale, notes=options["notes"], steps=options["steps"], logs=options["logs"])
+            seconds = perf_counter() - start
+            if options["verbosity"] > 1:
+                self.stderr.write("Seeded {} actions in {:.1f}s".format(scale, seconds))
+            return {"seed_seconds": round(seconds, 3), "admins": AdminBenchmark(options["repeat"]).run()}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            ContentType.objects.clear_cache()
@@ -0,0 +1,41 @@
+"""# Concurrent writers benchmark command"""
+
+import json
+import os
+from tempfile import TemporaryDirectory
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from action.benchmark import concurrent_writes, temporary_database
+
+
+class Command(BaseCommand):
+    """Measure SQLite write throughput under contention, without then with the tuning"""
+
+    help = (
+        "Save actions from concurrent threads on a throwaway SQLite file database, first with the SQLite "
+        "defaults and no retry, then with the tuning pragmas and the write retry, and report both as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers")
+        parser.add_argument("--writes", type=int, default=50, help="Saves per writer")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark is about SQLite")
+
+        report = {"threads": options["threads"], "writes": options["writes"]}
+        with TemporaryDirectory() as directory:
+            for name, pragmas, retry in (("before", None, False), ("after", {}, True)):
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    report[name] = self.bench(os.path.join(directory, name + ".sqlite3"), retry, options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    @staticmethod
+    def bench(path, retry, options):
+        """Results on a fresh file database"""
+        with temporary_database(path) as using:  # Connections are created with the current pragmas
+            return concurrent_writes(options["threads"], options["writes"], retry, using)
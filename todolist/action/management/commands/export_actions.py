@@ -0,0 +1,29 @@
+"""# Export actions command"""
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from action.exporter import WRITERS, export_actions
+
+
+class Command(BaseCommand):
+    """Stream the categories, the projects and all the actions, with their notes, steps, logs and dependencies"""
+
+    help = "Export the categories, the projects and all the actions (with notes, steps, logs and dependencies) " \
+           "as JSON lines or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(WRITERS), default="jsonl", help="Output format")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Actions fetched per chunk")
+        parser.add_argument("--output", default="-", help="Output file, '-' for the standard output")
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        stream = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        try:
+            for line in export_actions(options["format"], chunk_size=options["chunk_size"]):
+                stream.write(line)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
@@ -0,0 +1,47 @@
+"""# Import actions command"""
+
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from action.importer import READERS, import_actions
+
+
+class Command(BaseCommand):
+    """Bulk import actions from a CSV or JSON lines file"""
+
+    help = "Bulk import categories, projects and actions (and their dependencies) from a CSV or JSON lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON lines file, '-' for the standard input")
+        parser.add_argument("--format", choices=sorted(READERS), help="Source format, guessed from the extension")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows inserted per transaction")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        source_format = options["format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if source_format not in READERS:
+            raise CommandError("Unknown format {!r}, use --format".format(source_format))
+
+        def progress(report):
+            """Report each chunk when verbose"""
+            if options["verbosity"] > 1:
+                self.stdout.write("{0.rows} rows ({0.throughput:.0f} rows/s)".format(report))
+
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            report = import_actions(READERS[source_format](stream), chunk_size=options["chunk_size"],
+                                    progress=progress)
+        except (ValueError, IntegrityError) as error:
+            raise CommandError(error)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {0.rows} actions in {0.chunks} chunks and {0.seconds:.2f}s ({0.throughput:.0f} rows/s)".format(
+                report
+            )
+        ))
@@ -0,0 +1,110 @@
+"""# Load test command"""
+
+import json
+import re
+import threading
+from http.client import HTTPConnection
+from http.cookiejar import CookieJar
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandError
+
+from action.benchmark import percentile
+
+
+CSRF_TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+DEFAULT_PATHS = ("/", "/action/action/", "/action/event/", "/action/recurrentaction/", "/project/project/")
+
+
+class Command(BaseCommand):
+    """Measure the throughput of a running server on the admin pages"""
+
+    help = (
+        "Log into the admin of a running server, request its pages from concurrent clients for a while "
+        "and report the requests per second and latency percentiles as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+        parser.add_argument("--path", action="append", dest="paths", help="Requested path (repeatable)")
+        parser.add_argument("--username", required=True, help="Admin user name")
+        parser.add_argument("--password", required=True, help="Admin user password")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+        parser.add_argument("--duration", type=float, default=10, help="Seconds")
+
+    @staticmethod
+    def login(url, username, password):
+        """Cookie header of an authenticated admin session"""
+        jar = CookieJar()
+        opener = build_opener(HTTPCookieProcessor(jar))
+        page = opener.open(url + "/login/").read().decode()
+        token = CSRF_TOKEN.search(page)
+        if token is None:
+            raise CommandError("No login form at {}/login/".format(url))
+        data = urlencode({
+            "username": username, "password": password, "csrfmiddlewaretoken": token.group(1), "next": "/",
+        })
+        try:
+            opener.open(Request(url + "/login/", data.encode(), headers={"Referer": url + "/login/"}))
+        except HTTPError as error:
+            raise CommandError("Login failed: {}".format(error))
+        if "sessionid" not in {cookie.name for cookie in jar}:
+            raise CommandError("Login failed")
+        return "; ".join("{}={}".format(cookie.name, cookie.value) for cookie in jar)
+
+    @staticmethod
+    def client(url, cookie, paths, deadline, timings, errors):
+        """Request the paths in turn on a keep-alive connection until the deadline"""
+        parts = urlsplit(url)
+        connection = HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        i = 0
+        while perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = perf_counter()
+            try:
+                connection.request("GET", parts.path + path, headers={"Cookie": cookie})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                connection.close()
+                ok = False
+            if ok:
+                timings.append((perf_counter() - start) * 1000)
+            else:
+                errors.append(path)
+        connection.close()
+
+    def handle(self, *args, **options):
+        url = options["url"].rstrip("/")
+        paths = options["paths"] or DEFAULT_PATHS
+        cookie = self.login(url, options["username"], options["password"])
+
+        timings, errors = [], []
+        start = perf_counter()
+        deadline = start + options["duration"]
+        clients = [
+            threading.Thread(target=self.client, args=(url, cookie, paths, deadline, timings, errors))
+            for _ in range(options["concurrency"])
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        seconds = perf_counter() - start
+
+        self.stdout.write(json.dumps({
+            "url": url,
+            "paths": list(paths),
+            "concurrency": options["concurrency"],
+            "requests": len(timings),
+            "errors": len(errors),
+            "requests_per_second": round(len(timings) / seconds, 1),
+            "p50_ms": round(percentile(timings, 50), 1) if timings else None,
+            "p95_ms": round(percentile(timings, 95), 1) if timings else None,
+        }, indent=2))
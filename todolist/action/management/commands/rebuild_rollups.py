@@ -0,0 +1,18 @@
+"""# Rebuild rollups command"""
+
+from django.core.management.base import BaseCommand
+
+from action.models import ActionRollup
+
+
+class Command(BaseCommand):
+    """Recompute the action counters of the projects"""
+
+    help = "Recompute the number of actions per project and status bucket from the actions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias")
+
+    def handle(self, *args, **options):
+        ActionRollup.objects.db_manager(options["database"]).rebuild()
+        self.stdout.write(self.style.SUCCESS("Rollups rebuilt"))
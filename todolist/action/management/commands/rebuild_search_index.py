@@ -0,0 +1,22 @@
+"""# Rebuild search index command"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from action.search import get_backend
+
+
+class Command(BaseCommand):
+    """Rebuild the full-text search index of the actions"""
+
+    help = "Rebuild the full-text search documents of all the actions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias")
+
+    def handle(self, *args, **options):
+        backend = get_backend(options["database"])
+        if backend is None:
+            raise CommandError("This database engine has no full-text search backend")
+        backend.create()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
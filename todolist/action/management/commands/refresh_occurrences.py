@@ -0,0 +1,27 @@
+"""# Refresh occurrences command"""
+
+from django.core.management.base import BaseCommand
+
+from action.models import RecurrentAction, Occurrence
+
+
+class Command(BaseCommand):
+    """Move the materialized occurrences window to today"""
+
+    help = "Refresh the materialized occurrences of all the recurrent actions (to be run daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Recurrent actions refreshed at once")
+
+    def handle(self, *args, **options):
+        queryset = RecurrentAction.objects.order_by("pk")
+        last = count = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last)[:options["chunk_size"]])
+            if not chunk:
+                break
+            Occurrence.objects.refresh(chunk)
+            count += len(chunk)
+            last = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS("Refreshed the occurrences of {} recurrent actions".format(count)))
@@ -0,0 +1,21 @@
+"""# Run reminders command"""
+
+from django.core.management.base import BaseCommand
+
+from action.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    """Event reminders worker"""
+
+    help = "Send the reminders of the events when they are due, until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Reminders delivered at once")
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(batch_size=options["batch_size"])
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
@@ -0,0 +1,55 @@
+"""# Schedule project command"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_aware, localtime, make_aware
+
+from action.models import Action
+from action.schedule import schedule_project
+from project.models import Project
+
+
+class Command(BaseCommand):
+    """Critical path of the actions of a project"""
+
+    help = "Schedule the actions of a project: critical path, slack and missed deadlines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("project", help="Slug of the project")
+        parser.add_argument("--start", help="Start of the schedule (ISO date time, now by default)")
+        parser.add_argument("--all", action="store_true", help="List every action, not only the critical ones")
+        parser.add_argument("--database", default="default", help="Database alias")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        try:
+            project = Project.objects.using(using).get(slug=options["project"])
+        except Project.DoesNotExist:
+            raise CommandError("Unknown project: {}".format(options["project"]))
+        start = parse_datetime(options["start"]) if options["start"] else None
+        if options["start"] and start is None:
+            raise CommandError("Invalid start: {}".format(options["start"]))
+        if start is not None and not is_aware(start):
+            start = make_aware(start)
+
+        try:
+            schedule = schedule_project(project.pk, start, using)
+        except ValueError as error:
+            raise CommandError(str(error))
+        rows = list(schedule.rows()) if options["all"] else schedule.critical_path()
+        rows += [row for row in schedule.late() if not row.critical and not options["all"]]
+        names = dict(
+            Action.objects.db_manager(using).non_polymorphic().filter(pk__in=[row.id for row in rows])
+            .values_list("pk", "name")
+        )
+        for row in rows:
+            self.stdout.write("{:%Y-%m-%d %H:%M}  {:%Y-%m-%d %H:%M}  {:>10}  {}{}{}".format(
+                localtime(row.start), localtime(row.finish), str(row.slack), "*" if row.critical else " ",
+                "!" if row.late else " ", names[row.id],
+            ))
+
+        late = len(schedule.late())
+        message = "{} actions, finished on {:%Y-%m-%d %H:%M}, {} late (* critical, ! late)".format(
+            len(schedule), localtime(schedule.finish), late
+        )
+        self.stdout.write(self.style.WARNING(message) if late else self.style.SUCCESS(message))
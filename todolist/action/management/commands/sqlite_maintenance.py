@@ -0,0 +1,67 @@
+"""# SQLite maintenance command"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    """Keep a SQLite database fast and compact"""
+
+    help = (
+        "Refresh the query planner statistics (PRAGMA optimize, or a full ANALYZE), give free pages back "
+        "(incremental vacuum) and truncate the WAL file. To be run regularly, e.g. daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias")
+        parser.add_argument("--analyze", action="store_true", help="Full ANALYZE instead of PRAGMA optimize")
+        parser.add_argument(
+            "--vacuum-pages", type=int, default=0, metavar="PAGES",
+            help="Free pages given back by the incremental vacuum (0, the default, for all of them)",
+        )
+        parser.add_argument(
+            "--enable-incremental-vacuum", action="store_true",
+            help="Switch the database to incremental auto vacuum, with a full VACUUM (once, takes the lock)",
+        )
+
+    @staticmethod
+    def pragma(cursor, statement):
+        """Run a pragma, return its first value"""
+        cursor.execute("PRAGMA " + statement)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError("This is not a SQLite database")
+
+        with connection.cursor() as cursor:
+            if options["enable_incremental_vacuum"]:
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+                self.stdout.write("Incremental auto vacuum enabled")
+
+            if options["analyze"]:
+                cursor.execute("ANALYZE")
+                self.stdout.write("Statistics rebuilt")
+            else:
+                cursor.execute("PRAGMA optimize")
+                self.stdout.write("Statistics refreshed where needed")
+
+            free = self.pragma(cursor, "freelist_count")
+            if self.pragma(cursor, "auto_vacuum") == 2:
+                cursor.execute("PRAGMA incremental_vacuum({})".format(options["vacuum_pages"]))
+                cursor.fetchall()
+                self.stdout.write("{} free pages given back".format(free - self.pragma(cursor, "freelist_count")))
+            elif free:
+                self.stdout.write(self.style.WARNING(
+                    "{} free pages, run with --enable-incremental-vacuum to give them back".format(free)
+                ))
+
+            if self.pragma(cursor, "journal_mode") == "wal":
+                cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                busy, _, _ = cursor.fetchone()
+                self.stdout.write("WAL checkpointed" + (" (partially, readers were busy)" if busy else ""))
+
+        self.stdout.write(self.style.SUCCESS("Maintenance done"))
@@ -0,0 +1,100 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:23
+
+import logging
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+logger = logging.getLogger(__name__)
+
+
+def depth_first(dependencies):
+    """
+    Walk the dependency graph {descendant: {ancestor}} depth first (copy of the graph code at this migration).
+
+    Return (order, back_edges): the nodes ordered so that each one comes after its dependencies,
+    and the (ancestor, descendant) edges closing a cycle, that have to be left out for that order to exist.
+    """
+    state = {}  # 1 while the node is on the stack, 2 once all its dependencies are ordered
+    order, back_edges = [], []
+    for root in sorted(dependencies):
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(sorted(dependencies[root])))]
+        while stack:
+            node, pending = stack[-1]
+            for ancestor in pending:
+                if state.get(ancestor) == 1:
+                    back_edges.append((ancestor, node))
+                elif ancestor not in state:
+                    state[ancestor] = 1
+                    stack.append((ancestor, iter(sorted(dependencies.get(ancestor, ())))))
+                    break
+            else:
+                stack.pop()
+                state[node] = 2
+                order.append(node)
+    return order, back_edges
+
+
+def build_closure(apps, schema_editor):
+    """Materialize the closure of the existing dependencies, dropping the edges of legacy cycles"""
+    Action = apps.get_model("action", "Action")
+    ActionClosure = apps.get_model("action", "ActionClosure")
+    Dependency = Action.dependency_set.through
+    alias = schema_editor.connection.alias
+
+    dependencies = {}
+    for descendant, ancestor in Dependency.objects.using(alias).values_list("from_action", "to_action"):
+        dependencies.setdefault(descendant, set()).add(ancestor)
+
+    order, back_edges = depth_first(dependencies)
+    for ancestor, descendant in back_edges:
+        logger.warning("Dropping dependency of action %s on action %s, it closes a cycle", descendant, ancestor)
+        dependencies[descendant].discard(ancestor)
+        Dependency.objects.using(alias).filter(from_action=descendant, to_action=ancestor).delete()
+
+    closure = {}
+    for node in order:
+        depths = {}
+        for dependency in dependencies.get(node, ()):
+            depths[dependency] = 1
+        for dependency in dependencies.get(node, ()):
+            for ancestor, depth in closure[dependency].items():
+                if depths.get(ancestor, depth + 2) > depth + 1:
+                    depths[ancestor] = depth + 1
+        closure[node] = depths
+
+    ActionClosure.objects.using(alias).bulk_create([
+        ActionClosure(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+        for descendant, depths in closure.items()
+        for ancestor, depth in depths.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0007_auto_20190111_2152'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActionClosure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(verbose_name='depth')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_closure_set', to='action.Action', verbose_name='ancestor')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_closure_set', to='action.Action', verbose_name='descendant')),
+            ],
+            options={
+                'verbose_name': 'dependency closure',
+                'verbose_name_plural': 'dependency closures',
+                'unique_together': {('ancestor', 'descendant')},
+                'index_together': {('descendant', 'ancestor')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
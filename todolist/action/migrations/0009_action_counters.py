@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:24
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Start each counter after the highest number already used"""
+    Action = apps.get_model("action", "Action")
+    counters = {}
+    for model_name in ("note", "step", "log"):
+        model = apps.get_model("action", model_name)
+        highest = model.objects.filter(action=OuterRef("pk")).values("action").annotate(
+            highest=Max("number")
+        ).values("highest")
+        counters["{}_counter".format(model_name)] = Coalesce(Subquery(highest), 0)
+    Action.objects.using(schema_editor.connection.alias).update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0008_actionclosure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='action',
+            name='log_counter',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='log counter'),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='note_counter',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='note counter'),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='step_counter',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='step counter'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:42
+
+from calendar import monthrange
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.timezone import is_aware, localtime, make_aware, now
+
+
+# Copy of the occurrence arithmetic of action.recurrence at this migration
+
+PERIODS = {"d": timedelta(days=1), "w": timedelta(weeks=1)}
+
+MONTHS = {"m": 1, "y": 12}
+
+
+def to_local(value):
+    """Naive local wall-clock time"""
+    return localtime(value).replace(tzinfo=None) if is_aware(value) else value
+
+
+def shift(start, frequency, index):
+    """Naive date of the occurrence number index (0 being start itself)"""
+    if frequency in PERIODS:
+        return start + PERIODS[frequency] * index
+    year, month = divmod(start.month - 1 + MONTHS[frequency] * index, 12)
+    year, month = start.year + year, month + 1
+    return start.replace(year=year, month=month, day=min(start.day, monthrange(year, month)[1]))
+
+
+def first_index(start, frequency, after):
+    """Index of the first occurrence that is not before after (naive dates)"""
+    if after <= start:
+        return 0
+    if frequency in PERIODS:
+        return -((start - after) // PERIODS[frequency])
+    index = ((after.year - start.year) * 12 + after.month - start.month) // MONTHS[frequency]
+    while shift(start, frequency, index) < after:
+        index += 1
+    return index
+
+
+def occurrences(action, start, end):
+    """Yield (number, date) for each occurrence of a recurrent action in [start, end)"""
+    aware = is_aware(action.planned_on)
+    origin = to_local(action.planned_on)
+    index = first_index(origin, action.frequency, to_local(start))
+    while not action.count or index < action.count:
+        date = shift(origin, action.frequency, index)
+        if aware:
+            date = make_aware(date, is_dst=False)
+        if date >= end or (action.until is not None and date > action.until):
+            return
+        index += 1
+        yield index, date
+
+
+def materialize_occurrences(apps, schema_editor):
+    """Materialize the occurrences of the existing recurrent actions"""
+    RecurrentAction = apps.get_model("action", "RecurrentAction")
+    Occurrence = apps.get_model("action", "Occurrence")
+    start = now() - timedelta(days=getattr(settings, "RECURRENCE_PAST_DAYS", 31))
+    end = now() + timedelta(days=getattr(settings, "RECURRENCE_FUTURE_DAYS", 366))
+    alias = schema_editor.connection.alias
+    Occurrence.objects.using(alias).bulk_create([
+        Occurrence(action=action, number=number, date=date)
+        for action in RecurrentAction.objects.using(alias).filter(active=True, planned_on__isnull=False)
+        for number, date in occurrences(action, start, end)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0009_action_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Occurrence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='number')),
+                ('date', models.DateTimeField(db_index=True, verbose_name='date')),
+                ('action', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrence_set', to='action.RecurrentAction', verbose_name='action')),
+            ],
+            options={
+                'verbose_name': 'occurrence',
+                'verbose_name_plural': 'occurrences',
+                'ordering': ('date',),
+                'unique_together': {('action', 'number')},
+            },
+        ),
+        migrations.RunPython(materialize_occurrences, migrations.RunPython.noop),
+    ]
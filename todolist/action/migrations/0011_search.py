@@ -0,0 +1,79 @@
+"""Full-text search index of the actions, see action.search (its SQL is copied as of this migration)"""
+
+from django.db import migrations
+
+
+SQLITE = {
+    "create": ["CREATE VIRTUAL TABLE IF NOT EXISTS action_search USING fts5(title, body, notes)"],
+    "insert": """
+        INSERT INTO action_search (rowid, title, body, notes)
+        SELECT a.id,
+               c.name || ' ' || p.name || ' ' || a.label || ' ' || a.name || ' '
+               || coalesce(a.deadline, '') || ' ' || coalesce(a.planned_on, ''),
+               a.description,
+               coalesce((SELECT group_concat(content, ' ') FROM action_note WHERE action_id = a.id), '') || ' '
+               || coalesce((SELECT group_concat(content, ' ') FROM action_step WHERE action_id = a.id), '') || ' '
+               || coalesce((SELECT group_concat(content, ' ') FROM action_log WHERE action_id = a.id), '')
+        FROM action_action a
+        JOIN project_project p ON p.id = a.project_id
+        JOIN category_category c ON c.id = p.category_id
+    """,
+}
+
+POSTGRESQL = {
+    "create": [
+        """
+        CREATE TABLE IF NOT EXISTS action_search (
+            action_id integer PRIMARY KEY
+                REFERENCES action_action (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            document tsvector NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS action_search_document ON action_search USING GIN (document)",
+    ],
+    "insert": """
+        INSERT INTO action_search (action_id, document)
+        SELECT a.id,
+               setweight(to_tsvector('simple', c.name || ' ' || p.name || ' ' || a.label || ' ' || a.name || ' '
+                         || coalesce(a.deadline::text, '') || ' ' || coalesce(a.planned_on::text, '')), 'A')
+               || setweight(to_tsvector('simple', a.description), 'B')
+               || setweight(to_tsvector('simple',
+                   coalesce((SELECT string_agg(content, ' ') FROM action_note WHERE action_id = a.id), '') || ' '
+                   || coalesce((SELECT string_agg(content, ' ') FROM action_step WHERE action_id = a.id), '') || ' '
+                   || coalesce((SELECT string_agg(content, ' ') FROM action_log WHERE action_id = a.id), '')
+               ), 'C')
+        FROM action_action a
+        JOIN project_project p ON p.id = a.project_id
+        JOIN category_category c ON c.id = p.category_id
+    """,
+}
+
+BACKENDS = {"sqlite": SQLITE, "postgresql": POSTGRESQL}
+
+
+def create_search_index(apps, schema_editor):  # pylint: disable=unused-argument
+    """Create and fill the search index, when the database engine has one"""
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is not None:
+        for statement in backend["create"]:
+            schema_editor.execute(statement)
+        schema_editor.execute(backend["insert"])
+
+
+def drop_search_index(apps, schema_editor):  # pylint: disable=unused-argument
+    """Drop the search index"""
+    if schema_editor.connection.vendor in BACKENDS:
+        schema_editor.execute("DROP TABLE IF EXISTS action_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0010_occurrence'),
+        ('project', '0001_initial'),
+        ('category', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,186 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+        ('action', '0011_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='action',
+            name='description',
+            field=models.TextField(verbose_name='description'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='duration',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='duration'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='duration_unit',
+            field=models.CharField(blank=True, choices=[('w', 'week(s)'), ('d', 'day(s)'), ('h', 'hour(s)'), ('m', 'minute(s)')], max_length=1, null=True, verbose_name='duration unit'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='estimate',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='estimate'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='estimate_unit',
+            field=models.CharField(blank=True, choices=[('w', 'week(s)'), ('d', 'day(s)'), ('h', 'hour(s)'), ('m', 'minute(s)')], max_length=1, null=True, verbose_name='estimate unit'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='label',
+            field=models.CharField(max_length=48, verbose_name='label'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='name',
+            field=models.CharField(max_length=128, verbose_name='name'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='planned_on',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='planned on'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='priority',
+            field=models.CharField(choices=[('⇈', '⇈ Very high'), ('↑', '↑ High'), ('⇅', '⇅ Regular'), ('↓', '↓ Low'), ('⇊', '⇊ Very low')], default='⇅', max_length=1, verbose_name='priority'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='project',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='action_set', to='project.Project', verbose_name='project'),
+        ),
+        migrations.AlterField(
+            model_name='action',
+            name='status',
+            field=models.CharField(choices=[('A', 'Fuzzy'), ('B', 'Draft'), ('C', 'Planned'), ('D', 'In progress'), ('E', 'Archived'), ('V', 'Dropped (Archived)'), ('W', 'Dropped (In progress)'), ('X', 'Dropped (Planned)'), ('Y', 'Dropped (Draft)'), ('Z', 'Dropped (Fuzzy)')], default='A', max_length=1, verbose_name='status'),
+        ),
+        migrations.AlterField(
+            model_name='actionclosure',
+            name='ancestor',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_closure_set', to='action.Action', verbose_name='ancestor'),
+        ),
+        migrations.AlterField(
+            model_name='actionclosure',
+            name='descendant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_closure_set', to='action.Action', verbose_name='descendant'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='departure_time',
+            field=models.TimeField(blank=True, null=True, verbose_name='time'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='location',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='location'),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='send_reminder',
+            field=models.BooleanField(default=False, verbose_name='Do you want a reminder to be sent ?'),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='action',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='log_set', to='action.Action', verbose_name='action'),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='content',
+            field=models.TextField(verbose_name='content'),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='date',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='date'),
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='number',
+            field=models.PositiveSmallIntegerField(verbose_name='number'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='action',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='note_set', to='action.Action', verbose_name='action'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=models.TextField(verbose_name='content'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='number',
+            field=models.PositiveSmallIntegerField(verbose_name='number'),
+        ),
+        migrations.AlterField(
+            model_name='occurrence',
+            name='action',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='occurrence_set', to='action.RecurrentAction', verbose_name='action'),
+        ),
+        migrations.AlterField(
+            model_name='recurrentaction',
+            name='active',
+            field=models.BooleanField(verbose_name='active'),
+        ),
+        migrations.AlterField(
+            model_name='recurrentaction',
+            name='frequency',
+            field=models.CharField(choices=[('d', 'daily'), ('w', 'weekly'), ('m', 'monthly'), ('y', 'yearly')], max_length=1, verbose_name='frequency'),
+        ),
+        migrations.AlterField(
+            model_name='recurrentaction',
+            name='until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='until'),
+        ),
+        migrations.AlterField(
+            model_name='step',
+            name='action',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='step_set', to='action.Action', verbose_name='action'),
+        ),
+        migrations.AlterField(
+            model_name='step',
+            name='content',
+            field=models.TextField(verbose_name='content'),
+        ),
+        migrations.AlterField(
+            model_name='step',
+            name='number',
+            field=models.PositiveSmallIntegerField(verbose_name='number'),
+        ),
+        migrations.AlterField(
+            model_name='step',
+            name='planned_on',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='planned on'),
+        ),
+        migrations.AlterIndexTogether(
+            name='action',
+            index_together={('project', 'status', 'deadline'), ('planned_on', 'deadline', 'name')},
+        ),
+        migrations.AlterIndexTogether(
+            name='log',
+            index_together={('action', 'number')},
+        ),
+        migrations.AlterIndexTogether(
+            name='step',
+            index_together={('action', 'number')},
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(send_reminder=True), fields=['action_ptr', 'departure_time'], name='action_event_reminder_idx'),
+        ),
+    ]
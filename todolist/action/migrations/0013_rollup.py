@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+STATUS_BUCKETS = {
+    "A": "open", "B": "open", "C": "open", "D": "progress", "E": "archived",
+    "V": "dropped", "W": "dropped", "X": "dropped", "Y": "dropped", "Z": "dropped",
+}
+
+
+def fill_rollups(apps, schema_editor):
+    """Count the existing actions, see ActionRollupManager.rebuild and ActionRollup.STATUS_BUCKETS"""
+    action_model = apps.get_model("action", "Action")
+    rollup_model = apps.get_model("action", "ActionRollup")
+    alias = schema_editor.connection.alias
+    counts = {}
+    rows = action_model.objects.using(alias).order_by().values_list("project", "status")
+    for project_id, status, count in rows.annotate(count=models.Count("pk")):
+        key = (project_id, STATUS_BUCKETS[status])
+        counts[key] = counts.get(key, 0) + count
+    rollup_model.objects.using(alias).bulk_create([
+        rollup_model(project_id=project_id, bucket=bucket, count=count)
+        for (project_id, bucket), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0002_indexes'),
+        ('action', '0012_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActionRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(choices=[('open', 'open'), ('progress', 'in progress'), ('archived', 'archived'), ('dropped', 'dropped')], max_length=8, verbose_name='bucket')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+                ('project', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollup_set', to='project.Project', verbose_name='project')),
+            ],
+            options={
+                'verbose_name': 'action counter',
+                'verbose_name_plural': 'action counters',
+                'unique_together': {('project', 'bucket')},
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+"""Prefix indexes of the full-text search index, for autocomplete, see action.search (SQL copied as of then)"""
+
+from django.db import migrations
+
+
+CREATE = "CREATE VIRTUAL TABLE action_search USING fts5(title, body, notes{})"
+
+INSERT = """
+    INSERT INTO action_search (rowid, title, body, notes)
+    SELECT a.id,
+           c.name || ' ' || p.name || ' ' || a.label || ' ' || a.name || ' '
+           || coalesce(a.deadline, '') || ' ' || coalesce(a.planned_on, ''),
+           a.description,
+           coalesce((SELECT group_concat(content, ' ') FROM action_note WHERE action_id = a.id), '') || ' '
+           || coalesce((SELECT group_concat(content, ' ') FROM action_step WHERE action_id = a.id), '') || ' '
+           || coalesce((SELECT group_concat(content, ' ') FROM action_log WHERE action_id = a.id), '')
+    FROM action_action a
+    JOIN project_project p ON p.id = a.project_id
+    JOIN category_category c ON c.id = p.category_id
+"""
+
+
+def recreate_search_index(options):
+    """Recreate and fill the SQLite search index with those FTS5 options, that cannot be altered"""
+    def operation(apps, schema_editor):  # pylint: disable=unused-argument
+        if schema_editor.connection.vendor == "sqlite":
+            schema_editor.execute("DROP TABLE IF EXISTS action_search")
+            schema_editor.execute(CREATE.format(options))
+            schema_editor.execute(INSERT)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0013_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_search_index(", prefix='1 2 3 4'"), recreate_search_index("")),
+    ]
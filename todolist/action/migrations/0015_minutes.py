@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+UNIT_MINUTES = {"w": 7 * 24 * 60, "d": 24 * 60, "h": 60, "m": 1}
+
+
+def fill_minutes(apps, schema_editor):
+    """Convert the existing estimates and durations with one UPDATE, see Action.normalise_durations"""
+    action_model = apps.get_model("action", "Action")
+
+    def minutes(field_name):
+        return models.Case(
+            *(models.When(**{field_name + "_unit": unit}, then=models.F(field_name) * factor)
+              for unit, factor in UNIT_MINUTES.items()),
+            default=None,
+            output_field=models.PositiveIntegerField(),
+        )
+
+    action_model.objects.using(schema_editor.connection.alias).update(
+        estimate_minutes=minutes("estimate"), duration_minutes=minutes("duration")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0014_search_prefix'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='action',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='duration in minutes'),
+        ),
+        migrations.AddField(
+            model_name='action',
+            name='estimate_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='estimate in minutes'),
+        ),
+        migrations.RunPython(fill_minutes, migrations.RunPython.noop),
+    ]
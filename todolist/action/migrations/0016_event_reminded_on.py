@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:58
+
+from django.db import migrations, models
+from django.utils.timezone import now
+
+
+def mark_reminded(apps, schema_editor):
+    """Consider the reminders already due as sent by the previous worker, that did not record them"""
+    events = apps.get_model("action", "Event").objects.using(schema_editor.connection.alias)
+    events.filter(send_reminder=True).update(reminded_on=now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('action', '0015_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='reminded_on',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='reminded on'),
+        ),
+        migrations.RunPython(mark_reminded, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,16 @@
 """# Models"""
 
+from datetime import datetime, timedelta
+
+from django.contrib.contenttypes.models import ContentType
 from django.db.models import (
     Model,
+    Manager,
+    Index,
+    Q,
+    IntegerField,
     CharField,
+    PositiveIntegerField,
     PositiveSmallIntegerField,
     ForeignKey,
     SlugField,
@@ -15,11 +23,21 @@ from django.db.models import (
     CASCADE,
     PROTECT,
 )
+from django.conf import settings
+from django.db import router
+from django.db.transaction import atomic
 from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from django.utils.timezone import is_aware, localtime, now
 from django.utils.translation import ugettext_lazy as _
 
+from polymorphic.managers import PolymorphicManager
 from polymorphic.models import PolymorphicModel
 
+from action.closure import ActionClosureManager
+from action.querysets import ActionQuerySet
+from action.recurrence import expand
+from action.rollups import ActionRollupManager
 from project.models import Project
 
 
@@ -51,6 +69,27 @@ class Action(PolymorphicModel):
         ("Z", _("Dropped (Fuzzy)")),
     )
 
+    # Allowed status moves: along the workflow, to the dropped variant of a status and back
+    TRANSITIONS = {
+        "A": ("B", "C", "Z"),
+        "B": ("A", "C", "Y"),
+        "C": ("B", "D", "X"),
+        "D": ("C", "E", "W"),
+        "E": ("D", "V"),
+        "V": ("E",),
+        "W": ("D",),
+        "X": ("C",),
+        "Y": ("B",),
+        "Z": ("A",),
+    }
+
+    # Dropped variants can only move back to their status, the last workflow status (archived) is done
+    WORKFLOW_STATUSES = tuple(status for status, moves in TRANSITIONS.items() if len(moves) > 1)
+    OPEN_STATUSES = WORKFLOW_STATUSES[:-1]
+
+    # Fields whose changes are written to the log book, see action.audit
+    TRACKED_FIELDS = ("priority", "status", "deadline", "planned_on")
+
     TIME_DELTA_UNITS = (
         ("w", _("week(s)")),
         ("d", _("day(s)")),
@@ -58,10 +97,13 @@ class Action(PolymorphicModel):
         ("m", _("minute(s)")),
     )
 
+    UNIT_MINUTES = {"w": 7 * 24 * 60, "d": 24 * 60, "h": 60, "m": 1}  # Calendar time
+
     @cached_property
     def type(self):
         """Work around to get quickly, efficiently and reliably the polymorphic type of this contact."""
-        return self.polymorphic_ctype.name
+        # The content type manager keeps an in-process id → content type map: no query once warmed up
+        return ContentType.objects.db_manager(self._state.db).get_for_id(self.polymorphic_ctype_id).name
 
     project = ForeignKey(
         verbose_name=_("project"),
@@ -69,7 +111,7 @@ class Action(PolymorphicModel):
         to=Project,
         blank=False,
         null=False,
-        db_index=True,
+        db_index=False,
         on_delete=PROTECT,
     )
 
@@ -79,7 +121,6 @@ class Action(PolymorphicModel):
         choices=PRIORITIES,
         blank=False,
         default="⇅",
-        db_index=True,
     )
 
     status = CharField(
@@ -88,7 +129,6 @@ class Action(PolymorphicModel):
         choices=STATUSES,
         blank=False,
         default="A",
-        db_index=True,
     )
 
     deadline = DateField(
@@ -103,7 +143,6 @@ class Action(PolymorphicModel):
         max_length=48,
         blank=False,
         null=False,
-        db_index=True,
     )
 
     name = CharField(
@@ -111,28 +150,24 @@ class Action(PolymorphicModel):
         max_length=128,
         blank=False,
         null=False,
-        db_index=True,
     )
 
     description = TextField(
         verbose_name=_("description"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     planned_on = DateTimeField(
         verbose_name=_("planned on"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     estimate = PositiveSmallIntegerField(
         verbose_name=_("estimate"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     estimate_unit = CharField(
@@ -141,7 +176,6 @@ class Action(PolymorphicModel):
         choices=TIME_DELTA_UNITS,
         blank=True,
         null=True,
-        db_index=True,
     )
 
     @property
@@ -155,7 +189,6 @@ class Action(PolymorphicModel):
         verbose_name=_("duration"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     duration_unit = CharField(
@@ -164,7 +197,6 @@ class Action(PolymorphicModel):
         choices=TIME_DELTA_UNITS,
         blank=True,
         null=True,
-        db_index=True,
     )
 
     @property
@@ -174,6 +206,21 @@ class Action(PolymorphicModel):
             return '-'
         return f"{self.duration} {self.get_duration_unit_display()}"
 
+    # Estimate and duration in minutes, kept in sync by save() so that they can be summed by the database
+    estimate_minutes = PositiveIntegerField(
+        verbose_name=_("estimate in minutes"),
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    duration_minutes = PositiveIntegerField(
+        verbose_name=_("duration in minutes"),
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
     slug = SlugField(
         unique=True,
         max_length=32,
@@ -189,6 +236,24 @@ class Action(PolymorphicModel):
         blank=True,
     )
 
+    note_counter = PositiveIntegerField(
+        verbose_name=_("note counter"),
+        default=0,
+        editable=False,
+    )
+
+    step_counter = PositiveIntegerField(
+        verbose_name=_("step counter"),
+        default=0,
+        editable=False,
+    )
+
+    log_counter = PositiveIntegerField(
+        verbose_name=_("log counter"),
+        default=0,
+        editable=False,
+    )
+
     def __str__(self):
         """Human readable representation"""
         return self.name
@@ -197,6 +262,78 @@ class Action(PolymorphicModel):
         """Technical representation"""
         return "<{} {}>".format(self._meta.object_name, self.name)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the stored project and status, the rollup deltas of the next save depend on them,
+        and the stored values of the tracked fields, the log of the next save depends on them.
+        """
+        instance = super().from_db(db, field_names, values)
+        if "project_id" in instance.__dict__ and "status" in instance.__dict__:
+            instance._rollup_key = (instance.project_id, instance.status)  # pylint: disable=protected-access
+        instance._tracked = {  # pylint: disable=protected-access
+            name: instance.__dict__[name] for name in cls.TRACKED_FIELDS if name in instance.__dict__
+        }
+        return instance
+
+    @classmethod
+    def minutes(cls, value, unit):
+        """Minutes of a number of units, None when unknown"""
+        return value * cls.UNIT_MINUTES[unit] if value is not None and unit else None
+
+    @classmethod
+    def minutes_label(cls, minutes):
+        """Human readable total of minutes, e.g. 1 week(s) 2 hour(s)"""
+        parts = []
+        for unit, label in cls.TIME_DELTA_UNITS:
+            count, minutes = divmod(minutes or 0, cls.UNIT_MINUTES[unit])
+            if count:
+                parts.append("{} {}".format(count, label))
+        return " ".join(parts) or "-"
+
+    def normalise_durations(self):
+        """Compute the estimate and duration in minutes"""
+        self.estimate_minutes = self.minutes(self.estimate, self.estimate_unit)
+        self.duration_minutes = self.minutes(self.duration, self.duration_unit)
+
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        """Save in a transaction, along with what the signals maintain (e.g. the rollup counters)"""
+        self.normalise_durations()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            if {"estimate", "estimate_unit"}.intersection(update_fields):
+                update_fields = set(update_fields) | {"estimate_minutes"}
+            if {"duration", "duration_unit"}.intersection(update_fields):
+                update_fields = set(update_fields) | {"duration_minutes"}
+            kwargs["update_fields"] = update_fields
+        with atomic(using=kwargs.get("using") or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+
+    def tracked_changes(self):
+        """[(name, stored value, current value)] of the tracked fields changed since the action was loaded"""
+        return [
+            (name, stored, getattr(self, name)) for name, stored in getattr(self, "_tracked", {}).items()
+            if getattr(self, name) != stored
+        ]
+
+    @classmethod
+    def describe_change(cls, name, old, new):
+        """Log book line of the change of a field, e.g. "Status: Planned → In progress\""""
+        field = cls._meta.get_field(name)  # pylint: disable=no-member
+
+        def display(value):
+            if value is None:
+                return "–"
+            if field.choices:
+                return str(dict(field.flatchoices).get(value, value))
+            if isinstance(value, datetime):  # Stored: ISO formats, whatever the language of the request
+                return (localtime(value) if is_aware(value) else value).strftime("%Y-%m-%d %H:%M")
+            return str(value)
+
+        return "{}: {} → {}".format(capfirst(field.verbose_name), display(old), display(new))
+
+    objects = PolymorphicManager.from_queryset(ActionQuerySet)()
+
     class Meta:  # pylint: disable=too-few-public-methods
         """Action Meta class"""
 
@@ -205,11 +342,133 @@ class Action(PolymorphicModel):
         ordering = ("-planned_on", "-deadline", "name")
         index_together = (
             ("planned_on", "deadline", "name"),
-            ("project", "label"),
-            ("project", "name"),
+            ("project", "status", "deadline"),
         )
 
 
+class ActionClosure(Model):
+    """
+    ## Dependency closure
+
+    Materialized transitive closure of the action dependencies.
+    There is one row per action (descendant) and per action it transitively depends on (ancestor),
+    with the length of the shortest dependency path between them.
+    This table is maintained by signals, it should never be edited by hand.
+    """
+
+    ancestor = ForeignKey(
+        verbose_name=_("ancestor"),
+        related_name="descendant_closure_set",
+        to=Action,
+        blank=False,
+        null=False,
+        db_index=False,
+        on_delete=CASCADE,
+    )
+
+    descendant = ForeignKey(
+        verbose_name=_("descendant"),
+        related_name="ancestor_closure_set",
+        to=Action,
+        blank=False,
+        null=False,
+        db_index=False,
+        on_delete=CASCADE,
+    )
+
+    depth = PositiveIntegerField(
+        verbose_name=_("depth"),
+        blank=False,
+        null=False,
+    )
+
+    objects = ActionClosureManager()
+
+    def __repr__(self):
+        """Technical representation"""
+        return "<{} {}→{}>".format(self._meta.object_name, self.ancestor_id, self.descendant_id)
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """ActionClosure Meta class"""
+
+        verbose_name = _("dependency closure")
+        verbose_name_plural = _("dependency closures")
+        unique_together = (("ancestor", "descendant"),)
+        index_together = (("descendant", "ancestor"),)
+
+
+class ActionRollup(Model):
+    """
+    ## Action counters
+
+    Denormalised number of actions per project and status bucket, so that project and category
+    lists show them without scanning the actions. Signals apply the status transitions of every
+    saved or deleted action, the rebuild_rollups command recomputes the whole table.
+    """
+
+    BUCKETS = (
+        ("open", _("open")),
+        ("progress", _("in progress")),
+        ("archived", _("archived")),
+        ("dropped", _("dropped")),
+    )
+
+    STATUS_BUCKETS = {
+        "A": "open",
+        "B": "open",
+        "C": "open",
+        "D": "progress",
+        "E": "archived",
+        "V": "dropped",
+        "W": "dropped",
+        "X": "dropped",
+        "Y": "dropped",
+        "Z": "dropped",
+    }
+
+    @classmethod
+    def bucket_of(cls, status):
+        """Bucket counting the actions of a status"""
+        return cls.STATUS_BUCKETS[status]
+
+    project = ForeignKey(
+        verbose_name=_("project"),
+        related_name="rollup_set",
+        to=Project,
+        blank=False,
+        null=False,
+        db_index=False,
+        on_delete=CASCADE,
+    )
+
+    bucket = CharField(
+        _("bucket"),
+        max_length=8,
+        choices=BUCKETS,
+        blank=False,
+    )
+
+    count = IntegerField(
+        verbose_name=_("count"),
+        blank=False,
+        null=False,
+        default=0,
+    )
+
+    objects = ActionRollupManager()
+
+    def __repr__(self):
+        """Technical representation"""
+        return "<{} {} {}={}>".format(self._meta.object_name, self.project_id, self.bucket, self.count)
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """ActionRollup Meta class"""
+
+        verbose_name = _("action counter")
+        verbose_name_plural = _("action counters")
+        unique_together = (("project", "bucket"),)
+
+
 class Event(Action):
     """
     ## Event model
@@ -222,20 +481,24 @@ class Event(Action):
         max_length=64,
         blank=True,
         null=True,
-        db_index=True,
     )
 
     departure_time = TimeField(
         verbose_name=_("time"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     send_reminder = BooleanField(
         verbose_name=_("Do you want a reminder to be sent ?"),
         default=False,
-        db_index=True,
+    )
+
+    reminded_on = DateTimeField(
+        verbose_name=_("reminded on"),
+        blank=True,
+        null=True,
+        editable=False,
     )
 
     class Meta(Action.Meta):  # pylint: disable=too-few-public-methods
@@ -243,6 +506,14 @@ class Event(Action):
 
         verbose_name = _("event")
         verbose_name_plural = _("events")
+        indexes = (
+            # Only the few events with a reminder are indexed, see ReminderScheduler.load
+            Index(
+                fields=("action_ptr", "departure_time"),
+                name="action_event_reminder_idx",
+                condition=Q(send_reminder=True),
+            ),
+        )
 
 
 class RecurrentAction(Action):
@@ -259,25 +530,24 @@ class RecurrentAction(Action):
         ("y", _("yearly")),
     )
 
+    RECURRENCE_FIELDS = ("planned_on", "frequency", "count", "until", "active")
+
     frequency = CharField(
         verbose_name=_("frequency"),
         max_length=1,
         blank=False,
         null=False,
-        db_index=True,
         choices=FREQUENCY,
     )
 
     active = BooleanField(
         verbose_name=_("active"),
-        db_index=True,
     )
 
     until = DateTimeField(
         verbose_name=_("until"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     count = PositiveSmallIntegerField(
@@ -286,6 +556,28 @@ class RecurrentAction(Action):
         null=False,
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Also remember the stored recurrence, the occurrences are refreshed only when it changes"""
+        instance = super().from_db(db, field_names, values)
+        instance.remember_recurrence()
+        return instance
+
+    def remember_recurrence(self, names=RECURRENCE_FIELDS):
+        """Remember the current values of the (loaded) recurrence fields"""
+        stored = dict(getattr(self, "_recurrence", None) or {})
+        stored.update((name, self.__dict__[name]) for name in names if name in self.__dict__)
+        self._recurrence = stored  # pylint: disable=attribute-defined-outside-init
+
+    def recurrence_changed(self, names=RECURRENCE_FIELDS):
+        """Whether some of the recurrence fields changed since they were loaded, always when they were not"""
+        stored = getattr(self, "_recurrence", None)
+        if stored is None:
+            return True
+        return any(
+            name in self.__dict__ and (name not in stored or self.__dict__[name] != stored[name]) for name in names
+        )
+
     class Meta(Action.Meta):  # pylint: disable=too-few-public-methods
         """RecurrentAction Meta class"""
 
@@ -293,6 +585,84 @@ class RecurrentAction(Action):
         verbose_name_plural = _("recurrent actions")
 
 
+class OccurrenceManager(Manager):
+    """Maintenance and queries of the materialized occurrences"""
+
+    @staticmethod
+    def window():
+        """Materialized [start, end) window, set by RECURRENCE_PAST_DAYS and RECURRENCE_FUTURE_DAYS settings"""
+        today = now()
+        return (
+            today - timedelta(days=getattr(settings, "RECURRENCE_PAST_DAYS", 31)),
+            today + timedelta(days=getattr(settings, "RECURRENCE_FUTURE_DAYS", 366)),
+        )
+
+    def refresh(self, actions):
+        """Replace the materialized occurrences of the given recurrent actions"""
+        start, end = self.window()
+        with atomic(using=self.db):
+            self.filter(action__in=[action.pk for action in actions]).delete()
+            self.bulk_create([
+                self.model(action=action, number=number, date=date)
+                for date, number, action in expand(actions, start, end)
+            ])
+
+    def between(self, start, end):
+        """Occurrences in [start, end), answered by a range scan on the date index"""
+        return self.filter(date__gte=start, date__lt=end).select_related("action")
+
+
+class Occurrence(Model):
+    """
+    ## Recurrent action occurrence
+
+    Materialized occurrence of a recurrent action, so that calendars are simple range queries.
+    Only a window around today is materialized: it is refreshed when a recurrent action is saved,
+    and should be moved forward regularly with the refresh_occurrences command.
+    """
+
+    action = ForeignKey(
+        verbose_name=_("action"),
+        related_name="occurrence_set",
+        to=RecurrentAction,
+        blank=False,
+        null=False,
+        db_index=False,
+        on_delete=CASCADE,
+    )
+
+    number = PositiveIntegerField(
+        verbose_name=_("number"),
+        blank=False,
+        null=False,
+    )
+
+    date = DateTimeField(
+        verbose_name=_("date"),
+        blank=False,
+        null=False,
+        db_index=True,
+    )
+
+    objects = OccurrenceManager()
+
+    def __str__(self):
+        """Human readable representation"""
+        return "{} #{}".format(self.action, self.number)
+
+    def __repr__(self):
+        """Technical representation"""
+        return "<{} {} #{}>".format(self._meta.object_name, self.action_id, self.number)
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """Occurrence Meta class"""
+
+        verbose_name = _("occurrence")
+        verbose_name_plural = _("occurrences")
+        ordering = ("date",)
+        unique_together = (("action", "number"),)
+
+
 class Note(Model):
     """
     ## Financial transaction
@@ -306,7 +676,7 @@ class Note(Model):
         to=Action,
         blank=False,
         null=False,
-        db_index=True,
+        db_index=False,
         on_delete=CASCADE,
     )
 
@@ -314,14 +684,12 @@ class Note(Model):
         verbose_name=_("number"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     content = TextField(
         verbose_name=_("content"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     def __str__(self):
@@ -356,7 +724,7 @@ class Step(Model):
         to=Action,
         blank=False,
         null=False,
-        db_index=True,
+        db_index=False,
         on_delete=CASCADE,
     )
 
@@ -364,21 +732,18 @@ class Step(Model):
         verbose_name=_("number"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     planned_on = DateTimeField(
         verbose_name=_("planned on"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     content = TextField(
         verbose_name=_("content"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     def __str__(self):
@@ -395,6 +760,9 @@ class Step(Model):
         verbose_name = _("step")
         verbose_name_plural = _("steps")
         ordering = ("planned_on", "id")
+        index_together = (
+            ("action", "number"),
+        )
 
 
 class Log(Model):
@@ -410,7 +778,7 @@ class Log(Model):
         to=Action,
         blank=False,
         null=False,
-        db_index=True,
+        db_index=False,
         on_delete=CASCADE,
     )
 
@@ -418,21 +786,18 @@ class Log(Model):
         verbose_name=_("number"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     date = DateTimeField(
         verbose_name=_("date"),
         blank=True,
         null=True,
-        db_index=True,
     )
 
     content = TextField(
         verbose_name=_("content"),
         blank=False,
         null=False,
-        db_index=True,
     )
 
     def __str__(self):
@@ -449,3 +814,6 @@ class Log(Model):
         verbose_name = _("log")
         verbose_name_plural = _("log book")
         ordering = ("date", "id")
+        index_together = (
+            ("action", "number"),
+        )
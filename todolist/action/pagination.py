@@ -0,0 +1,209 @@
+"""
+# Keyset pagination
+
+OFFSET pagination reads and drops every row before the requested page, and the admin counts the whole table
+on every page view. Action changelists are instead paginated by seeking: the next page starts after the
+ordering key (planned_on, deadline, name, id by default) of the last row of the current one, so that any page
+costs the same as the first one. The cursor is carried in the query string, with links to the previous and
+next pages only.
+
+Above the ADMIN_COUNT_THRESHOLD setting (10000), the row count of an unfiltered list is estimated from the
+database statistics (ANALYZE), a filtered list is estimated by the query planner when the database has one.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+CURSOR_VAR = "cursor"
+
+AFTER, BEFORE = "a", "b"
+
+
+def ordering_keys(queryset):
+    """[(field, descending)] of the ordering of a queryset, None when it is not made of plain local fields"""
+    opts = queryset.model._meta  # pylint: disable=protected-access
+    keys = []
+    for item in queryset.query.order_by:
+        if not isinstance(item, str) or "__" in item or item == "?":
+            return None
+        name = item.lstrip("-")
+        if name in queryset.query.extra_select or name in queryset.query.annotations:
+            return None
+        field = opts.pk if name == "pk" else opts.get_field(name)
+        if field.is_relation and not field.primary_key:
+            return None
+        keys.append((field, item.startswith("-")))
+    if not keys or not keys[-1][0].primary_key:
+        return None
+    return keys
+
+
+def seek(keys, values, nulls_largest):
+    """Condition selecting the rows after the values of the keys (NULL aware)"""
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (field, descending), value in zip(keys, values):
+        name = "pk" if field.primary_key else field.name
+        nulls_after = descending != nulls_largest
+        if value is None:
+            if not nulls_after:  # Every value comes after NULL
+                condition |= equal & Q(**{name + "__isnull": False})
+            equal &= Q(**{name + "__isnull": True})
+            continue
+        after = Q(**{name + ("__lt" if descending else "__gt"): value})
+        if nulls_after:
+            after |= Q(**{name + "__isnull": True})
+        condition |= equal & after
+        equal &= Q(**{name: value})
+    return condition
+
+
+def encode_cursor(direction, values):
+    """Query string token of a position"""
+    values = [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+    return urlsafe_b64encode(json.dumps([direction] + values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, keys):
+    """(direction, values) of a query string token, InvalidPage when it is not valid"""
+    try:
+        direction, *values = json.loads(urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if direction not in (AFTER, BEFORE) or len(values) != len(keys):
+            raise ValueError(token)
+        return direction, [
+            None if value is None else field.to_python(value) for (field, _), value in zip(keys, values)
+        ]
+    except (Base64Error, TypeError, ValueError, ValidationError):
+        raise InvalidPage("Invalid cursor")
+
+
+def estimate_count(queryset):
+    """Row count of a queryset from the database statistics, None when there are none"""
+    connection = connections[queryset.db]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql" and queryset.query.where:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                return int(cursor.fetchone()[0][0]["Plan"]["Plan Rows"])
+            if queryset.query.where:
+                return None
+            table = queryset.model._meta.db_table  # pylint: disable=protected-access
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table])
+            elif connection.vendor == "sqlite":
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:  # e.g. no sqlite_stat1 table before the first ANALYZE
+        return None
+    if row is None:
+        return None
+    count = int(float(str(row[0]).split()[0]))
+    return count if count > 0 else None
+
+
+class KeysetPaginator(Paginator):
+    """
+    ## Seek paginator
+
+    Pages are selected by a cursor instead of a number when the ordering allows it (see ordering_keys),
+    the page number is ignored then. next_cursor and previous_cursor are set by page().
+    """
+
+    def __init__(self, object_list, per_page, cursor=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cursor = cursor
+        self.estimated = False
+        self.next_cursor = self.previous_cursor = None
+
+    @cached_property
+    def keys(self):
+        """Ordering keys, None when the list has to be paginated by offset"""
+        return ordering_keys(self.object_list)
+
+    @cached_property
+    def count(self):
+        """Exact number of rows up to the threshold, estimated beyond when the database can tell"""
+        threshold = getattr(settings, "ADMIN_COUNT_THRESHOLD", 10000)
+        rows = self.object_list.order_by().values("pk")  # Without the annotations of the list columns
+        count = rows[:threshold + 1].count()
+        if count <= threshold:
+            return count
+        estimate = estimate_count(rows)
+        if estimate is None:
+            return rows.count()
+        self.estimated = True
+        return max(estimate, count)
+
+    def page(self, number):
+        """Page after (or before) the cursor"""
+        if self.keys is None:
+            return super().page(number)
+
+        queryset = self.object_list
+        direction = AFTER
+        if self.cursor:
+            direction, values = decode_cursor(self.cursor, self.keys)
+            keys = [(field, descending != (direction == BEFORE)) for field, descending in self.keys]
+            queryset = queryset.filter(seek(keys, values, connections[queryset.db].features.nulls_order_largest))
+        if direction == BEFORE:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BEFORE:
+            rows.reverse()
+
+        if rows and (more or direction == BEFORE):
+            self.next_cursor = encode_cursor(AFTER, self.values(rows[-1]))
+        if rows and (more if direction == BEFORE else self.cursor):
+            self.previous_cursor = encode_cursor(BEFORE, self.values(rows[0]))
+        return Page(rows, 1, self)
+
+    def values(self, row):
+        """Ordering key values of a row"""
+        return [getattr(row, field.attname) for field, _ in self.keys]
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ## Changelist paginated by cursor
+
+    The cursor is not a lookup, and is dropped from every link but the previous and next page ones.
+    """
+
+    previous_url = next_url = None
+
+    def get_filters_params(self, params=None):
+        """Lookups of the query string"""
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        """Query string of a link, without the cursor unless given"""
+        if CURSOR_VAR not in (new_params or {}):
+            remove = list(remove or ()) + [CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        """Results, with the previous and next page links when paginated by cursor"""
+        super().get_results(request)
+        self.keyset = self.paginator.keys is not None  # pylint: disable=attribute-defined-outside-init
+        if self.paginator.previous_cursor:
+            self.previous_url = self.get_query_string({CURSOR_VAR: self.paginator.previous_cursor})
+        if self.paginator.next_cursor:
+            self.next_url = self.get_query_string({CURSOR_VAR: self.paginator.next_cursor})
@@ -0,0 +1,206 @@
+"""
+# Action queries
+
+Querysets of the actions. Models are looked up from the application registry, this module being imported by
+the models.
+"""
+
+import sqlite3
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Sum
+from django.db.transaction import atomic
+from django.utils.timezone import now
+from django.utils.translation import ugettext_lazy as _
+
+from polymorphic.query import PolymorphicQuerySet
+
+from action import search
+from todolist import changes
+
+
+USED_DATES_VERSION_KEY = "action:used-dates"
+
+RETURNING_UPDATE = "UPDATE {table} SET {counter} = {counter} + %s WHERE {pk} = %s RETURNING {counter}"
+
+
+def forget_used_dates():
+    """Invalidate every cached list of used dates, see ActionQuerySet.used_dates"""
+    try:
+        cache.incr(USED_DATES_VERSION_KEY)
+    except ValueError:  # Not cached yet (or evicted)
+        cache.set(USED_DATES_VERSION_KEY, 1, None)
+
+
+def returns_updated_rows(connection):
+    """Tell whether the database engine of a connection answers UPDATE ... RETURNING"""
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 35)
+    return False
+
+
+class ActionQuerySet(PolymorphicQuerySet):
+    """Action specific queries"""
+
+    def used_dates(self, field_name, kind="month"):
+        """
+        Distinct dates (truncated to kind) used in a field by all the actions of this model.
+
+        The list is cached until an action is saved or deleted, so that list filters do not scan the table.
+        """
+        version = cache.get_or_set(USED_DATES_VERSION_KEY, 1, None)
+        model = self.model._meta.label_lower  # pylint: disable=protected-access
+        key = "{}:{}:{}:{}:{}".format(USED_DATES_VERSION_KEY, version, model, field_name, kind)
+        dates = cache.get(key)
+        if dates is None:
+            dates = list(self.model.objects.non_polymorphic().dates(field_name, kind, order="DESC"))
+            cache.set(key, dates, None)
+        return dates
+
+    def shallow(self):
+        """
+        Base action rows only, without the extra query per child model needed to upcast them.
+
+        This is enough for listings that only use base columns and the type label.
+        """
+        return self.non_polymorphic()
+
+    def ancestors_of(self, action):
+        """Actions the given action transitively depends on"""
+        return self.filter(descendant_closure_set__descendant=action)
+
+    def blocked_by(self, action):
+        """Actions transitively blocked by the given action"""
+        return self.filter(ancestor_closure_set__ancestor=action)
+
+    def reserve_numbers(self, action_id, model, count=1):
+        """
+        Reserve count consecutive numbers of an inline model (Note, Step or Log) for an action.
+
+        The counter is bumped by a single UPDATE, that locks the action row until the end of the transaction,
+        so concurrent reservations never get the same numbers. The UPDATE returns the new counter where the
+        database engine can (UPDATE ... RETURNING, see returns_updated_rows), a reservation is then one query,
+        two otherwise. Return the first reserved number.
+        """
+        counter = "{}_counter".format(model._meta.model_name)  # pylint: disable=protected-access
+        connection = connections[self.db]
+        if returns_updated_rows(connection):
+            opts = self.model._meta.get_field(counter).model._meta  # pylint: disable=protected-access
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(RETURNING_UPDATE.format(
+                    table=quote(opts.db_table), counter=quote(counter), pk=quote(opts.pk.column)
+                ), [count, action_id])
+                row = cursor.fetchone()
+            if row is None:
+                raise self.model.DoesNotExist("Unknown action: {}".format(action_id))
+            return row[0] - count + 1
+        with atomic(using=self.db, savepoint=False):
+            self.filter(pk=action_id).update(**{counter: F(counter) + count})
+            last = self.non_polymorphic().filter(pk=action_id).values_list(counter, flat=True).get()
+        return last - count + 1
+
+    def transition(self, ids, status=None, priority=None):
+        """
+        Move actions to a status and/or a priority, in a constant number of queries whatever their number.
+
+        Every status move must be allowed by Action.TRANSITIONS, otherwise nothing changes and a ValidationError
+        is raised. The changed actions are updated by a single UPDATE, that also reserves the number of the log
+        describing the change of each of them, then the logs are inserted in bulk. Actions already in the target
+        state are left alone. Return the ids of the changed actions.
+        """
+        ids = set(ids)
+        if status is not None and status not in dict(self.model.STATUSES):
+            raise ValidationError(_("Unknown status: %(status)s."), code="status", params={"status": status})
+        if priority is not None and priority not in dict(self.model.PRIORITIES):
+            raise ValidationError(_("Unknown priority: %(priority)s."), code="priority", params={"priority": priority})
+
+        action_model, log_model = apps.get_model("action", "Action"), apps.get_model("action", "Log")
+        actions = action_model.objects.db_manager(self.db).non_polymorphic()
+        with atomic(using=self.db):
+            rows = self.non_polymorphic().select_for_update().filter(pk__in=ids)
+            stored = {pk: (project_id, old_status, old_priority) for pk, project_id, old_status, old_priority
+                      in rows.values_list("pk", "project", "status", "priority")}
+            if len(stored) != len(ids):
+                missing = ", ".join(str(pk) for pk in sorted(ids - set(stored), key=str))
+                raise ValidationError(_("Unknown actions: %(ids)s."), code="missing", params={"ids": missing})
+            refused = sorted(pk for pk, (_project_id, old_status, _priority) in stored.items()
+                             if status not in (None, old_status) and status not in self.model.TRANSITIONS[old_status])
+            if refused:
+                raise ValidationError(
+                    _("Actions %(ids)s cannot move to this status."),
+                    code="transition",
+                    params={"ids": ", ".join(str(pk) for pk in refused)},
+                )
+
+            changed = sorted(pk for pk, (_project_id, old_status, old_priority) in stored.items()
+                             if status not in (None, old_status) or priority not in (None, old_priority))
+            if not changed:
+                return []
+            values = {"log_counter": F("log_counter") + 1}
+            values.update({name: value for name, value in (("status", status), ("priority", priority)) if value})
+            actions.filter(pk__in=changed).update(**values)
+
+            numbers = dict(actions.filter(pk__in=changed).values_list("pk", "log_counter"))
+            date, deltas, logs = now(), Counter(), []
+            for pk in changed:
+                project_id, old_status, old_priority = stored[pk]
+                moves = []
+                if status not in (None, old_status):
+                    deltas[(project_id, old_status)] -= 1
+                    deltas[(project_id, status)] += 1
+                    moves.append(self.model.describe_change("status", old_status, status))
+                if priority not in (None, old_priority):
+                    moves.append(self.model.describe_change("priority", old_priority, priority))
+                logs.append(log_model(action_id=pk, number=numbers[pk], date=date, content=", ".join(moves)))
+            log_model.objects.db_manager(self.db).bulk_create(logs)
+            apps.get_model("action", "ActionRollup").objects.db_manager(self.db).apply(deltas)
+
+            backend = search.get_backend(self.db)
+            if backend is not None:
+                backend.index_notes(changed)
+        changes.touch(action_model, log_model)
+        return changed
+
+    def time_totals(self, *fields):
+        """
+        Total estimate and duration in minutes (estimate_total, duration_total), summed by the database.
+
+        Without fields, return the totals of the whole queryset, else a row of totals per distinct values of the
+        fields, e.g. time_totals("project"). The columns of the other annotations are not selected, so that they
+        are not computed.
+        """
+        totals = {"estimate_total": Sum("estimate_minutes"), "duration_total": Sum("duration_minutes")}
+        if not fields:
+            return self.order_by().values("estimate_minutes", "duration_minutes").aggregate(**totals)
+        return self.order_by().values(*fields).annotate(**totals).order_by(*fields)
+
+    def project_time_totals(self):
+        """Total estimate and duration of each project"""
+        return self.time_totals("project")
+
+    def category_time_totals(self):
+        """Total estimate and duration of each category"""
+        return self.time_totals("project__category")
+
+    def status_time_totals(self):
+        """Total estimate and duration of each status"""
+        return self.time_totals("status")
+
+    def assign_numbers(self, instances):
+        """Number new notes, steps or logs with one reserved block per action and model"""
+        blocks = defaultdict(list)
+        for instance in instances:
+            if instance.number is None:
+                blocks[(type(instance), instance.action_id)].append(instance)
+
+        for (model, action_id), block in blocks.items():
+            first = self.reserve_numbers(action_id, model, len(block))
+            for offset, instance in enumerate(block):
+                instance.number = first + offset
@@ -0,0 +1,142 @@
+"""
+# Recurrence engine
+
+Occurrences of recurrent actions are computed from `planned_on` (the first occurrence), `frequency`,
+`count` (number of occurrences, 0 for no limit) and `until`, only while the action is `active`.
+
+The date of the nth occurrence is computed directly (closed form), so the first occurrence of a window
+is found without walking the previous ones: occurrences of one action are generated on demand,
+those of many actions are expanded in bulk, by frequency group.
+Date arithmetic is done on local wall-clock time, so that a daily action at 9:00 stays at 9:00 across DST.
+"""
+
+from calendar import monthrange
+from datetime import datetime, timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils.timezone import get_current_timezone, is_aware, localtime, make_aware, utc
+
+
+PERIODS = {"d": timedelta(days=1), "w": timedelta(weeks=1)}
+
+MONTHS = {"m": 1, "y": 12}
+
+NAIVE_EPOCH = datetime(1970, 1, 1)
+
+EPOCH = NAIVE_EPOCH.replace(tzinfo=utc)
+
+
+def to_local(value):
+    """Naive local wall-clock time"""
+    return localtime(value).replace(tzinfo=None) if is_aware(value) else value
+
+
+def shift(start, frequency, index):
+    """Naive date of the occurrence number index (0 being start itself)"""
+    if frequency in PERIODS:
+        return start + PERIODS[frequency] * index
+    year, month = divmod(start.month - 1 + MONTHS[frequency] * index, 12)
+    year, month = start.year + year, month + 1
+    return start.replace(year=year, month=month, day=min(start.day, monthrange(year, month)[1]))
+
+
+def first_index(start, frequency, after):
+    """Index of the first occurrence that is not before after (naive dates)"""
+    if after <= start:
+        return 0
+    if frequency in PERIODS:
+        period = PERIODS[frequency]
+        return -((start - after) // period)
+    index = ((after.year - start.year) * 12 + after.month - start.month) // MONTHS[frequency]
+    while shift(start, frequency, index) < after:
+        index += 1
+    return index
+
+
+def occurrences(action, start=None, end=None):
+    """
+    Lazily yield (number, date) for each occurrence of a recurrent action in [start, end).
+
+    Numbers start at 1. Without end, count nor until, the generator never stops.
+    """
+    if not action.active or action.planned_on is None:
+        return
+    aware = is_aware(action.planned_on)
+    origin = to_local(action.planned_on)
+    index = 0 if start is None else first_index(origin, action.frequency, to_local(start))
+
+    while not action.count or index < action.count:
+        date = shift(origin, action.frequency, index)
+        if aware:
+            date = make_aware(date, is_dst=False)
+        if (end is not None and date >= end) or (action.until is not None and date > action.until):
+            return
+        index += 1
+        yield index, date
+
+
+def aware_dates(dates):
+    """
+    UTC datetimes of naive local ones, as make_aware(date, is_dst=False) gives them.
+
+    The UTC offset is looked up once per local minute, offsets only change on minute boundaries:
+    occurrences share few of them, and localizing each date would cost more than the rest of the expansion.
+    """
+    timezone = get_current_timezone()
+    offsets = {}
+    aware = []
+    for date in dates:
+        minute = date.toordinal() * 1440 + date.hour * 60 + date.minute
+        offset = offsets.get(minute)
+        if offset is None:
+            offset = offsets[minute] = make_aware(date, timezone, is_dst=False).utcoffset()
+        aware.append(EPOCH + (date - NAIVE_EPOCH - offset))
+    return aware
+
+
+def stop_index(action, origin, end):
+    """Index of the first occurrence of a recurrent action not in [..., end), count and until, in closed form"""
+    stop = first_index(origin, action.frequency, to_local(end))
+    if action.count:
+        stop = min(stop, action.count)
+    if action.until is not None:
+        until = to_local(action.until)
+        after = first_index(origin, action.frequency, until)
+        stop = min(stop, after + 1 if shift(origin, action.frequency, after) == until else after)
+    return stop
+
+
+def expand(actions, start, end):
+    """
+    List (date, number, action) for the occurrences of many recurrent actions in [start, end), by date.
+
+    The index bounds of each action are computed in closed form, then the dates of each frequency group
+    in bulk: one addition per occurrence for days and weeks, one month shift for months and years.
+    A single sort orders them.
+    """
+    groups = {}
+    for action in actions:
+        if action.active and action.planned_on is not None:
+            origin = to_local(action.planned_on)
+            first = 0 if start is None else first_index(origin, action.frequency, to_local(start))
+            groups.setdefault(action.frequency, []).append((action, origin, first, stop_index(action, origin, end)))
+
+    expanded = []
+    for frequency, bounds in groups.items():
+        if frequency in PERIODS:
+            period = PERIODS[frequency]
+            expanded.extend(
+                (origin + period * index, index + 1, action)
+                for action, origin, first, stop in bounds for index in range(first, stop)
+            )
+        else:
+            expanded.extend(
+                (shift(origin, frequency, index), index + 1, action)
+                for action, origin, first, stop in bounds for index in range(first, stop)
+            )
+    if settings.USE_TZ:
+        dates = aware_dates([date for date, _, _ in expanded])
+        expanded = [(date, number, action) for date, (_, number, action) in zip(dates, expanded)]
+    expanded.sort(key=itemgetter(0))
+    return expanded
@@ -0,0 +1,304 @@
+"""
+# Event reminders
+
+Reminders of the events with `send_reminder` are kept in a min-heap ordered by reminder time.
+The heap is loaded with a single query, then kept up to date incrementally:
+
+* in the worker process, by the event post_save / post_delete signals,
+* from other processes, by notifications sent by the same signals once their transaction is committed:
+  on PostgreSQL through LISTEN / NOTIFY, on the other databases through a Unix datagram socket bound by the worker
+  at the REMINDER_SOCKET_PATH setting, so the web processes and the worker have to run on the same node
+  (as they do with SQLite).
+
+The worker sleeps until the next reminder is due or until it is notified of a change, and delivers
+due reminders in batches through the backend set by the REMINDER_BACKEND setting.
+Sent reminders are recorded (reminded_on): reminders that fell due while no worker was running are sent
+on startup, unless their event already started.
+"""
+
+import os
+import select
+import socket
+import sys
+from datetime import datetime, timedelta
+from functools import partial
+from heapq import heappop, heappush
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from django.utils.timezone import is_aware, localtime, make_aware, now
+
+from action.models import Event
+
+
+CHANNEL = "action_reminders"
+
+DATAGRAM_IDS = 1000  # Event ids per datagram
+
+DATAGRAM_SIZE = 65536
+
+
+def reminder_time(planned_on, departure_time):
+    """Time the reminder of an event is due, REMINDER_LEAD_MINUTES before its departure"""
+    if planned_on is None:
+        return None
+    departure = planned_on
+    if departure_time is not None:
+        if is_aware(planned_on):
+            departure = make_aware(datetime.combine(localtime(planned_on).date(), departure_time), is_dst=False)
+        else:
+            departure = datetime.combine(planned_on.date(), departure_time)
+    return departure - timedelta(minutes=getattr(settings, "REMINDER_LEAD_MINUTES", 60))
+
+
+#
+# Backends
+#
+
+
+class ConsoleBackend:
+    """Write reminders to a stream, the standard output by default"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, events):
+        """Deliver a batch of reminders"""
+        for event in events:
+            self.stream.write("Reminder: {} ({}, {})\n".format(
+                event.name, localtime(event.planned_on).strftime("%Y-%m-%d %H:%M"), event.location or "-"
+            ))
+        self.stream.flush()
+
+
+class FileBackend:
+    """Append reminders to the REMINDER_FILE_PATH file"""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, "REMINDER_FILE_PATH", "reminders.log")
+
+    def send(self, events):
+        """Deliver a batch of reminders"""
+        with open(self.path, "a", encoding="utf-8") as stream:
+            ConsoleBackend(stream).send(events)
+
+
+def get_backend():
+    """Instance of the backend set by the REMINDER_BACKEND setting"""
+    return import_string(getattr(settings, "REMINDER_BACKEND", "action.reminders.ConsoleBackend"))()
+
+
+#
+# Scheduler
+#
+
+
+class ReminderScheduler:
+    """
+    ## Time-indexed reminder queue
+
+    The heap may hold outdated entries: an entry is only valid if it still matches the due time
+    of its event, so updates are pushes and removals are free.
+    """
+
+    def __init__(self, backend=None, batch_size=100):
+        self.backend = backend or get_backend()
+        self.batch_size = batch_size
+        self.heap = []
+        self.due = {}
+        self.lock = Lock()
+        self.wakeup = socket.socketpair()  # Written to wake the worker up from other threads
+        for end in self.wakeup:
+            end.setblocking(False)
+        self.sources = [self.wakeup[0]]
+        self.receiver = None
+        self.stopped = False
+
+    def load(self):
+        """Fill the queue with the reminders not sent yet of the upcoming events, in a single query"""
+        current = now()
+        rows = Event.objects.non_polymorphic().filter(
+            send_reminder=True, planned_on__gte=current - timedelta(days=1)
+        ).order_by().values_list("pk", "planned_on", "departure_time", "reminded_on")
+        with self.lock:
+            self.heap, self.due = [], {}
+            for pk, planned_on, departure_time, reminded_on in rows:
+                self.schedule(pk, reminder_time(planned_on, departure_time), reminded_on, current)
+
+    def schedule(self, pk, when, reminded_on, current):
+        """
+        Queue (or unqueue when None, sent or too late) the reminder of an event, the lock being held.
+
+        A reminder is sent if it was not since it fell due, so moving an event reschedules it.
+        Overdue reminders are only sent while the event has not started.
+        """
+        lead = timedelta(minutes=getattr(settings, "REMINDER_LEAD_MINUTES", 60))
+        if when is None or (reminded_on is not None and reminded_on >= when) or when + lead < current:
+            self.due.pop(pk, None)
+            return
+        self.due[pk] = when
+        heappush(self.heap, (when, pk))
+
+    def update(self, event):
+        """Take into account a saved event"""
+        when = reminder_time(event.planned_on, event.departure_time) if event.send_reminder else None
+        with self.lock:
+            self.schedule(event.pk, when, event.reminded_on, now())
+        self.wake()
+
+    def remove(self, pk):
+        """Forget the reminder of a deleted event"""
+        with self.lock:
+            self.due.pop(pk, None)
+        self.wake()
+
+    def wake(self):
+        """Interrupt wait, from any thread"""
+        try:
+            self.wakeup[1].send(b" ")
+        except BlockingIOError:  # Already woken up
+            pass
+
+    def pop_due(self, current):
+        """Unqueue a batch of due event ids"""
+        batch = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= current and len(batch) < self.batch_size:
+                when, pk = heappop(self.heap)
+                if self.due.get(pk) == when:
+                    del self.due[pk]
+                    batch.append(pk)
+        return batch
+
+    def next_time(self):
+        """Time of the next valid reminder, None when the queue is empty"""
+        with self.lock:
+            while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+                heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+
+    def deliver(self):
+        """Send every due reminder and record it, two queries and one backend call per batch, return the number sent"""
+        sent = 0
+        while True:
+            current = now()
+            batch = self.pop_due(current)
+            if not batch:
+                return sent
+            events = list(Event.objects.filter(pk__in=batch).order_by("planned_on"))
+            if events:
+                self.backend.send(events)
+                Event.objects.filter(pk__in=[event.pk for event in events]).update(reminded_on=current)
+            sent += len(events)
+
+    def listen(self):
+        """Subscribe to the changes made by other processes"""
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("LISTEN {}".format(CHANNEL))
+            self.sources.append(connection.connection)
+            return
+        path = getattr(settings, "REMINDER_SOCKET_PATH", "reminders.sock")
+        if os.path.exists(path):  # Left by a stopped worker
+            os.unlink(path)
+        self.receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.receiver.bind(path)
+        self.receiver.setblocking(False)
+        self.sources.append(self.receiver)
+
+    def close(self):
+        """Stop listening"""
+        if self.receiver is not None:
+            path = self.receiver.getsockname()
+            self.receiver.close()
+            self.receiver = None
+            if os.path.exists(path):
+                os.unlink(path)
+        self.sources = [self.wakeup[0]]
+
+    def received(self, source):
+        """Ids of the events changed according to the notifications waiting on a source"""
+        ids = set()
+        if source is self.receiver or source is self.wakeup[0]:
+            while True:
+                try:
+                    ids.update(int(pk) for pk in source.recv(DATAGRAM_SIZE).split())
+                except BlockingIOError:
+                    return ids
+        connection.connection.poll()
+        ids.update(int(item.payload) for item in connection.connection.notifies)
+        connection.connection.notifies.clear()
+        return ids
+
+    def wait(self, timeout):
+        """Sleep until timeout (seconds, None for ever), until an event changes or until woken up"""
+        readable, _, _ = select.select(self.sources, [], [], timeout)
+        ids = set()
+        for source in readable:
+            ids.update(self.received(source))
+        if not ids or self.stopped:
+            return
+        found = {event.pk: event for event in Event.objects.non_polymorphic().filter(pk__in=ids)}
+        for pk in ids:
+            if pk in found:
+                self.update(found[pk])
+            else:
+                self.remove(pk)
+
+    def run(self):
+        """Deliver reminders until stopped, starting with the ones missed while no worker was running"""
+        SCHEDULERS.append(self)
+        try:
+            self.listen()
+            self.load()
+            while not self.stopped:
+                self.deliver()
+                next_time = self.next_time()
+                self.wait(None if next_time is None else max((next_time - now()).total_seconds(), 0))
+        finally:
+            SCHEDULERS.remove(self)
+            self.close()
+
+    def stop(self):
+        """Make run return, from another thread"""
+        self.stopped = True
+        self.wake()
+
+
+#
+# Process wide schedulers, fed by the event signals
+#
+
+SCHEDULERS = []
+
+
+def send_ids(ids):
+    """Notify the worker of this node of changed events, ignored when no worker runs"""
+    path = getattr(settings, "REMINDER_SOCKET_PATH", "reminders.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+        for start in range(0, len(ids), DATAGRAM_IDS):
+            try:
+                sender.sendto(" ".join(ids[start:start + DATAGRAM_IDS]).encode(), path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                return
+
+
+def notify(events, deleted=False):
+    """Propagate event changes to the schedulers of this process and, once committed, of the other processes"""
+    events = list(events)
+    for scheduler in SCHEDULERS:
+        for event in events:
+            if deleted:
+                scheduler.remove(event.pk)
+            else:
+                scheduler.update(event)
+    if not events:
+        return
+    ids = [str(event.pk) for event in events]
+    if connection.vendor != "postgresql":
+        transaction.on_commit(partial(send_ids, ids))
+        return
+    with connection.cursor() as cursor:  # Delivered by PostgreSQL on commit
+        cursor.execute("SELECT pg_notify(%s, pk) FROM unnest(%s::text[]) AS pk", [CHANNEL, ids])
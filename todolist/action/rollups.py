@@ -0,0 +1,56 @@
+"""
+# Action counters
+
+Maintenance of the denormalised number of actions per project and status bucket (ActionRollup rows).
+"""
+
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.db.models import Case, Count, F, IntegerField, Manager, Q, Value, When
+from django.db.transaction import atomic
+
+
+class ActionRollupManager(Manager):
+    """Maintenance of the denormalised action counters"""
+
+    def apply(self, deltas):
+        """
+        Add {(project id, status): delta} to the counters, creating the missing rows
+
+        Two statements whatever the number of projects: the missing rows are inserted (ignoring the existing ones),
+        then every counter is updated by a single UPDATE, its delta being chosen by a CASE on (project, bucket).
+        """
+        buckets = defaultdict(int)
+        for (project_id, status), delta in deltas.items():
+            buckets[(project_id, self.model.bucket_of(status))] += delta
+        buckets = {key: delta for key, delta in buckets.items() if delta}
+        if not buckets:
+            return
+        keys = [Q(project_id=project_id, bucket=bucket) for project_id, bucket in buckets]
+        with atomic(using=self.db, savepoint=False):
+            self.bulk_create(
+                [self.model(project_id=project_id, bucket=bucket) for project_id, bucket in buckets],
+                ignore_conflicts=True,
+            )
+            self.filter(reduce(or_, keys)).update(count=F("count") + Case(
+                *(When(key, then=Value(delta)) for key, delta in zip(keys, buckets.values())),
+                default=Value(0),
+                output_field=IntegerField(),
+            ))
+
+    def rebuild(self):
+        """Recompute every counter from the actions"""
+        counts = defaultdict(int)
+        actions = apps.get_model("action", "Action").objects.db_manager(self.db).non_polymorphic()
+        rows = actions.order_by().values_list("project", "status")
+        for project_id, status, count in rows.annotate(count=Count("pk")):
+            counts[(project_id, self.model.bucket_of(status))] += count
+        with atomic(using=self.db):
+            self.all().delete()
+            self.bulk_create([
+                self.model(project_id=project_id, bucket=bucket, count=count)
+                for (project_id, bucket), count in counts.items()
+            ])
@@ -0,0 +1,117 @@
+"""
+# Scheduling
+
+Critical path of the actions of a project: every action starts as soon as its dependencies are finished,
+and not before its planned_on date. The whole graph is loaded with a single query into arrays indexed like the
+actions (see graph.critical_path_method), no action is instantiated, so that 50k actions take a fraction of second.
+
+* an action takes its duration, or else its estimate, in calendar minutes (see Action.UNIT_MINUTES),
+  archived and dropped actions take no time,
+* an action should be finished by the end of its deadline day (current time zone): the actions that cannot be
+  have a negative slack and are reported late,
+* the critical actions are the ones without slack, delaying them delays the end of the project (or a deadline),
+* dependencies on actions of other projects are ignored.
+"""
+
+from array import array
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.timezone import make_aware, now
+
+from action.graph import critical_path_method
+from action.models import Action
+
+
+DONE_STATUSES = tuple(status for status, _ in Action.STATUSES if status not in Action.OPEN_STATUSES)
+
+
+ScheduledAction = namedtuple("ScheduledAction", ("id", "start", "finish", "slack", "critical", "late"))
+
+
+class Schedule:
+    """
+    ## Schedule of the actions of a project
+
+    Arrays indexed like ids, times being minutes after start.
+    """
+
+    def __init__(self, start, ids, durations, earliest, latest, dues, order):  # pylint: disable=too-many-arguments
+        self.start = start
+        self.ids = ids
+        self.durations = durations
+        self.earliest = earliest
+        self.latest = latest
+        self.dues = dues
+        self.order = order
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def finish(self):
+        """End of the last action"""
+        end = max((early + duration for early, duration in zip(self.earliest, self.durations)), default=0)
+        return self.start + timedelta(minutes=end)
+
+    def is_late(self, index):
+        """The action cannot be finished by its deadline"""
+        return self.dues[index] is not None and self.earliest[index] + self.durations[index] > self.dues[index]
+
+    def row(self, index):
+        """Schedule of an action"""
+        earliest, slack = self.earliest[index], self.latest[index] - self.earliest[index]
+        return ScheduledAction(
+            self.ids[index],
+            self.start + timedelta(minutes=earliest),
+            self.start + timedelta(minutes=earliest + self.durations[index]),
+            timedelta(minutes=slack),
+            slack <= 0,
+            self.is_late(index),
+        )
+
+    def rows(self):
+        """Schedule of every action, in topological order"""
+        return (self.row(index) for index in self.order)
+
+    def critical_path(self):
+        """Schedule of the actions without slack, in topological order"""
+        return [self.row(index) for index in self.order if self.latest[index] <= self.earliest[index]]
+
+    def late(self):
+        """Schedule of the actions that cannot be finished by their deadline, in topological order"""
+        return [self.row(index) for index in self.order if self.is_late(index)]
+
+
+def schedule_project(project_id, start=None, using=DEFAULT_DB_ALIAS):
+    """Schedule the actions of a project from start (now by default), ValueError on dependency cycles"""
+    start = start or now()
+    rows = Action.objects.db_manager(using).non_polymorphic().filter(project=project_id).order_by("pk").values_list(
+        "pk", "status", "duration_minutes", "estimate_minutes", "planned_on", "deadline",
+        "dependency_set",  # One row per dependency
+    )
+
+    index, ids, durations, releases, dues, dependencies = {}, array("q"), array("q"), array("q"), [], []
+    due_minutes = {}
+    for pk, status, duration, estimate, planned_on, deadline, dependency in rows:
+        if dependency is not None:
+            dependencies.append((dependency, pk))
+        if pk in index:
+            continue
+        index[pk] = len(ids)
+        ids.append(pk)
+        done = status in DONE_STATUSES
+        durations.append(0 if done else duration or estimate or 0)
+        releases.append(max(0, int((planned_on - start).total_seconds()) // 60) if planned_on and not done else 0)
+        if deadline is None or done:
+            dues.append(None)
+            continue
+        if deadline not in due_minutes:
+            end_of_day = make_aware(datetime.combine(deadline + timedelta(days=1), time.min))
+            due_minutes[deadline] = int((end_of_day - start).total_seconds()) // 60
+        dues.append(due_minutes[deadline])
+
+    edges = [(index[dependency], index[pk]) for dependency, pk in dependencies if dependency in index]
+    order, earliest, latest = critical_path_method(durations, edges, releases, dues)
+    return Schedule(start, ids, durations, earliest, latest, dues, order)
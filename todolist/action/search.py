@@ -0,0 +1,262 @@
+"""
+# Full-text search of actions
+
+Each action has one search document made of three weighted parts:
+
+* title: category, project, label, name, deadline and planned on,
+* body: description,
+* notes: content of the notes, steps and logs.
+
+Documents live in a table of the database engine own full-text index (SQLite FTS5 or PostgreSQL tsvector
+with a GIN index). They are rebuilt in SQL, with one statement per batch of actions, by signals on actions,
+notes, steps and logs, and on projects and categories, whose names are part of the titles. Other database engines
+have no backend: the admin falls back to its usual search.
+
+Notes, steps and logs only rebuild the notes part of the document of their action.
+
+Searches filter the searched queryset with a subquery of the matching ids, and annotate the rank of every match
+(search_rank, best first, a subquery on the index primary key): nothing is materialised, the whole result set
+can be counted, ordered and paginated.
+
+Autocomplete only matches word prefixes of the title, newest actions first, with no ranking: the index answers
+without sorting every match. SQLite keeps prefix indexes of 1 to 4 characters: short prefixes of common words
+would otherwise merge the entries of every matching word on each keystroke.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+
+WORDS = re.compile(r"\w+")
+
+
+class Matching(RawSQL):
+    """
+    ## Subquery of the matching action ids
+
+    Right hand side of an __in lookup, which already parenthesizes it: a parenthesized RawSQL would be read as a
+    scalar subquery, i.e. only its first row.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+class SQLiteBackend:
+    """FTS5 virtual table, the row id being the action id"""
+
+    CREATE = "CREATE VIRTUAL TABLE IF NOT EXISTS action_search USING fts5(title, body, notes, prefix='1 2 3 4')"
+
+    DROP = "DROP TABLE IF EXISTS action_search"
+
+    DELETE = "DELETE FROM action_search WHERE rowid IN ({})"
+
+    NOTES = """
+        coalesce((SELECT group_concat(content, ' ') FROM action_note WHERE action_id = {id}), '') || ' '
+        || coalesce((SELECT group_concat(content, ' ') FROM action_step WHERE action_id = {id}), '') || ' '
+        || coalesce((SELECT group_concat(content, ' ') FROM action_log WHERE action_id = {id}), '')
+    """
+
+    INSERT = """
+        INSERT INTO action_search (rowid, title, body, notes)
+        SELECT a.id,
+               c.name || ' ' || p.name || ' ' || a.label || ' ' || a.name || ' '
+               || coalesce(a.deadline, '') || ' ' || coalesce(a.planned_on, ''),
+               a.description,
+               {notes}
+        FROM action_action a
+        JOIN project_project p ON p.id = a.project_id
+        JOIN category_category c ON c.id = p.category_id
+    """.format(notes=NOTES.format(id="a.id"))
+
+    UPDATE_NOTES = "UPDATE action_search SET notes = {notes} WHERE rowid IN ({{}})".format(
+        notes=NOTES.format(id="action_search.rowid")
+    )
+
+    INDEXED = "SELECT a.id FROM action_action a JOIN project_project p ON p.id = a.project_id"
+
+    MATCHING = "SELECT rowid FROM action_search WHERE action_search MATCH %s"
+
+    # bm25 reads the whole match for its statistics: LIMIT -1 keeps SQLite from flattening the ranks into one
+    # full-text query per action, they are computed once and looked up with an automatic index
+    RANK = """
+        SELECT score FROM (
+            SELECT rowid AS id, bm25(action_search, 10.0, 2.0, 1.0) AS score FROM action_search
+            WHERE action_search MATCH %s LIMIT -1
+        ) WHERE id = {}
+    """
+
+    TITLE_SEARCH = """
+        SELECT action_search.rowid FROM action_search JOIN {table} ON {column} = action_search.rowid
+        WHERE action_search MATCH %s ORDER BY action_search.rowid DESC LIMIT %s OFFSET %s
+    """
+
+    def __init__(self, using):
+        self.connection = connections[using]
+
+    def create(self):
+        """Create the index table"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.CREATE)
+
+    def drop(self):
+        """Drop the index table"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.DROP)
+
+    def remove(self, action_ids):
+        """Remove the documents of the given actions"""
+        action_ids = list(action_ids)
+        if action_ids:
+            with self.connection.cursor() as cursor:
+                cursor.execute(self.DELETE.format(", ".join(["%s"] * len(action_ids))), action_ids)
+
+    def index(self, action_ids):
+        """(Re)build the documents of the given actions"""
+        action_ids = list(action_ids)
+        if not action_ids:
+            return
+        self.remove(action_ids)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                self.INSERT + " WHERE a.id IN ({})".format(", ".join(["%s"] * len(action_ids))), action_ids
+            )
+
+    def index_notes(self, action_ids):
+        """Rebuild the notes part of the documents of the given actions, after their notes, steps or logs changed"""
+        action_ids = list(action_ids)
+        if action_ids:
+            with self.connection.cursor() as cursor:
+                cursor.execute(self.UPDATE_NOTES.format(", ".join(["%s"] * len(action_ids))), action_ids)
+
+    def index_where(self, column, values):
+        """(Re)build the documents of the actions whose column (a.project_id, p.category_id...) is one of the values"""
+        values = list(values)
+        if not values:
+            return
+        condition = " WHERE {} IN ({})".format(column, ", ".join(["%s"] * len(values)))
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.DELETE.format(self.INDEXED + condition), values)
+            cursor.execute(self.INSERT + condition, values)
+
+    def index_projects(self, project_ids):
+        """(Re)build the documents of the actions of the given projects"""
+        self.index_where("a.project_id", project_ids)
+
+    def index_categories(self, category_ids):
+        """(Re)build the documents of the actions of the projects of the given categories"""
+        self.index_where("p.category_id", category_ids)
+
+    def rebuild(self):
+        """(Re)build the documents of all the actions"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM action_search")
+            cursor.execute(self.INSERT)
+
+    @staticmethod
+    def query(term):
+        """FTS5 query matching documents with words starting with every word of the term"""
+        return " ".join('"{}"*'.format(word) for word in WORDS.findall(term))
+
+    def search(self, queryset, term):
+        """Actions of a queryset matching the term, annotated with their search_rank"""
+        query = self.query(term)
+        if not query:
+            return queryset.none()
+        opts = queryset.model._meta  # pylint: disable=protected-access
+        quote = self.connection.ops.quote_name
+        column = "{}.{}".format(quote(opts.db_table), quote(opts.pk.column))
+        return queryset.filter(pk__in=Matching(self.MATCHING, [query])).annotate(
+            search_rank=RawSQL(self.RANK.format(column), [query])
+        )
+
+    @classmethod
+    def title_query(cls, term):
+        """FTS5 query matching titles with words starting with every word of the term"""
+        query = cls.query(term)
+        return "title : ({})".format(query) if query else ""
+
+    def title_search(self, model, term, offset, limit):
+        """Ids of the actions of a model (Action or a child model) whose title matches the term, newest first"""
+        query = self.title_query(term)
+        if not query:
+            return []
+        opts = model._meta  # pylint: disable=protected-access
+        quote = self.connection.ops.quote_name
+        statement = self.TITLE_SEARCH.format(
+            table=quote(opts.db_table), column="{}.{}".format(quote(opts.db_table), quote(opts.pk.column))
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(statement, [query, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgreSQLBackend(SQLiteBackend):
+    """tsvector column with a GIN index, the three parts being weighted A, B and C"""
+
+    CREATE = """
+        CREATE TABLE IF NOT EXISTS action_search (
+            action_id integer PRIMARY KEY
+                REFERENCES action_action (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            document tsvector NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS action_search_document ON action_search USING GIN (document)
+    """
+
+    DELETE = "DELETE FROM action_search WHERE action_id IN ({})"
+
+    NOTES = """
+        setweight(to_tsvector('simple',
+            coalesce((SELECT string_agg(content, ' ') FROM action_note WHERE action_id = {id}), '') || ' '
+            || coalesce((SELECT string_agg(content, ' ') FROM action_step WHERE action_id = {id}), '') || ' '
+            || coalesce((SELECT string_agg(content, ' ') FROM action_log WHERE action_id = {id}), '')
+        ), 'C')
+    """
+
+    INSERT = """
+        INSERT INTO action_search (action_id, document)
+        SELECT a.id,
+               setweight(to_tsvector('simple', c.name || ' ' || p.name || ' ' || a.label || ' ' || a.name || ' '
+                         || coalesce(a.deadline::text, '') || ' ' || coalesce(a.planned_on::text, '')), 'A')
+               || setweight(to_tsvector('simple', a.description), 'B')
+               || {notes}
+        FROM action_action a
+        JOIN project_project p ON p.id = a.project_id
+        JOIN category_category c ON c.id = p.category_id
+    """.format(notes=NOTES.format(id="a.id"))
+
+    # The title and body parts are kept (weights A and B), the notes part (weight C) is replaced
+    UPDATE_NOTES = """
+        UPDATE action_search SET document = ts_filter(document, '{{{{a,b}}}}') || {notes}
+        WHERE action_id IN ({{}})
+    """.format(notes=NOTES.format(id="action_search.action_id"))
+
+    MATCHING = "SELECT action_id FROM action_search WHERE document @@ to_tsquery('simple', %s)"
+
+    RANK = "SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM action_search WHERE action_id = {}"
+
+    TITLE_SEARCH = """
+        SELECT action_search.action_id FROM action_search JOIN {table} ON {column} = action_search.action_id
+        WHERE document @@ to_tsquery('simple', %s) ORDER BY action_search.action_id DESC LIMIT %s OFFSET %s
+    """
+
+    @staticmethod
+    def query(term):
+        """tsquery matching documents with words starting with every word of the term"""
+        return " & ".join("{}:*".format(word) for word in WORDS.findall(term))
+
+    @staticmethod
+    def title_query(term):
+        """tsquery matching titles (weight A) with words starting with every word of the term"""
+        return " & ".join("{}:*A".format(word) for word in WORDS.findall(term))
+
+
+BACKENDS = {"sqlite": SQLiteBackend, "postgresql": PostgreSQLBackend}
+
+
+def get_backend(using="default"):
+    """Search backend of a database, None if its engine has none"""
+    backend = BACKENDS.get(connections[using].vendor)
+    return backend(using) if backend else None
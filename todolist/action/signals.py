@@ -1,12 +1,37 @@
 """App signals module"""
-from django.db.models import Max
-from django.db.models.signals import pre_save, post_save
+from django.core.exceptions import ValidationError
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.utils.text import slugify
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 
-from action.models import Action, Event, RecurrentAction, Note, Step, Log
+from action import audit, reminders, search, sqlite
+from action.models import (
+    Action,
+    ActionClosure,
+    ActionRollup,
+    Event,
+    RecurrentAction,
+    Occurrence,
+    Note,
+    Step,
+    Log,
+)
+from action.querysets import forget_used_dates
+from category.models import Category
+from project.models import Project
+from todolist import changes, slugs
+
+
+#
+# Helpers
+#
+
+
+def creation_log(action):
+    """First log of an action, it always takes the number 1 reserved on creation"""
+    return Log(action=action, number=1, date=now(), content=_("Creation of the action"))
 
 
 #
@@ -14,6 +39,12 @@ from action.models import Action, Event, RecurrentAction, Note, Step, Log
 #
 
 
+@receiver(connection_created, dispatch_uid="sqlite_connection_created")
+def sqlite_connection_created(sender, connection, **kwargs):  # pylint: disable=unused-argument
+    """Tune new SQLite connections"""
+    sqlite.configure(connection)
+
+
 @receiver(pre_save, sender=Action, dispatch_uid="action_pre_created")
 @receiver(pre_save, sender=Event, dispatch_uid="event_pre_created")
 @receiver(pre_save, sender=RecurrentAction, dispatch_uid="recurrent_action_pre_created")
@@ -24,10 +55,12 @@ def action_pre_created(sender, instance, raw, using, update_fields, **kwargs):
 
     # from nose.tools import set_trace; set_trace()
 
-    instance.name = "{} {} – {}".format(instance.priority[0], instance.project.name, instance.label)
+    project_name = slugs.related_name(instance, "project", using)
+    instance.name = "{} {} – {}".format(instance.priority[0], project_name, instance.label)
+
+    slugs.assign_slugs([instance], lambda action: project_name + "__" + action.label, using)
 
-    if not instance.slug:
-        instance.slug = slugify(instance.project.name + "__" + instance.label)
+    instance.log_counter = 1  # Reserved for the creation log
 
 
 @receiver(post_save, sender=Action, dispatch_uid="action_post_save")
@@ -39,7 +72,146 @@ def action_post_save(sender, instance, created, raw, using, update_fields,
     if not created:
         return
 
-    Log.objects.create(action=instance, date=now(), content=_("Creation of the action"))
+    creation_log(instance).save()
+
+
+@receiver(post_save, sender=Action, dispatch_uid="action_audit_saved")
+@receiver(post_save, sender=Event, dispatch_uid="event_audit_saved")
+@receiver(post_save, sender=RecurrentAction, dispatch_uid="recurrent_action_audit_saved")
+def action_audit_saved(sender, instance, created, raw, using, **kwargs):  # pylint: disable=unused-argument
+    """Log the changes of the tracked fields, then remember the saved values"""
+    changed = [] if created or raw else instance.tracked_changes()
+    if changed:
+        audit.record(instance.pk, ", ".join(sender.describe_change(*change) for change in changed), using)
+    tracked = {name: getattr(instance, name) for name in sender.TRACKED_FIELDS}
+    instance._tracked = tracked  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=RecurrentAction, dispatch_uid="recurrent_action_occurrences")
+def recurrent_action_occurrences(sender, instance, created, raw, using, update_fields,
+                                 **kwargs):  # pylint: disable=unused-argument,too-many-arguments
+    """Materialize the occurrences of a recurrent action when its recurrence changed"""
+    saved = [name for name in sender.RECURRENCE_FIELDS if not update_fields or name in update_fields]
+    if raw or not saved:
+        return
+
+    if created or instance.recurrence_changed(saved):
+        Occurrence.objects.db_manager(using).refresh([instance])
+    instance.remember_recurrence(saved)
+
+
+@receiver(post_save, sender=Event, dispatch_uid="event_reminder_saved")
+def event_reminder_saved(sender, instance, raw, using, **kwargs):  # pylint: disable=unused-argument
+    """Reschedule the reminder of a saved event"""
+    if not raw:
+        reminders.notify([instance])
+
+
+@receiver(post_delete, sender=Event, dispatch_uid="event_reminder_deleted")
+def event_reminder_deleted(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Unschedule the reminder of a deleted event"""
+    reminders.notify([instance], deleted=True)
+
+
+@receiver(post_save, sender=Action, dispatch_uid="action_dates_saved")
+@receiver(post_save, sender=Event, dispatch_uid="event_dates_saved")
+@receiver(post_save, sender=RecurrentAction, dispatch_uid="recurrent_action_dates_saved")
+@receiver(post_delete, sender=Action, dispatch_uid="action_dates_deleted")
+def action_dates_changed(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Deadline or planned_on may have changed: cached used dates are outdated"""
+    forget_used_dates()
+
+
+@receiver(post_save, sender=Action, dispatch_uid="action_changes_saved")
+@receiver(post_save, sender=Event, dispatch_uid="event_changes_saved")
+@receiver(post_save, sender=RecurrentAction, dispatch_uid="recurrent_action_changes_saved")
+@receiver(post_delete, sender=Action, dispatch_uid="action_changes_deleted")
+@receiver(post_save, sender=Note, dispatch_uid="note_changes_saved")
+@receiver(post_save, sender=Step, dispatch_uid="step_changes_saved")
+@receiver(post_save, sender=Log, dispatch_uid="log_changes_saved")
+@receiver(post_delete, sender=Note, dispatch_uid="note_changes_deleted")
+@receiver(post_delete, sender=Step, dispatch_uid="step_changes_deleted")
+@receiver(post_delete, sender=Log, dispatch_uid="log_changes_deleted")
+def action_changed(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Outdate what depends on the actions (autocomplete, API responses...), or on their notes, steps or logs"""
+    changes.touch(Action if issubclass(sender, Action) else sender)
+
+
+@receiver(pre_save, sender=Action, dispatch_uid="action_rollup_pre_save")
+@receiver(pre_save, sender=Event, dispatch_uid="event_rollup_pre_save")
+@receiver(pre_save, sender=RecurrentAction, dispatch_uid="recurrent_action_rollup_pre_save")
+def action_rollup_pre_save(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Fetch the stored project and status of an action that was not loaded from the database"""
+    if instance.pk is not None and not hasattr(instance, "_rollup_key"):
+        stored = Action.objects.db_manager(using).non_polymorphic().filter(pk=instance.pk)
+        instance._rollup_key = stored.values_list("project", "status").first()  # pylint: disable=protected-access
+
+
+@receiver(post_save, sender=Action, dispatch_uid="action_rollup_saved")
+@receiver(post_save, sender=Event, dispatch_uid="event_rollup_saved")
+@receiver(post_save, sender=RecurrentAction, dispatch_uid="recurrent_action_rollup_saved")
+def action_rollup_saved(sender, instance, created, using, **kwargs):  # pylint: disable=unused-argument
+    """Move a saved action to the counter of its new project and status"""
+    old = None if created else getattr(instance, "_rollup_key", None)
+    new = (instance.project_id, instance.status)
+    if old != new:
+        deltas = {new: 1}
+        if old is not None:
+            deltas[old] = -1
+        ActionRollup.objects.db_manager(using).apply(deltas)
+    instance._rollup_key = new  # pylint: disable=protected-access
+
+
+@receiver(post_delete, sender=Action, dispatch_uid="action_rollup_deleted")
+def action_rollup_deleted(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Remove a deleted action from its counter"""
+    key = getattr(instance, "_rollup_key", None) or (instance.project_id, instance.status)
+    ActionRollup.objects.db_manager(using).apply({key: -1})
+
+
+@receiver(post_save, sender=Action, dispatch_uid="action_search_saved")
+@receiver(post_save, sender=Event, dispatch_uid="event_search_saved")
+@receiver(post_save, sender=RecurrentAction, dispatch_uid="recurrent_action_search_saved")
+def action_search_saved(sender, instance, raw, using, **kwargs):  # pylint: disable=unused-argument
+    """Rebuild the search document of a saved action"""
+    backend = search.get_backend(using)
+    if backend is not None and not raw:
+        backend.index([instance.pk])
+
+
+@receiver(post_delete, sender=Action, dispatch_uid="action_search_deleted")
+def action_search_deleted(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Remove the search document of a deleted action"""
+    backend = search.get_backend(using)
+    if backend is not None:
+        backend.remove([instance.pk])
+
+
+@receiver(post_save, sender=Project, dispatch_uid="project_search_saved")
+@receiver(post_save, sender=Category, dispatch_uid="category_search_saved")
+def name_search_saved(sender, instance, created, raw, using, update_fields,
+                      **kwargs):  # pylint: disable=unused-argument,too-many-arguments
+    """Rebuild the search documents of the actions of a saved project or category, their titles hold its name"""
+    backend = search.get_backend(using)
+    if backend is None or created or raw or (update_fields and "name" not in update_fields):
+        return
+    if sender is Project:
+        backend.index_projects([instance.pk])
+    else:
+        backend.index_categories([instance.pk])
+
+
+@receiver(post_save, sender=Note, dispatch_uid="note_search_saved")
+@receiver(post_save, sender=Step, dispatch_uid="step_search_saved")
+@receiver(post_save, sender=Log, dispatch_uid="log_search_saved")
+@receiver(post_delete, sender=Note, dispatch_uid="note_search_deleted")
+@receiver(post_delete, sender=Step, dispatch_uid="step_search_deleted")
+@receiver(post_delete, sender=Log, dispatch_uid="log_search_deleted")
+def inline_search_changed(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Rebuild the notes part of the search document of the action of a saved or deleted note, step or log"""
+    backend = search.get_backend(using)
+    if backend is not None and not kwargs.get("raw"):
+        backend.index_notes([instance.action_id])
 
 
 @receiver(pre_save, sender=Note, dispatch_uid="note_pre_created")
@@ -47,9 +219,65 @@ def action_post_save(sender, instance, created, raw, using, update_fields,
 @receiver(pre_save, sender=Log, dispatch_uid="log_pre_created")
 def inline_pre_created(sender, instance, raw, using, update_fields, **kwargs):  # pylint: disable=unused-argument
     """Create number"""
-    if instance.pk:  # Called only on creation
+    if instance.pk or instance.number is not None:  # Called only on creation, when no number was reserved
         return
 
-    # from nose.tools import set_trace; set_trace()
+    instance.number = Action.objects.reserve_numbers(instance.action_id, sender)
+
+
+@receiver(m2m_changed, sender=Action.dependency_set.through, dispatch_uid="action_dependency_changed")
+def action_dependency_changed(sender, instance, action, reverse, model, pk_set,
+                              **kwargs):  # pylint: disable=unused-argument,too-many-arguments
+    """Reject dependency cycles and keep the dependency closure up to date"""
+    if reverse:
+        edges = [(instance.pk, pk) for pk in pk_set or ()]
+    else:
+        edges = [(pk, instance.pk) for pk in pk_set or ()]
+
+    if action == "pre_add" and ActionClosure.objects.creates_cycle(edges):
+        raise ValidationError(_("An action cannot depend on itself, even indirectly."), code="cycle")
+    if action.startswith("post_"):
+        changes.touch(Action)
+    if action == "post_add":
+        ActionClosure.objects.link(edges)
+    elif action == "post_remove":
+        ActionClosure.objects.refresh(pk_set if reverse else {instance.pk})
+    elif action == "post_clear":
+        if reverse:  # Every action that was blocked by the instance is concerned
+            ActionClosure.objects.refresh(ActionClosure.objects.descendant_map([instance.pk])[instance.pk])
+        else:
+            ActionClosure.objects.refresh({instance.pk})
+
+
+@receiver(m2m_changed, sender=Action.dependency_set.through, dispatch_uid="action_dependency_audit")
+def action_dependency_audit(sender, instance, action, reverse, model, pk_set, using,
+                            **kwargs):  # pylint: disable=unused-argument,too-many-arguments
+    """Log the added and removed dependencies in the log book of the dependent actions"""
+    if action not in ("post_add", "post_remove", "post_clear") or (reverse and action == "post_clear"):
+        return
+
+    if action == "post_clear":
+        audit.record(instance.pk, str(_("Dependencies cleared")), using)
+        return
+    message = _("Dependency added: {}") if action == "post_add" else _("Dependency removed: {}")
+    if reverse:  # The instance is the dependency of the actions of pk_set
+        for pk in sorted(pk_set):
+            audit.record(pk, message.format(instance.slug), using)
+    else:
+        dependencies = model.objects.db_manager(using).non_polymorphic().filter(pk__in=pk_set)
+        for slug in sorted(dependencies.values_list("slug", flat=True)):
+            audit.record(instance.pk, message.format(slug), using)
+
+
+@receiver(pre_delete, sender=Action, dispatch_uid="action_pre_delete")
+def action_pre_delete(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Remember the actions blocked by a deleted action, their closure rows have to be rebuilt"""
+    instance.blocked_ids = set(ActionClosure.objects.descendant_map([instance.pk])[instance.pk])
+
 
-    instance.number = (instance.action.note_set.aggregate(Max('number'))["number__max"] or 0) + 1
+@receiver(post_delete, sender=Action, dispatch_uid="action_post_delete")
+def action_post_delete(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Rebuild the closure of the actions that were blocked by a deleted action"""
+    blocked_ids = getattr(instance, "blocked_ids", None)
+    if blocked_ids:
+        ActionClosure.objects.rebuild(blocked_ids)
@@ -0,0 +1,80 @@
+"""
+# SQLite tuning
+
+Single node deployments run on SQLite, where every write takes the database lock. This module:
+
+* tunes each new connection with the SQLITE_PRAGMAS setting, merged over PRAGMAS: WAL lets readers go on
+  while a writer commits, synchronous=NORMAL only syncs at checkpoints (safe with WAL), busy_timeout makes
+  writers wait for the lock instead of failing at once, mmap and cache sizes cut down read syscalls,
+* retries a whole write when SQLite still reports a lock: a deferred transaction that reads then writes
+  cannot wait for the lock (that could deadlock), SQLite fails it at once, only starting over can help.
+
+Setting SQLITE_PRAGMAS to None disables the tuning.
+"""
+
+from functools import wraps
+from random import uniform
+from time import sleep
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,  # ms
+    "mmap_size": 256 * 1024 * 1024,  # bytes
+    "cache_size": -20000,  # negative: KiB
+    "temp_store": "memory",
+}
+
+
+def pragmas():
+    """Pragmas applied to new connections"""
+    custom = getattr(settings, "SQLITE_PRAGMAS", {})
+    return {} if custom is None else dict(PRAGMAS, **custom)
+
+
+def configure(connection):
+    """Apply the pragmas to a new SQLite connection"""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas().items():
+            cursor.execute("PRAGMA {} = {}".format(name, value))
+
+
+def is_locked(error):
+    """Tell whether an error is SQLite lock contention"""
+    message = str(error)
+    return "database is locked" in message or "database table is locked" in message
+
+
+def retry_on_lock(function=None, using=DEFAULT_DB_ALIAS):
+    """
+    Decorator calling again a writing function when SQLite reports a lock, with a jittered exponential backoff.
+
+    SQLITE_WRITE_RETRIES (5) and SQLITE_RETRY_DELAY (0.05 second, the first backoff) are settings.
+    Within a transaction the function is called only once: the whole transaction has to be retried.
+    """
+    if function is None:
+        return lambda function: retry_on_lock(function, using)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        connection = connections[using]
+        if connection.vendor != "sqlite" or connection.in_atomic_block:
+            return function(*args, **kwargs)
+        retries = getattr(settings, "SQLITE_WRITE_RETRIES", 5)
+        delay = getattr(settings, "SQLITE_RETRY_DELAY", 0.05)
+        for attempt in range(retries + 1):
+            try:
+                return function(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == retries or not is_locked(error):
+                    raise
+                sleep(uniform(delay, 2 * delay) * 2 ** attempt)
+        return None  # Not reached
+
+    return wrapper
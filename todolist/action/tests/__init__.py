@@ -0,0 +1,33 @@
+"""Action tests"""
+
+from action.models import Action, Event, RecurrentAction
+
+
+def create_actions(project, count, prefix="action"):
+    """Create some actions of every polymorphic type, chained by dependencies"""
+    actions = []
+    for i in range(count):
+        model = (Action, Event, RecurrentAction)[i % 3]
+        extra = {"active": True, "count": 1, "frequency": "w"} if model is RecurrentAction else {}
+        action = model.objects.create(
+            project=project,
+            label="{}-{}".format(prefix, i),
+            description="description",
+            status="EV"[i % 2],
+            **extra
+        )
+        if actions:
+            action.dependency_set.add(actions[-1])
+        actions.append(action)
+    return actions
+
+
+class ListBackend:
+    """Reminder backend keeping the batches it is given"""
+
+    def __init__(self):
+        self.batches = []
+
+    def send(self, events):
+        """Keep a batch"""
+        self.batches.append([event.label for event in events])
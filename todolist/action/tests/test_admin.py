@@ -0,0 +1,219 @@
+"""Action admin"""
+
+from datetime import date as date_, datetime
+from time import perf_counter
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.timezone import make_aware, utc
+
+from action.admin import ContactParentAdmin
+from action.importer import import_actions
+from action.models import Action, Event
+from action.pagination import KeysetPaginator
+from category.models import Category
+from project.models import Project
+
+
+class ChangelistTestCase(TestCase):
+    """Query count and response time of the action changelists"""
+
+    URLS = ("/action/action/", "/action/event/", "/action/recurrentaction/")
+
+    BENCHMARK_SIZE = 10000
+
+    MAX_SECONDS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ("first", "second", "third"):
+            Project.objects.create(category=Category.objects.create(name=name), name=name)
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(username="admin"))
+
+    def seed(self, count, prefix):
+        """Bulk import actions of every type spread over every project"""
+        types = ("action", "event", "recurrentaction")
+        projects = ("first", "second", "third")
+        import_actions({
+            "type": types[i % 3],
+            "project": projects[i // 3 % 3],
+            "label": "{}-{}".format(prefix, i),
+            "description": "description",
+            "frequency": "w",
+            "active": True,
+            "count": 1,
+            "dependencies": ["{}__{}-{}".format(projects[(i - 1) // 3 % 3], prefix, i - 1)] if i % 10 else [],
+        } for i in range(count))
+
+    def render(self, url):
+        """Render a changelist, return its query count and duration"""
+        start = perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context), perf_counter() - start
+
+    @override_settings(ADMIN_COUNT_THRESHOLD=2 * BENCHMARK_SIZE)  # Counted exactly, see KeysetTestCase
+    def test_bounded_queries(self):
+        """Query count does not depend on the number of actions, response time stays bounded"""
+        self.seed(9, "small")
+        small = [self.render(url)[0] for url in self.URLS]
+        self.seed(self.BENCHMARK_SIZE, "big")
+        for url, queries in zip(self.URLS, small):
+            count, seconds = self.render(url)
+            self.assertEqual(count, queries, url)
+            self.assertLess(seconds, self.MAX_SECONDS, url)
+
+
+class KeysetTestCase(TestCase):
+    """Keyset pagination of the action changelists"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        for i in range(25):
+            Action.objects.create(
+                project=cls.project,
+                label="action-{:02}".format(i),
+                description="d",
+                planned_on=None if i % 4 == 0 else datetime(2019, 1, 1 + i % 3, tzinfo=utc),
+                deadline=None if i % 5 == 0 else date_(2019, 2, 1 + i % 2),
+            )
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(username="admin"))
+
+    def labels(self, response):
+        """Labels of a changelist page"""
+        return [action.label for action in response.context["cl"].result_list]
+
+    def test_seek(self):
+        """Pages follow the ordering across NULLs, previous pages too"""
+        expected = [
+            action.label
+            for action in Action.objects.order_by(*Action._meta.ordering, "-pk")  # pylint: disable=protected-access
+        ]
+        seen, url, last = [], "", None
+        with patch.object(ContactParentAdmin, "list_per_page", 4):
+            while url is not None:
+                last = self.client.get("/action/action/" + url)
+                self.assertEqual(last.status_code, 200)
+                seen += self.labels(last)
+                url = last.context["cl"].next_url
+            self.assertEqual(seen, expected)
+            previous = self.client.get("/action/action/" + last.context["cl"].previous_url)
+            self.assertEqual(self.labels(previous), expected[-5:-1])
+            filtered = self.client.get("/action/action/" + previous.context["cl"].next_url + "&status__exact=A")
+            self.assertEqual(filtered.status_code, 200)
+            self.assertEqual(self.client.get("/action/action/?cursor=nonsense").status_code, 302)
+
+    @override_settings(ADMIN_COUNT_THRESHOLD=10)
+    def test_estimated_count(self):
+        """Beyond the threshold, the count comes from the statistics once there are some"""
+        queryset = Action.objects.order_by("-pk")
+        self.assertEqual(KeysetPaginator(queryset, 4).count, 25)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        paginator = KeysetPaginator(queryset, 4)
+        self.assertEqual(paginator.count, 25)
+        self.assertTrue(paginator.estimated)
+
+
+class AutocompleteTestCase(TestCase):
+    """Cached prefix autocomplete of the pickers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="garden")
+        cls.project = Project.objects.create(category=category, name="vegetables")
+        Project.objects.create(category=Category.objects.create(name="house"), name="paint")
+        for label in ("tomatoes", "potatoes", "tomato stakes"):
+            Action.objects.create(project=cls.project, label=label, description="fence")
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.get(username="admin"))
+
+    def complete(self, model, term):
+        """Texts of the first page, and the queries on the app tables"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/{0}/{0}/autocomplete/".format(model), {"term": term})
+        self.assertEqual(response.status_code, 200)
+        queries = [query for query in context if "{}_".format(model) in query["sql"]]
+        return [result["text"] for result in response.json()["results"]], len(queries)
+
+    def test_actions(self):
+        """Title word prefixes match, newest first, and the response is cached until an action is saved"""
+        expected = ["⇅ vegetables – tomato stakes", "⇅ vegetables – tomatoes"]
+        self.assertEqual(self.complete("action", "TOM"), (expected, 2))
+        self.assertEqual(self.complete("action", "tom"), (expected, 0))
+        self.assertEqual(self.complete("action", "veg pot")[0], ["⇅ vegetables – potatoes"])
+        self.assertEqual(self.complete("action", "fence")[0], [])  # Description words are not titles
+        Action.objects.create(project=self.project, label="tomato seeds", description="d")
+        self.assertEqual(len(self.complete("action", "tom")[0]), 3)
+
+    def test_child_actions(self):
+        """Child admins only complete their own model, a full page even when newer actions match"""
+        event = Event.objects.create(project=self.project, label="tomato market", description="d",
+                                     planned_on=make_aware(datetime(2019, 6, 1, 9)))
+        for number in range(25):
+            Action.objects.create(project=self.project, label="tomato {}".format(number), description="d")
+        response = self.client.get("/action/event/autocomplete/", {"term": "tom"})
+        self.assertEqual([result["id"] for result in response.json()["results"]], [str(event.pk)])
+
+    def test_projects(self):
+        """Project and category name prefixes match, the response is cached until a category is saved"""
+        self.assertEqual(self.complete("project", "gar"), (["vegetables"], 1))
+        self.assertEqual(self.complete("project", "gar"), (["vegetables"], 0))
+        Category.objects.create(name="garage")
+        self.assertEqual(self.complete("project", ""), (["paint", "vegetables"], 1))
+
+
+class MonthFilterTestCase(TestCase):
+    """Month list filters of the action changelists"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(username="admin"))
+
+    def create(self, label, deadline, planned_on):
+        """Saved action"""
+        return Action.objects.create(
+            project=self.project, label=label, description="description", deadline=deadline, planned_on=planned_on
+        )
+
+    def test_filter_own_field(self):
+        """Each filter uses its own field, with the whole month included"""
+        self.create("january", date_(2019, 1, 31), make_aware(datetime(2019, 3, 1)))
+        self.create("december", date_(2019, 12, 1), make_aware(datetime(2019, 2, 28, 23, 59)))
+        response = self.client.get("/action/action/", {"deadline": "01-2019"})
+        self.assertEqual([obj.label for obj in response.context["cl"].result_list], ["january"])
+        response = self.client.get("/action/action/", {"planned_on": "02-2019"})
+        self.assertEqual([obj.label for obj in response.context["cl"].result_list], ["december"])
+        response = self.client.get("/action/action/", {"deadline": "12-2019"})
+        self.assertEqual([obj.label for obj in response.context["cl"].result_list], ["december"])
+
+    def test_cached_lookups(self):
+        """Used months are only queried again after a change"""
+        self.create("january", date_(2019, 1, 31), None)
+        self.assertEqual(Action.objects.used_dates("deadline"), [date_(2019, 1, 1)])
+        with self.assertNumQueries(0):
+            Action.objects.used_dates("deadline")
+        self.create("march", date_(2019, 3, 2), None)
+        self.assertEqual(Action.objects.used_dates("deadline"), [date_(2019, 3, 1), date_(2019, 1, 1)])
+        self.assertEqual(Event.objects.used_dates("deadline"), [])
@@ -0,0 +1,70 @@
+"""JSON API"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.models import Note
+from action.tests import create_actions
+from category.models import Category
+from project.models import Project
+
+
+class ApiTestCase(TestCase):
+    """Read-only JSON API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        cls.actions = create_actions(cls.project, 5)
+        Note.objects.create(action=cls.actions[1], content="note")
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.get(username="admin"))
+
+    def test_fields(self):
+        """Fields are selected, the id is always given, unknown fields are rejected"""
+        response = self.client.get("/api/actions/{}/".format(self.actions[1].pk), {"fields": "slug,type"})
+        self.assertEqual(response.json(), {"id": self.actions[1].pk, "slug": self.actions[1].slug, "type": "event"})
+        self.assertEqual(self.client.get("/api/actions/", {"fields": "note_counter"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/events/{}/".format(self.actions[0].pk)).status_code, 404)
+        response = self.client.get("/api/projects/")
+        self.assertEqual(response.json()["results"][0]["category"], self.project.category_id)
+
+    def test_includes(self):
+        """Related rows of a page are fetched with one query per include"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/actions/", {"include": "notes,dependencies", "fields": "id"})
+        queries = [query for query in context if "action_" in query["sql"]]
+        self.assertEqual(len(queries), 3)
+        results = response.json()["results"]
+        self.assertEqual(results[1], {"id": self.actions[1].pk, "notes": [{"number": 1, "content": "note"}],
+                                      "dependencies": [self.actions[0].pk]})
+        self.assertEqual(self.client.get("/api/actions/", {"include": "project"}).status_code, 400)
+
+    def test_pagination(self):
+        """Pages follow each other by cursor"""
+        ids, url = [], "/api/actions/?limit=2&fields=id"
+        while url:
+            page = self.client.get(url).json()
+            ids += [row["id"] for row in page["results"]]
+            url = page["next"]
+        self.assertEqual(ids, [action.pk for action in self.actions])
+        self.assertEqual(self.client.get("/api/actions/", {"cursor": "?"}).status_code, 400)
+
+    def test_conditional(self):
+        """Unchanged responses are validated by their ETag without reading the action tables, until an action changes"""
+        response = self.client.get("/api/actions/")
+        with CaptureQueriesContext(connection) as context:
+            unchanged = self.client.get("/api/actions/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertFalse([query for query in context if "action_" in query["sql"]])
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        Note.objects.create(action=self.actions[0], content="note")
+        self.assertEqual(self.client.get("/api/actions/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
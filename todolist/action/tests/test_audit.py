@@ -0,0 +1,104 @@
+"""Audit logs"""
+
+from datetime import date as date_
+
+from django.db import OperationalError, connection
+from django.db.transaction import atomic
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.models import Action, Log
+from action.tests import create_actions
+from category.models import Category
+from project.models import Project
+
+
+class AuditTestCase(TestCase):
+    """Logs of the changes of the tracked fields and of the dependencies"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        cls.first, cls.second = create_actions(cls.project, 2)
+        cls.commit()  # Logs of the test data
+
+    @staticmethod
+    def commit():
+        """Run the callbacks waiting for a commit, tests never commit"""
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        with CaptureQueriesContext(connection) as context:
+            for _, callback in callbacks:
+                callback()
+        return [query["sql"] for query in context if query["sql"].startswith("INSERT")]
+
+    def logs(self, action):
+        """Contents of the logs of an action, but the creation one"""
+        logs = Log.objects.filter(action=action, number__gt=1).order_by("number")
+        return list(logs.values_list("content", flat=True))
+
+    def test_buffered(self):
+        """Changes are logged with a single insert when the transaction commits"""
+        with atomic():
+            action = Action.objects.get(pk=self.first.pk)
+            action.status, action.deadline = "D", date_(2020, 1, 31)
+            action.save()
+            action.label = "renamed"  # Not tracked
+            action.save()
+            self.second.dependency_set.remove(self.first)
+            Action.objects.get(pk=self.second.pk).save()
+        self.assertEqual(self.logs(self.first), [])
+        self.assertEqual(len(self.commit()), 1)
+        self.assertEqual(self.logs(self.first), ["Status: Archived → In progress, Deadline: – → 2020-01-31"])
+        self.assertEqual(self.logs(self.second), [
+            "Dependency added: {}".format(self.first.slug), "Dependency removed: {}".format(self.first.slug)
+        ])
+        self.assertEqual(Action.objects.get(pk=self.first.pk).log_counter, 2)
+
+    def test_rolled_back(self):
+        """Changes of a rolled back transaction are not logged"""
+        action = Action.objects.get(pk=self.first.pk)
+        with self.assertRaises(OperationalError), atomic():
+            action.status = "D"
+            action.save()
+            raise OperationalError("rolled back")
+        action = Action.objects.get(pk=self.first.pk)
+        action.priority = "↓"
+        action.save()
+        self.commit()
+        self.assertEqual(self.logs(self.first), ["Priority: ⇅ Regular → ↓ Low"])
+
+    def test_savepoint_rolled_back(self):
+        """Changes of a rolled back savepoint are not logged, the other ones of its transaction are"""
+        with atomic():
+            action = Action.objects.get(pk=self.first.pk)
+            action.priority = "↓"
+            action.save()
+            with self.assertRaises(OperationalError), atomic():
+                second = Action.objects.get(pk=self.second.pk)
+                second.status = "D"
+                second.save()
+                self.second.dependency_set.remove(self.first)
+                raise OperationalError("rolled back")
+            action.deadline = date_(2020, 1, 31)
+            action.save()
+        self.assertEqual(len(self.commit()), 1)
+        self.assertEqual(self.logs(self.first), ["Priority: ⇅ Regular → ↓ Low", "Deadline: – → 2020-01-31"])
+        self.assertEqual(self.logs(self.second), ["Dependency added: {}".format(self.first.slug)])
+        self.assertEqual(Action.objects.get(pk=self.first.pk).log_counter, 3)
+
+    def test_last_savepoint_rolled_back(self):
+        """Logs are written even when the last changes of the transaction were rolled back"""
+        with atomic():
+            action = Action.objects.get(pk=self.first.pk)
+            action.priority = "↓"
+            action.save()
+            with atomic():
+                action.deadline = date_(2020, 1, 31)
+                action.save()
+            with self.assertRaises(OperationalError), atomic():
+                action.status = "D"
+                action.save()
+                raise OperationalError("rolled back")
+        self.assertEqual(len(self.commit()), 1)
+        self.assertEqual(self.logs(self.first), ["Priority: ⇅ Regular → ↓ Low", "Deadline: – → 2020-01-31"])
@@ -0,0 +1,38 @@
+"""Admin benchmark"""
+
+from django.test import TestCase
+
+from action.benchmark import AdminBenchmark, parse_scale, percentile, seed
+from action.models import Action, ActionClosure, Note, Log
+
+
+class BenchmarkTestCase(TestCase):
+    """Admin benchmark suite"""
+
+    def test_helpers(self):
+        """Scales and percentiles"""
+        self.assertEqual([parse_scale(value) for value in ("500", "10k", "1.5K", "1m")], [500, 10000, 1500, 1000000])
+        self.assertEqual(percentile(list(range(1, 101)), 50), 50)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_run(self):
+        """Every hot path of every admin answers, saves included, and is measured"""
+        seed(30)
+        self.assertEqual(Action.objects.count(), 30)
+        self.assertEqual(Note.objects.count(), 60)
+        self.assertEqual(Log.objects.count(), 60)
+        self.assertEqual(ActionClosure.objects.count(), 3 * 45)  # Three chains of ten actions
+
+        results = AdminBenchmark(repeat=2).run()
+        self.assertEqual(set(results), {"action.action", "action.event", "action.recurrentaction",
+                                        "project.project", "category.category"})
+        for admin, paths in results.items():
+            expected = {"changelist", "search", "autocomplete", "change_form"}
+            if admin.startswith("action."):
+                expected.add("save")
+            self.assertEqual(set(paths), expected, admin)
+            for name, measures in paths.items():
+                self.assertEqual(measures["status"], 302 if name == "save" else 200, (admin, name))
+                self.assertGreater(measures["queries"], 0)
+                self.assertLessEqual(measures["p50_ms"], measures["p95_ms"])
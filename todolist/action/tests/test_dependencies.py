@@ -0,0 +1,160 @@
+"""Dependencies and their closure"""
+
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.transaction import atomic
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.models import Action, ActionClosure, Event, RecurrentAction
+from action.tests import create_actions
+from category.models import Category
+from project.models import Project
+
+
+class DependencyStatusTestCase(TestCase):
+    """Dependency status column of the action changelists"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_request(self):
+        """Admin request"""
+        request = RequestFactory().get("/")
+        request.user = self.user
+        return request
+
+    def changelist(self, model):
+        """Dependency status of the rendered changelist rows"""
+        model_admin = site._registry[model]  # pylint: disable=protected-access
+        response = self.client.get("/action/{}/".format(model._meta.model_name))  # pylint: disable=protected-access
+        self.assertEqual(response.status_code, 200)
+        return [model_admin.dependency_status(obj) for obj in response.context["cl"].result_list]
+
+    def assert_constant_queries(self, model):
+        """Whatever the number of actions, the changelist costs the same queries, dependency status included"""
+        create_actions(self.project, 3, prefix="{}-3".format(model.__name__))
+        self.changelist(model)  # Warms up the caches, until actions are saved
+        count = model.objects.count()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(len(self.changelist(model)), count)
+        queries = len(context)  # Before the next request resets the query log
+        create_actions(self.project, 30, prefix="{}-30".format(model.__name__))
+        self.changelist(model)
+        count = model.objects.count()
+        with self.assertNumQueries(queries):
+            self.assertEqual(len(self.changelist(model)), count)
+
+    def test_parent_admin(self):
+        """Parent admin"""
+        self.assert_constant_queries(Action)
+
+    def test_child_admins(self):
+        """Child admins"""
+        self.assert_constant_queries(Event)
+        self.assert_constant_queries(RecurrentAction)
+
+    def test_values(self):
+        """Counters match the dependency graph"""
+        first, second, third = create_actions(self.project, 3)  # Archived, dropped, archived
+        third.dependency_set.add(first)
+        Action.objects.filter(pk=first.pk).update(status="C")  # Planned, still to do
+        model_admin = site._registry[Action]  # pylint: disable=protected-access
+        statuses = {obj.pk: model_admin.dependency_status(obj) for obj in model_admin.get_queryset(self.get_request())}
+        self.assertEqual(statuses[first.pk], "0/00//2")
+        self.assertEqual(statuses[second.pk], "1/01//1")
+        self.assertEqual(statuses[third.pk], "1/12//0")
+
+
+class ShallowTestCase(TestCase):
+    """Non polymorphic listings"""
+
+    def test_shallow(self):
+        """Shallow rows are base actions that still know their type, without extra query"""
+        category = Category.objects.create(name="category")
+        create_actions(Project.objects.create(category=category, name="project"), 6)
+        ContentType.objects.get_for_models(Action, Event, RecurrentAction, for_concrete_models=False)
+        with self.assertNumQueries(1):
+            actions = list(Action.objects.shallow())
+            types = sorted({action.type for action in actions})
+        self.assertEqual({type(action) for action in actions}, {Action})
+        self.assertEqual(types, ["action", "event", "recurrent action"])
+
+
+class ActionClosureTestCase(TestCase):
+    """Materialized dependency closure"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+
+    def assert_closure(self):
+        """Incrementally maintained rows match a full rebuild"""
+        rows = set(ActionClosure.objects.values_list("ancestor", "descendant", "depth"))
+        ActionClosure.objects.rebuild()
+        self.assertEqual(rows, set(ActionClosure.objects.values_list("ancestor", "descendant", "depth")))
+
+    def test_lookups(self):
+        """Ancestors and blocked actions are answered from the closure"""
+        first, second, third, fourth = create_actions(self.project, 4)
+        self.assertEqual(set(Action.objects.ancestors_of(fourth)), {first, second, third})
+        self.assertEqual(set(Action.objects.blocked_by(first)), {second, third, fourth})
+        self.assertEqual(
+            ActionClosure.objects.get(ancestor=first, descendant=fourth).depth, 3
+        )
+        fourth.dependency_set.add(first)
+        self.assertEqual(ActionClosure.objects.get(ancestor=first, descendant=fourth).depth, 1)
+        self.assert_closure()
+
+    def test_cycle(self):
+        """Cycles are rejected, whatever the side of the relation"""
+        first, _, third = create_actions(self.project, 3)
+        with self.assertRaises(ValidationError), atomic():
+            first.dependency_set.add(third)
+        with self.assertRaises(ValidationError), atomic():
+            third.subordinate_set.add(first)
+        with self.assertRaises(ValidationError), atomic():
+            first.dependency_set.add(first)
+        self.assertFalse(Action.objects.blocked_by(third).exists())
+
+    def test_legacy_cycle(self):
+        """The migration drops the edges closing a cycle instead of failing"""
+        first, second, third = create_actions(self.project, 3)
+        through = Action.dependency_set.through
+        through.objects.create(from_action=first, to_action=third)  # Bypasses the cycle check
+        ActionClosure.objects.all().delete()
+        with self.assertLogs("action.migrations.0008_actionclosure", "WARNING"):
+            schema_editor = SimpleNamespace(connection=connection)
+            import_module("action.migrations.0008_actionclosure").build_closure(apps, schema_editor)
+        self.assertEqual(through.objects.filter(from_action__in=(first, second, third)).count(), 2)
+        self.assert_closure()
+
+    def test_removal(self):
+        """Removing dependencies or actions removes the paths going through them"""
+        first, second, third, fourth = create_actions(self.project, 4)
+        third.dependency_set.remove(second)
+        self.assertEqual(set(Action.objects.ancestors_of(fourth)), {third})
+        self.assert_closure()
+        third.dependency_set.add(second)
+        second.subordinate_set.clear()
+        self.assertEqual(set(Action.objects.blocked_by(first)), {second})
+        self.assert_closure()
+        third.dependency_set.add(second)
+        second.delete()
+        self.assertFalse(Action.objects.blocked_by(first).exists())
+        self.assertEqual(set(Action.objects.ancestors_of(fourth)), {third})
+        self.assert_closure()
@@ -0,0 +1,117 @@
+"""Importer and exporter"""
+
+import json
+from io import StringIO
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.exporter import export_actions
+from action.importer import import_actions, read_csv, read_jsonl
+from action.models import Action, Event, RecurrentAction, Note, Log
+from action.tests import create_actions
+from category.models import Category
+from project.models import Project
+
+
+class ImportTestCase(TestCase):
+    """Bulk import of actions"""
+
+    ROWS = (
+        '{"project": "project", "label": "one", "description": "d", "dependencies": ["project__two"]}\n'
+        '{"type": "event", "project": "project", "label": "two", "description": "d", "send_reminder": true}\n'
+        '{"type": "recurrentaction", "project": "project", "label": "three", "description": "d",'
+        ' "frequency": "w", "active": true, "count": 3, "dependencies": ["project__one", "project__two"]}\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        Project.objects.create(category=category, name="project")
+
+    def test_import(self):
+        """Imported actions look like saved ones"""
+        report = import_actions(read_jsonl(StringIO(self.ROWS)), chunk_size=2)
+        self.assertEqual((report.rows, report.chunks), (3, 2))
+
+        one, two, three = (Action.objects.get(label=label) for label in ("one", "two", "three"))
+        self.assertEqual((type(one), type(two), type(three)), (Action, Event, RecurrentAction))
+        self.assertTrue(two.send_reminder)
+        self.assertEqual(three.name, "⇅ project – three")
+        self.assertEqual(set(Action.objects.ancestors_of(three)), {one, two})
+        self.assertEqual(set(Action.objects.blocked_by(two)), {one, three})
+        self.assertEqual(list(three.log_set.values_list("number", flat=True)), [1])
+        self.assertEqual(Log.objects.create(action=three, content="log").number, 2)
+
+    def test_cycle(self):
+        """Cyclic dependencies are refused"""
+        rows = self.ROWS + '{"project": "project", "label": "four", "description": "d"}\n'
+        rows = rows.replace('"label": "two",', '"label": "two", "dependencies": ["project__three"],')
+        with self.assertRaisesMessage(ValueError, "Dependency cycle: project__three cannot depend on project__one"):
+            import_actions(read_jsonl(StringIO(rows)))
+        self.assertFalse(Action.objects.filter(label="two").exists())
+
+    def test_pending(self):
+        """Dependencies on later rows wait for at most a chunk, unknown ones are refused"""
+        rows = [{"project": "project", "label": "one", "description": "d", "dependencies": ["project__three"]},
+                {"project": "project", "label": "two", "description": "d", "dependencies": ["project__three"]},
+                {"project": "project", "label": "three", "description": "d"}]
+        import_actions(rows, chunk_size=2)
+        self.assertEqual(Action.objects.blocked_by(Action.objects.get(label="three")).count(), 2)
+        Action.objects.all().delete()
+        with self.assertRaisesMessage(ValueError, "More than 1 dependencies on rows not imported yet"):
+            import_actions(rows, chunk_size=1)
+        rows[2]["label"] = "four"
+        with self.assertRaisesMessage(ValueError, "Unknown dependency: project__three"):
+            import_actions(rows, chunk_size=2)
+
+
+class ExportTestCase(TestCase):
+    """Streaming export of actions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+
+    def count_queries(self, export_format, chunk_size):
+        """Queries needed to export everything"""
+        with CaptureQueriesContext(connection) as context:
+            lines = list(export_actions(export_format, chunk_size=chunk_size))
+        return len(context), lines
+
+    def test_queries_per_chunk(self):
+        """Queries only depend on the number of chunks"""
+        create_actions(self.project, 6, prefix="small")
+        small, lines = self.count_queries("jsonl", 3)
+        self.assertEqual(len(lines), 2 + 6)
+        create_actions(self.project, 24, prefix="big")
+        big, lines = self.count_queries("jsonl", 15)
+        self.assertEqual(len(lines), 2 + 30)
+        self.assertEqual(small, big)
+
+    def test_round_trip(self):
+        """Exported records can be imported back into an empty database"""
+        first, second = create_actions(self.project, 2)
+        Note.objects.create(action=second, content="note")
+        records = [json.loads(line) for line in export_actions("jsonl")]
+        self.assertEqual(records[0], {"type": "category", "name": "category", "slug": "category"})
+        self.assertEqual(records[1], {"type": "project", "category": "category", "name": "project",
+                                      "slug": self.project.slug})
+        self.assertEqual(records[3]["dependencies"], [first.slug])
+        self.assertEqual(records[3]["notes"], [{"number": 1, "content": "note"}])
+        self.assertEqual(records[3]["type"], "event")
+
+        Action.objects.all().delete()
+        Project.objects.all().delete()
+        Category.objects.all().delete()
+        import_actions(records, chunk_size=1)
+        self.assertEqual(Project.objects.get().slug, self.project.slug)
+        imported = Action.objects.ancestors_of(Action.objects.get(slug=second.slug))
+        self.assertEqual(list(imported.values_list("slug", flat=True)), [first.slug])
+        _, lines = self.count_queries("csv", 10)
+        self.assertEqual(len(lines), 1 + 2 + 2)
+        Action.objects.all().delete()
+        report = import_actions(read_csv(StringIO("".join(lines))))
+        self.assertEqual((report.rows, Action.objects.count()), (4, 2))
@@ -0,0 +1,51 @@
+"""Indexes"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from action.importer import import_actions
+from action.indexes import audit, explain, table_indexes
+from action.reminders import ReminderScheduler
+from action.tests import ListBackend
+from category.models import Category
+from project.models import Project
+
+
+class IndexTestCase(TestCase):
+    """Indexes of the action tables"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+
+    def test_no_text_index(self):
+        """Free text columns are not indexed (the full-text index covers them)"""
+        for (table, name), (columns, _) in table_indexes().items():
+            self.assertFalse({"description", "content"} & set(columns), "{}.{}".format(table, name))
+
+    def test_audit(self):
+        """The purpose-built indexes are used by the queries of the application"""
+        used = {(usage.table, usage.columns) for usage in audit() if usage.statements}
+        self.assertIn(("action_action", ("project_id", "status", "deadline")), used)
+        for table in ("action_note", "action_step", "action_log"):
+            self.assertIn((table, ("action_id", "number")), used)
+        self.assertIn(("action_occurrence", ("date",)), used)
+
+    def test_reminder_index(self):
+        """Upcoming reminders are found through the partial index, whatever the number of other events"""
+        planned_on = (now() + timedelta(days=3)).isoformat()
+        import_actions(
+            {"type": "event", "project": "project", "label": "event-{}".format(i), "description": "-",
+             "planned_on": planned_on, "send_reminder": i % 500 == 0}
+            for i in range(2000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        with CaptureQueriesContext(connection) as context:
+            ReminderScheduler(backend=ListBackend()).load()
+        self.assertIn("action_event_reminder_idx", explain(context.captured_queries[0]["sql"]))
@@ -0,0 +1,64 @@
+"""Estimates and durations in minutes"""
+
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.models import Action
+from category.models import Category
+from project.models import Project
+
+
+class TimeTotalsTestCase(TestCase):
+    """Estimates and durations in minutes, summed by the database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        other = Project.objects.create(category=Category.objects.create(name="other"), name="other")
+        for project, estimate, unit, status in ((cls.project, 2, "h", "C"), (cls.project, 1, "d", "D"),
+                                                (other, 1, "w", "C"), (other, None, None, "C")):
+            Action.objects.create(project=project, label="action", description="d", status=status,
+                                  estimate=estimate, estimate_unit=unit, duration=30, duration_unit="m")
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def test_sync(self):
+        """Minutes follow the saved estimate and duration"""
+        action = Action.objects.filter(project=self.project).order_by("pk").first()
+        self.assertEqual((action.estimate_minutes, action.duration_minutes), (120, 30))
+        action.estimate, action.estimate_unit = 3, "d"
+        action.save(update_fields=["estimate", "estimate_unit"])
+        self.assertEqual(Action.objects.get(pk=action.pk).estimate_minutes, 3 * 24 * 60)
+
+    def test_backfill(self):
+        """The migration converts the existing estimates and durations"""
+        Action.objects.update(estimate_minutes=None, duration_minutes=None)
+        schema_editor = SimpleNamespace(connection=connection)  # Only its connection is used
+        import_module("action.migrations.0015_minutes").fill_minutes(apps, schema_editor)
+        self.assertEqual(Action.objects.time_totals(), {"estimate_total": 120 + 1440 + 10080, "duration_total": 120})
+
+    def test_totals(self):
+        """Totals per project, category and status"""
+        totals = {row["project"]: row["estimate_total"] for row in Action.objects.project_time_totals()}
+        self.assertEqual(totals[self.project.pk], 120 + 1440)
+        totals = {row["project__category"]: row["duration_total"] for row in Action.objects.category_time_totals()}
+        self.assertEqual(totals[self.project.category_id], 60)
+        totals = {row["status"]: row["estimate_total"] for row in Action.objects.status_time_totals()}
+        self.assertEqual(totals, {"C": 120 + 10080, "D": 1440})
+        self.assertEqual(Action.minutes_label(10080 + 1440 + 150), "1 week(s) 1 day(s) 2 hour(s) 30 minute(s)")
+
+    def test_changelist(self):
+        """The changelist shows the total of the filtered actions, from one aggregate query without subqueries"""
+        self.client.force_login(User.objects.get(username="admin"))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/action/action/", {"project__id__exact": self.project.pk})
+        self.assertContains(response, "estimate 1 day(s) 2 hour(s), duration 1 hour(s)")
+        sums = [query["sql"] for query in context if "SUM(" in query["sql"]]
+        self.assertEqual(len(sums), 1)
+        self.assertNotIn("dependency_set", sums[0])
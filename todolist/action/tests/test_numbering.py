@@ -0,0 +1,54 @@
+"""Numbering of the notes, steps and logs"""
+
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.models import Action, Note, Step, Log
+from action.querysets import returns_updated_rows
+from action.tests import create_actions
+from category.models import Category
+from project.models import Project
+
+
+class NumberingTestCase(TestCase):
+    """Per action numbering of notes, steps and logs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+
+    def test_per_model(self):
+        """Each inline model has its own sequence, the creation log being the first log"""
+        action, = create_actions(self.project, 1)
+        self.assertEqual(list(action.log_set.values_list("number", flat=True)), [1])
+        notes = [Note.objects.create(action=action, content="note") for _ in range(2)]
+        step = Step.objects.create(action=action, content="step")
+        log = Log.objects.create(action=action, content="log")
+        self.assertEqual([note.number for note in notes], [1, 2])
+        self.assertEqual(step.number, 1)
+        self.assertEqual(log.number, 2)
+
+    def test_block(self):
+        """A whole block of numbers is reserved at once"""
+        action, = create_actions(self.project, 1)
+        notes = [Note(action=action, content="note") for _ in range(10)]
+        with self.assertNumQueries(1 if returns_updated_rows(connection) else 2):
+            Action.objects.assign_numbers(notes)
+        Note.objects.bulk_create(notes)
+        self.assertEqual(Note.objects.create(action=action, content="note").number, 11)
+        self.assertEqual(list(action.note_set.values_list("number", flat=True)), list(range(1, 12)))
+
+    def test_save_queries(self):
+        """Numbering a saved note costs one query with UPDATE ... RETURNING, two without"""
+        action, = create_actions(self.project, 1)
+        for returning, queries, number in ((True, 1, 1), (False, 2, 2)):
+            with patch("action.querysets.returns_updated_rows", return_value=returning), \
+                    CaptureQueriesContext(connection) as context:
+                self.assertEqual(Note.objects.create(action=action, content="note").number, number)
+            self.assertEqual(len([query for query in context if "note_counter" in query["sql"]]), queries)
+            with self.assertRaises(Action.DoesNotExist):
+                Action.objects.reserve_numbers(0, Note)
@@ -0,0 +1,99 @@
+"""Recurrent actions"""
+
+from datetime import date as date_, datetime, timedelta
+
+from django.test import TestCase
+from django.utils.timezone import localtime, make_aware, now
+
+from action.models import RecurrentAction, Occurrence
+from action.recurrence import expand, occurrences
+from category.models import Category
+from project.models import Project
+
+
+class RecurrenceTestCase(TestCase):
+    """Occurrences of recurrent actions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+
+    def recurrent_action(self, label, frequency, planned_on, count=0, until=None):
+        """Saved recurrent action"""
+        return RecurrentAction.objects.create(
+            project=self.project, label=label, description="description", active=True,
+            frequency=frequency, planned_on=planned_on, count=count, until=until,
+        )
+
+    def test_monthly(self):
+        """Monthly occurrences stay on the same day, or the last day of shorter months"""
+        action = self.recurrent_action("monthly", "m", make_aware(datetime(2019, 1, 31, 9)), count=4)
+        dates = [date.date() for _, date in occurrences(action)]
+        self.assertEqual(dates, [date_(2019, 1, 31), date_(2019, 2, 28), date_(2019, 3, 31), date_(2019, 4, 30)])
+
+    def test_window(self):
+        """Occurrences of a window are found without walking the previous ones, wall-clock time is kept"""
+        action = self.recurrent_action("daily", "d", make_aware(datetime(2019, 3, 1, 9)))
+        window = list(occurrences(action, make_aware(datetime(2019, 3, 30)), make_aware(datetime(2019, 4, 2))))
+        self.assertEqual([number for number, _ in window], [30, 31, 32])
+        self.assertEqual({localtime(date).hour for _, date in window}, {9})
+
+    def test_until(self):
+        """Until bounds the occurrences"""
+        action = self.recurrent_action(
+            "weekly", "w", make_aware(datetime(2019, 1, 1)), until=make_aware(datetime(2019, 1, 15))
+        )
+        self.assertEqual(len(list(occurrences(action))), 3)
+
+    def test_expand(self):
+        """Occurrences of many actions are merged by date"""
+        weekly = self.recurrent_action("weekly", "w", make_aware(datetime(2019, 1, 1)))
+        yearly = self.recurrent_action("yearly", "y", make_aware(datetime(2019, 1, 3)))
+        expanded = list(expand([weekly, yearly], make_aware(datetime(2019, 1, 1)), make_aware(datetime(2019, 1, 9))))
+        self.assertEqual([(number, action) for _, number, action in expanded], [(1, weekly), (1, yearly), (2, weekly)])
+
+    def test_expand_bounds(self):
+        """Bulk expansion finds the same occurrences as the generator, whatever the bounds"""
+        actions = [
+            self.recurrent_action("monthly", "m", make_aware(datetime(2019, 1, 31, 9)), count=4),
+            self.recurrent_action("daily", "d", make_aware(datetime(2019, 3, 1, 9)),
+                                  until=make_aware(datetime(2019, 3, 12, 9))),
+            self.recurrent_action("weekly", "w", make_aware(datetime(2019, 1, 1)),
+                                  until=make_aware(datetime(2019, 3, 1))),
+            self.recurrent_action("yearly", "y", make_aware(datetime(2016, 2, 29))),
+        ]
+        start, end = make_aware(datetime(2019, 2, 10)), make_aware(datetime(2019, 4, 30, 9))
+        expected = sorted(
+            ((date, number, action.pk) for action in actions for number, date in occurrences(action, start, end)),
+            key=lambda occurrence: occurrence[0],
+        )
+        expanded = [(date, number, action.pk) for date, number, action in expand(actions, start, end)]
+        self.assertEqual(expanded, expected)
+        self.assertEqual(len(expanded), 2 + 12 + 3 + 1)
+
+    def test_materialized(self):
+        """Upcoming occurrences are materialized on save"""
+        start = now()
+        action = self.recurrent_action("daily", "d", start, count=10)
+        self.assertEqual(Occurrence.objects.between(start, start + timedelta(days=7)).count(), 7)
+        action.count = 3
+        action.save()
+        self.assertEqual(action.occurrence_set.count(), 3)
+        action.active = False
+        action.save(update_fields=["active"])
+        self.assertFalse(action.occurrence_set.exists())
+
+    def test_unchanged(self):
+        """Occurrences are rewritten only when a recurrence field changes"""
+        self.recurrent_action("daily", "d", now(), count=5)
+        action = RecurrentAction.objects.get(label="daily")
+        ids = list(action.occurrence_set.values_list("pk", flat=True))
+        action.label, action.status = "renamed", "D"
+        action.save()
+        self.assertEqual(list(action.occurrence_set.values_list("pk", flat=True)), ids)
+        action.count = 2
+        action.save(update_fields=["label"])  # Not saved
+        self.assertEqual(action.occurrence_set.count(), 5)
+        action.save()
+        self.assertEqual(action.occurrence_set.count(), 2)
@@ -0,0 +1,106 @@
+"""Event reminders"""
+
+import os
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from action.models import Event
+from action.reminders import SCHEDULERS, ReminderScheduler, send_ids
+from action.tests import ListBackend
+from category.models import Category
+from project.models import Project
+
+
+class ReminderTestCase(TestCase):
+    """Event reminders scheduling"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+
+    def event(self, label, planned_on, send_reminder=True):
+        """Saved event"""
+        return Event.objects.create(
+            project=self.project, label=label, description="description", planned_on=planned_on,
+            send_reminder=send_reminder,
+        )
+
+    def test_schedule(self):
+        """Reminders are loaded once, then updated by signals and delivered in batches by due time"""
+        start = now()
+        late = self.event("late", start + timedelta(hours=3))
+        self.event("soon", start + timedelta(hours=2))
+        self.event("silent", start + timedelta(hours=2), send_reminder=False)
+        self.event("past", start - timedelta(hours=2))
+
+        scheduler = ReminderScheduler(backend=ListBackend(), batch_size=1)
+        with self.assertNumQueries(1):
+            scheduler.load()
+        self.assertEqual(len(scheduler.due), 2)
+        self.assertEqual(scheduler.next_time(), start + timedelta(hours=1))
+
+        SCHEDULERS.append(scheduler)
+        try:
+            late.planned_on = start + timedelta(hours=1, minutes=30)
+            late.save()
+            self.event("new", start + timedelta(hours=4))
+        finally:
+            SCHEDULERS.remove(scheduler)
+        self.assertEqual(scheduler.next_time(), start + timedelta(minutes=30))
+
+        with patch("action.reminders.now", return_value=start + timedelta(hours=1)):
+            self.assertEqual(scheduler.deliver(), 2)
+        self.assertEqual(scheduler.backend.batches, [["late"], ["soon"]])
+        self.assertEqual(scheduler.next_time(), start + timedelta(hours=3))
+
+    def test_other_process(self):
+        """The worker sleeps until another process notifies it of a change, then updates its queue"""
+        start = now()
+        self.event("soon", start + timedelta(hours=2))
+        with TemporaryDirectory() as directory, \
+                override_settings(REMINDER_SOCKET_PATH=os.path.join(directory, "reminders.sock")):
+            scheduler = ReminderScheduler(backend=ListBackend())
+            scheduler.listen()
+            try:
+                scheduler.load()
+                with self.assertNumQueries(0):
+                    scheduler.wait(0.01)  # Nothing changed
+                self.assertEqual(scheduler.next_time(), start + timedelta(hours=1))
+
+                sooner = self.event("sooner", start + timedelta(hours=1, minutes=30))  # Not committed in tests
+                self.assertEqual(scheduler.next_time(), start + timedelta(hours=1))
+                send_ids([str(sooner.pk)])  # What the commit sends from another process
+                with self.assertNumQueries(1):
+                    scheduler.wait(None)
+                self.assertEqual(scheduler.next_time(), start + timedelta(minutes=30))
+
+                scheduler.stop()
+                scheduler.wait(None)  # Woken up at once
+            finally:
+                scheduler.close()
+            self.assertFalse(os.listdir(directory))
+
+    def test_missed(self):
+        """Reminders that fell due while no worker was running are sent on startup, once"""
+        start = now()
+        event = self.event("missed", start + timedelta(minutes=30))
+        self.event("started", start - timedelta(minutes=30))
+        scheduler = ReminderScheduler(backend=ListBackend())
+        scheduler.load()
+        self.assertEqual(scheduler.deliver(), 1)
+        self.assertEqual(scheduler.backend.batches, [["missed"]])
+        self.assertIsNotNone(Event.objects.get(pk=event.pk).reminded_on)
+
+        scheduler.load()
+        self.assertIsNone(scheduler.next_time())
+        event = Event.objects.get(pk=event.pk)
+        event.planned_on = start + timedelta(hours=3)  # Moved: reminded again
+        event.save()
+        scheduler.load()
+        self.assertEqual(scheduler.next_time(), start + timedelta(hours=2))
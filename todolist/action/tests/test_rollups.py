@@ -0,0 +1,164 @@
+"""Transitions and rollups"""
+
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from action.importer import import_actions, read_jsonl
+from action.models import Action, ActionRollup, Event, Log
+from action.tests import create_actions, test_importer
+from category.models import Category
+from project.models import Project
+
+
+class TransitionTestCase(TestCase):
+    """Batch status and priority transitions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def project_number(self, index):
+        """The project of the fixture, then new ones"""
+        if not index:
+            return self.project
+        return Project.objects.get_or_create(category=self.project.category, name="project-{}".format(index))[0]
+
+    def transition(self, count, prefix, projects=1):
+        """Queries needed to reopen the archived actions among count new ones of each project, and their ids"""
+        archived = [
+            action.pk
+            for index in range(projects)
+            for action in create_actions(self.project_number(index), count, "{}-{}".format(prefix, index))
+            if action.status == "E"
+        ]
+        with CaptureQueriesContext(connection) as context:
+            changed = Action.objects.transition(archived, status="D", priority="↑")
+        self.assertEqual(changed, archived)
+        return len(context), archived
+
+    def test_constant_queries(self):
+        """Queries do not depend on the number of actions, each of them gets a log and the counters follow"""
+        small, _ = self.transition(4, "small")
+        big, archived = self.transition(40, "big")
+        self.assertEqual(small, big)
+        self.assertEqual(Action.objects.filter(pk__in=archived, status="D", priority="↑").count(), len(archived))
+        log = Log.objects.get(action=archived[-1], number=2)
+        self.assertEqual(log.content, "Status: Archived → In progress, Priority: ⇅ Regular → ↑ High")
+        self.assertEqual(Action.objects.get(pk=archived[-1]).log_counter, 2)
+        self.assertEqual(ActionRollup.objects.get(project=self.project, bucket="progress").count, 22)
+        self.assertEqual(Action.objects.transition(archived, status="D"), [])
+
+    def test_projects(self):
+        """Queries do not depend on the number of projects either, missing counters included"""
+        single, _ = self.transition(4, "single")
+        several, archived = self.transition(4, "several", projects=5)
+        self.assertEqual(single, several)
+        self.assertEqual(len(archived), 10)
+        for index in range(5):
+            project = self.project_number(index)
+            self.assertEqual(ActionRollup.objects.get(project=project, bucket="progress").count, 2 if index else 4)
+            self.assertEqual(ActionRollup.objects.get(project=project, bucket="archived").count, 0)
+
+    def test_refused(self):
+        """A single forbidden move cancels the whole batch"""
+        archived, dropped = create_actions(self.project, 2)
+        with self.assertRaises(ValidationError):
+            Action.objects.transition([archived.pk, dropped.pk], status="D")
+        self.assertEqual(Action.objects.get(pk=archived.pk).status, "E")
+        with self.assertRaises(ValidationError):
+            Action.objects.transition([archived.pk, 0], status="D")
+
+    def test_endpoint(self):
+        """Batches are applied in a single transaction"""
+        archived, dropped = create_actions(self.project, 2)
+        self.client.force_login(User.objects.get(username="admin"))
+        batches = [{"ids": [archived.pk], "status": "D"}, {"ids": [dropped.pk], "status": "C"}]
+        response = self.client.post("/api/actions/transition/", json.dumps(batches), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Action.objects.get(pk=archived.pk).status, "E")
+        batches[1]["status"] = "E"
+        response = self.client.post("/api/actions/transition/", json.dumps(batches), content_type="application/json")
+        self.assertEqual(response.json(), {"changed": [[archived.pk], [dropped.pk]]})
+
+
+class RollupTestCase(TestCase):
+    """Denormalised action counters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        cls.other = Project.objects.create(category=category, name="other")
+
+    def counts(self):
+        """{(project name, bucket): count} of the non zero counters"""
+        return {
+            (row.project.name, row.bucket): row.count
+            for row in ActionRollup.objects.select_related("project").exclude(count=0)
+        }
+
+    def test_transitions(self):
+        """Creations, status and project changes and deletions move the counters"""
+        actions = create_actions(self.project, 4)  # Archived, dropped, archived, dropped
+        self.assertEqual(self.counts(), {("project", "archived"): 2, ("project", "dropped"): 2})
+
+        action = Action.objects.get(pk=actions[0].pk)
+        action.status = "D"
+        action.save()
+        action.save()
+        event = Event.objects.get(pk=actions[1].pk)
+        event.project = self.other
+        event.status = "B"
+        event.save()
+        self.assertEqual(self.counts(), {
+            ("project", "archived"): 1, ("project", "dropped"): 1, ("project", "progress"): 1, ("other", "open"): 1,
+        })
+
+        unloaded = Action.objects.get(pk=actions[2].pk)
+        del unloaded._rollup_key  # As if built by hand
+        unloaded.status = "A"
+        unloaded.save()
+        event.delete()
+        Action.objects.get(pk=actions[3].pk).delete()
+        self.assertEqual(self.counts(), {("project", "open"): 1, ("project", "progress"): 1})
+
+    def test_apply(self):
+        """Deltas of several projects and buckets are applied by two statements, missing counters included"""
+        ActionRollup.objects.create(project=self.project, bucket="open", count=5)
+        deltas = {(self.project.pk, "A"): 2, (self.project.pk, "B"): -3, (self.project.pk, "E"): 1,
+                  (self.other.pk, "D"): 4, (self.other.pk, "V"): 1, (self.other.pk, "W"): -1}
+        with self.assertNumQueries(2):
+            ActionRollup.objects.apply(deltas)
+        self.assertEqual(self.counts(), {("project", "open"): 4, ("project", "archived"): 1, ("other", "progress"): 4})
+        with self.assertNumQueries(0):
+            ActionRollup.objects.apply({(self.other.pk, "V"): 1, (self.other.pk, "X"): -1})
+
+    def test_import_and_rebuild(self):
+        """Imported actions are counted, the rebuild gives the same counters"""
+        rows = test_importer.ImportTestCase.ROWS.replace('"project": "project"', '"project": "other"')
+        rows = rows.replace("project__", "other__")
+        import_actions(read_jsonl(StringIO(rows)))
+        create_actions(self.project, 3)
+        counts = self.counts()
+        self.assertEqual(counts, {("other", "open"): 3, ("project", "archived"): 2, ("project", "dropped"): 1})
+        ActionRollup.objects.all().delete()
+        call_command("rebuild_rollups", stdout=StringIO())
+        self.assertEqual(self.counts(), counts)
+
+    def test_changelists(self):
+        """Project and category lists show the counters"""
+        create_actions(self.project, 3)
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+        for url in ("/project/project/", "/category/category/"):
+            response = self.client.get(url)
+            self.assertContains(response, '<td class="field-archived_count">2</td>', html=True)
+            self.assertContains(response, '<td class="field-dropped_count">1</td>', html=True)
@@ -0,0 +1,72 @@
+"""Scheduling"""
+
+from datetime import date as date_, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+
+from action.graph import critical_path_method
+from action.models import Action
+from action.schedule import schedule_project
+from category.models import Category
+from project.models import Project
+
+
+class ScheduleTestCase(TestCase):
+    """Critical path of the actions of a project"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=category, name="project")
+        cls.start = make_aware(datetime(2020, 1, 6, 8))
+
+        def create(label, **kwargs):
+            return Action.objects.create(project=cls.project, label=label, description="d", status="C", **kwargs)
+
+        cls.design = create("design", duration=2, duration_unit="d")
+        cls.build = create("build", estimate=1, estimate_unit="w", deadline=date_(2020, 1, 10))
+        cls.build.dependency_set.add(cls.design)
+        cls.docs = create("docs", duration=3, duration_unit="h", planned_on=cls.start + timedelta(days=1))
+        cls.done = create("done", duration=1, duration_unit="w", deadline=date_(2019, 1, 1))
+        cls.done.status = "E"
+        cls.done.save()
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def test_critical_path_method(self):
+        """Earliest and latest starts of a small graph, cycles are rejected"""
+        order, earliest, latest = critical_path_method([2, 3, 1], [(0, 1)], dues=[None, None, 2])
+        self.assertEqual(list(order), [0, 2, 1])
+        self.assertEqual(list(earliest), [0, 2, 0])
+        self.assertEqual(list(latest), [0, 2, 1])
+        with self.assertRaises(ValueError):
+            critical_path_method([1, 1], [(0, 1), (1, 0)])
+
+    def test_schedule(self):
+        """Actions start after their dependencies and their planned date, late ones are reported"""
+        with CaptureQueriesContext(connection) as context:
+            schedule = schedule_project(self.project.pk, self.start)
+        self.assertEqual(len(context), 1)
+        rows = {row.id: row for row in schedule.rows()}
+        self.assertEqual(rows[self.build.pk].start, self.start + timedelta(days=2))
+        self.assertEqual(rows[self.docs.pk].start, self.start + timedelta(days=1))
+        self.assertEqual(schedule.finish, self.start + timedelta(days=9))
+        self.assertEqual([row.id for row in schedule.critical_path()], [self.design.pk, self.build.pk])
+        self.assertEqual([row.id for row in schedule.late()], [self.build.pk])
+        self.assertEqual(rows[self.build.pk].slack, timedelta(days=-4, hours=-8))
+        self.assertFalse(rows[self.done.pk].late)
+
+    def test_views(self):
+        """The schedule is shown by a command and an admin view"""
+        out = StringIO()
+        call_command("schedule_project", self.project.slug, start="2020-01-06T08:00", stdout=out)
+        self.assertIn("4 actions, finished on 2020-01-15 08:00, 1 late", out.getvalue())
+        self.client.force_login(User.objects.get(username="admin"))
+        response = self.client.get("/project/project/{}/schedule/".format(self.project.pk))
+        self.assertContains(response, self.build.name)
+        self.assertNotContains(response, self.docs.name)
@@ -0,0 +1,98 @@
+"""Full-text search"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from action.importer import import_actions
+from action.models import Action, Note, Step
+from action.search import get_backend
+from category.models import Category
+from project.models import Project
+
+
+class SearchTestCase(TestCase):
+    """Full-text search of the actions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="garden")
+        cls.project = Project.objects.create(category=category, name="vegetables")
+        User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(username="admin"))
+
+    def create(self, label, description):
+        """Saved action"""
+        return Action.objects.create(project=self.project, label=label, description=description)
+
+    def search(self, term, ranked=False, **params):
+        """Labels of the changelist search results, sorted unless ranked"""
+        response = self.client.get("/action/action/", dict(params, q=term))
+        labels = [obj.label for obj in response.context["cl"].result_list]
+        return labels if ranked else sorted(labels)
+
+    def test_index_sync(self):
+        """Descriptions, notes, steps and logs are searchable, and kept up to date"""
+        tomatoes = self.create("tomatoes", "Plant the tomatoes")
+        self.create("carrots", "Sow carrots along the fence")
+        self.assertEqual(self.search("fen"), ["carrots"])
+        self.assertEqual(self.search("vegetables garden"), ["carrots", "tomatoes"])
+
+        note = Note.objects.create(action=tomatoes, content="Buy some compost")
+        Step.objects.create(action=tomatoes, content="Water twice a week")
+        self.assertEqual(self.search("compost"), ["tomatoes"])
+        self.assertEqual(self.search("twice"), ["tomatoes"])
+        self.assertEqual(self.search("creation"), ["carrots", "tomatoes"])
+        note.delete()
+        self.assertEqual(self.search("compost"), [])
+        tomatoes.delete()
+        self.assertEqual(self.search("tomatoes"), [])
+
+    def test_ranking(self):
+        """Matches on labels come before matches in descriptions"""
+        weeding = self.create("weeding", "Remove the weeds near the carrots")
+        carrots = self.create("carrots", "Harvest")
+        self.assertEqual(self.search("carrots", ranked=True), ["carrots", "weeding"])
+        ranked = get_backend().search(Action.objects.all(), "carrots").order_by("search_rank")
+        self.assertEqual(list(ranked.values_list("pk", flat=True)), [carrots.pk, weeding.pk])
+
+    def test_sorted_column(self):
+        """A sorted column orders the matches instead of their rank"""
+        self.create("weeding", "Remove the weeds near the carrots")
+        self.create("carrots", "Harvest")
+        self.assertEqual(self.search("carrots", ranked=True, o="4"), ["carrots", "weeding"])  # Label, after the checkbox
+        self.assertEqual(self.search("carrots", ranked=True, o="-4"), ["weeding", "carrots"])
+
+    def test_notes_only(self):
+        """Notes and transitions only rebuild the notes part, the title and body parts are kept"""
+        tomatoes = self.create("tomatoes", "Plant the tomatoes")
+        Note.objects.create(action=tomatoes, content="Buy some compost")
+        Action.objects.transition([tomatoes.pk], priority="↑")
+        self.assertEqual(self.search("compost"), ["tomatoes"])
+        self.assertEqual(self.search("plant vegetables"), ["tomatoes"])
+        self.assertEqual(self.search("priority"), ["tomatoes"])
+
+    def test_whole_result(self):
+        """Every match is counted and paginated, in SQL"""
+        import_actions(
+            {"project": "vegetables", "label": "sow-{}".format(i), "description": "Sow the seeds"} for i in range(150)
+        )
+        self.create("harvest", "Harvest the seeds")
+        response = self.client.get("/action/action/", {"q": "seeds"})
+        changelist = response.context["cl"]
+        self.assertEqual(changelist.result_count, 151)
+        self.assertEqual(len(changelist.result_list), changelist.list_per_page)
+        response = self.client.get("/action/action/", {"q": "seeds", "p": 1})
+        self.assertEqual(len(response.context["cl"].result_list), 151 - changelist.list_per_page)
+
+    def test_renamed(self):
+        """Renamed projects and categories are searchable by their new names"""
+        self.create("tomatoes", "Plant the tomatoes")
+        self.project.name = "orchard"
+        self.project.save()
+        self.assertEqual(self.search("orchard"), ["tomatoes"])
+        category = self.project.category
+        category.name = "park"
+        category.save(update_fields=["name"])
+        self.assertEqual(self.search("park orchard"), ["tomatoes"])
@@ -0,0 +1,63 @@
+"""SQLite tuning"""
+
+import json
+from copy import deepcopy
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from action.sqlite import retry_on_lock
+
+
+class SQLiteTestCase(TestCase):
+    """SQLite tuning"""
+
+    def test_pragmas(self):
+        """New connections are tuned"""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    @override_settings(SQLITE_RETRY_DELAY=0)
+    def test_retry(self):
+        """Locked writes are retried, other errors and writes within a transaction are not"""
+        calls = []
+
+        def write(error):
+            calls.append(error)
+            if len(calls) < 3:
+                raise OperationalError(error)
+            return "written"
+
+        with patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(retry_on_lock(write)("database is locked"), "written")
+            self.assertEqual(len(calls), 3)
+            calls.clear()
+            with self.assertRaises(OperationalError):
+                retry_on_lock(write)("no such table: nowhere")
+            self.assertEqual(len(calls), 1)
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            retry_on_lock(write)("database is locked")
+        self.assertEqual(len(calls), 1)
+
+    def test_maintenance(self):
+        """The maintenance command runs on the test database"""
+        stdout = StringIO()
+        call_command("sqlite_maintenance", "--analyze", stdout=stdout)
+        self.assertIn("Maintenance done", stdout.getvalue())
+
+    def test_bench_writers(self):
+        """The writers benchmark runs on temporary databases, the connection settings are left untouched"""
+        databases = deepcopy(connections.databases)
+        stdout = StringIO()
+        call_command("bench_writers", "--threads", "2", "--writes", "3", stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report["after"]["saves"] + report["after"]["failures"], 6)
+        self.assertEqual(connections.databases, databases)
@@ -0,0 +1,13 @@
+"""## Action URL Configuration"""
+
+
+from django.urls import path
+
+from action import views
+
+
+app_name = "action"  # pylint: disable=invalid-name
+
+urlpatterns = [  # pylint: disable=invalid-name
+    path("actions.<str:export_format>", views.export, name="export"),
+]
@@ -1 +1,113 @@
-"""TODO"""
+"""# Action views"""
+
+import json
+from collections import defaultdict
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db.transaction import atomic
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+
+from action.exporter import CONTENT_TYPES, INLINE_FIELDS, export_actions
+from action.models import Action, Event, Log, Note, RecurrentAction, Step
+from todolist.api import Resource
+
+
+API_SKIPPED_FIELDS = ("polymorphic_ctype", "action_ptr", "note_counter", "step_counter", "log_counter", "reminded_on")
+
+
+@staff_member_required
+def export(request, export_format):
+    """Stream an export of the categories, the projects and all the actions as JSON lines or CSV"""
+    if export_format not in CONTENT_TYPES:
+        raise Http404("Unknown export format")
+    try:
+        chunk_size = max(1, min(int(request.GET.get("chunk_size", 1000)), 10000))
+    except ValueError:
+        chunk_size = 1000
+
+    response = StreamingHttpResponse(
+        export_actions(export_format, chunk_size=chunk_size), content_type=CONTENT_TYPES[export_format]
+    )
+    response["Content-Disposition"] = 'attachment; filename="actions.{}"'.format(export_format)
+    return response
+
+
+@staff_member_required
+@require_POST
+def transition(request):
+    """
+    Apply batches of status and priority transitions, all or nothing.
+
+    The body is a JSON object, or a list of them: {"ids": [...], "status": "D", "priority": "↑"}, status and
+    priority being optional. Answer the ids of the changed actions of each batch.
+    """
+    if not request.user.has_perm("action.change_action"):
+        return JsonResponse({"error": "403 Forbidden"}, status=403)
+    try:
+        batches = json.loads(request.body)
+        batches = [batches] if isinstance(batches, dict) else batches
+        with atomic():
+            changed = [
+                Action.objects.transition(batch["ids"], status=batch.get("status"), priority=batch.get("priority"))
+                for batch in batches
+            ]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": "Invalid transitions"}, status=400)
+    except ValidationError as error:
+        return JsonResponse({"error": error.messages}, status=400)
+    return JsonResponse({"changed": changed})
+
+
+def api_fields(model):
+    """Names of the API fields of a model, the project being given by id"""
+    return [
+        field.name for field in model._meta.concrete_fields  # pylint: disable=protected-access
+        if field.name not in API_SKIPPED_FIELDS
+    ]
+
+
+def action_type(content_type_id):
+    """Type of an action, from the content type cache"""
+    return ContentType.objects.get_for_id(content_type_id).model
+
+
+def inline_rows(model, fields):
+    """Include of the rows of a model, in a single query for all the actions of a page"""
+    def include(ids):
+        related = defaultdict(list)
+        for row in model.objects.filter(action__in=ids).order_by("action", "number").values("action", *fields):
+            related[row.pop("action")].append(row)
+        return related
+    return include
+
+
+def dependencies(ids):
+    """Ids of the actions each action depends on, in a single query"""
+    related = defaultdict(list)
+    rows = Action.dependency_set.through.objects.filter(from_action__in=ids).order_by("from_action", "to_action")
+    for from_action, to_action in rows.values_list("from_action", "to_action"):
+        related[from_action].append(to_action)
+    return related
+
+
+INCLUDES = {
+    "notes": inline_rows(Note, INLINE_FIELDS["notes"][1]),
+    "steps": inline_rows(Step, INLINE_FIELDS["steps"][1]),
+    "logs": inline_rows(Log, INLINE_FIELDS["logs"][1]),
+    "dependencies": dependencies,
+}
+
+ACTION_RESOURCES = [
+    Resource(
+        name,
+        model.objects.non_polymorphic(),
+        fields=api_fields(model),
+        computed={"type": ("polymorphic_ctype", action_type)},
+        includes=INCLUDES,
+        models=(Action, Note, Step, Log),
+    )
+    for name, model in (("actions", Action), ("events", Event), ("recurrent-actions", RecurrentAction))
+]
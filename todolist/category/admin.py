@@ -5,7 +5,14 @@ from django.contrib.admin import ModelAdmin
 from django.contrib.admin.decorators import register
 from django.utils.translation import ugettext_lazy as _
 
+from action.models import ActionRollup
 from category.models import Category
+from project.admin import rollup_column_factory
+
+
+def category_projects(obj):
+    """Prefetched projects of a category"""
+    return obj.project_set.all()
 
 
 @register(Category)
@@ -19,7 +26,9 @@ class CategoryAdmin(ModelAdmin):
 
     model = Category
     fields = ("name", "slug")
-    list_display = ("name", "project_names")
+    list_display = ("name", "project_names") + tuple(
+        rollup_column_factory(bucket, title, category_projects) for bucket, title in ActionRollup.BUCKETS
+    )
     prepopulated_fields = {"slug": ("name",)}
     search_fields = ("name",)
 
@@ -29,6 +38,10 @@ class CategoryAdmin(ModelAdmin):
         return ", ".join(s.name for s in obj.project_set.all())
     project_names.short_description = _("projects")
 
+    def get_queryset(self, request):
+        """Fetch the projects of the whole page, then their action counters, in a query each"""
+        return super().get_queryset(request).prefetch_related("project_set__rollup_set")
+
     def get_prepopulated_fields(self, request, obj=None):
         """Do not pre-populate fields on a simple view page"""
         if obj is not None:
@@ -0,0 +1,17 @@
+"""# Factories"""
+
+from factory import Sequence
+from factory.django import DjangoModelFactory
+
+from category.models import Category
+
+
+class CategoryFactory(DjangoModelFactory):
+    """Category with a unique name, its slug is set by the creation signal"""
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """CategoryFactory Meta class"""
+
+        model = Category
+
+    name = Sequence("category-{}".format)
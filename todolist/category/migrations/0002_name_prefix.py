@@ -0,0 +1,36 @@
+"""Case-insensitive prefix index of the category names, for the project autocomplete (name__istartswith)"""
+
+from django.db import migrations
+
+
+# SQLite LIKE ignores the ASCII case: its prefix optimization needs a NOCASE index. PostgreSQL compares
+# UPPER(name::text), text_pattern_ops answers LIKE prefixes whatever the collation.
+INDEXES = {
+    "sqlite": "CREATE INDEX category_category_name_prefix ON category_category (name COLLATE NOCASE)",
+    "postgresql":
+        "CREATE INDEX category_category_name_prefix ON category_category (UPPER(name::text) text_pattern_ops)",
+}
+
+
+def create_index(apps, schema_editor):  # pylint: disable=unused-argument
+    """Create the prefix index, when the database engine has one"""
+    statement = INDEXES.get(schema_editor.connection.vendor)
+    if statement is not None:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):  # pylint: disable=unused-argument
+    """Drop the prefix index"""
+    if schema_editor.connection.vendor in INDEXES:
+        schema_editor.execute("DROP INDEX IF EXISTS category_category_name_prefix")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,10 +1,10 @@
 """App signals module"""
 
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils.text import slugify
 
 from category.models import Category
+from todolist import changes, slugs
 
 
 #
@@ -20,5 +20,12 @@ def category_pre_created(sender, instance, raw, using, update_fields, **kwargs):
 
     # from nose.tools import set_trace; set_trace()
 
-    if not instance.slug:
-        instance.slug = slugify(instance.name)
+    slugs.assign_slugs([instance], lambda category: category.name, using)
+
+
+@receiver(post_save, sender=Category, dispatch_uid="category_name_saved")
+@receiver(post_delete, sender=Category, dispatch_uid="category_name_deleted")
+def category_name_changed(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Forget the cached name of the category, outdate what depends on the categories"""
+    slugs.forget(Category, instance.pk, using)
+    changes.touch(Category)
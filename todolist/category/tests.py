@@ -1 +1,34 @@
-"""TODO"""
+"""Category tests"""
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from category.models import Category
+from project.models import Project
+
+
+class ChangelistTestCase(TestCase):
+    """Query count of the category changelist"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "admin"))
+
+    def render(self):
+        """Query count of the category changelist"""
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get("/category/category/").status_code, 200)
+        return len(context)
+
+    def test_project_names(self):
+        """Projects of every category are fetched at once"""
+        for i in range(2):
+            category = Category.objects.create(name="small-{}".format(i))
+            Project.objects.create(category=category, name="small-{}".format(i))
+        small = self.render()
+        for i in range(20):
+            category = Category.objects.create(name="big-{}".format(i))
+            for j in range(3):
+                Project.objects.create(category=category, name="big-{}-{}".format(i, j))
+        self.assertEqual(self.render(), small)
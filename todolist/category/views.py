@@ -1 +1,7 @@
-"""TODO"""
+"""# Category views"""
+
+from category.models import Category
+from todolist.api import Resource
+
+
+CATEGORIES = Resource("categories", Category.objects.all(), fields=("id", "name", "slug"))
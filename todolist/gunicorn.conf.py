@@ -0,0 +1,39 @@
+"""
+# Gunicorn configuration
+
+    DJANGO_SECRET_KEY=... gunicorn -c gunicorn.conf.py todolist.wsgi
+
+Admin requests spend a good part of their time waiting for the database, so every worker process serves
+a few requests at once with threads (gthread), each thread keeping its own persistent database connection
+(CONN_MAX_AGE). Processes give CPU parallelism for template rendering, threads cover I/O waits without
+the memory cost of more processes. Every value can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+
+# Loaded by todolist.wsgi, whose default is the development profile like manage.py
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todolist.settings.production")
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")  # pylint: disable=invalid-name
+
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))  # pylint: disable=invalid-name
+
+worker_class = "gthread"  # pylint: disable=invalid-name
+
+threads = int(os.environ.get("GUNICORN_THREADS", 4))  # pylint: disable=invalid-name
+
+# Streaming exports of large tables can take a while
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))  # pylint: disable=invalid-name
+
+keepalive = 5  # pylint: disable=invalid-name
+
+# Recycle workers from time to time to bound memory growth, not all at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))  # pylint: disable=invalid-name
+max_requests_jitter = max_requests // 10  # pylint: disable=invalid-name
+
+# Import Django once in the master, workers are forked with it loaded (no database connection is open yet)
+preload_app = True  # pylint: disable=invalid-name
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")  # pylint: disable=invalid-name
@@ -6,7 +6,7 @@ import os
 import sys
 
 if __name__ == '__main__':
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings.development')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -3,8 +3,37 @@
 
 from django.contrib.admin import ModelAdmin
 from django.contrib.admin.decorators import register
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils.translation import ugettext_lazy as _
 
+from action.models import Action, ActionRollup
+from action.schedule import schedule_project
+from category.models import Category
 from project.models import Project
+from todolist.autocomplete import PrefixAutocompleteJsonView
+
+
+def rollup_column_factory(bucket, title, projects=lambda obj: (obj,)):
+    """
+    ## Action counter column factory
+
+    list_display column summing a bucket of the rollup counters of some projects (the object itself by default).
+    The rollup_set of the projects is expected to be prefetched.
+    """
+    def column(obj):
+        """Number of actions of the bucket"""
+        return sum(row.count for project in projects(obj) for row in project.rollup_set.all() if row.bucket == bucket)
+    column.short_description = title
+    column.__name__ = "{}_count".format(bucket)
+    return column
+
+
+ROLLUP_COLUMNS = tuple(rollup_column_factory(bucket, title) for bucket, title in ActionRollup.BUCKETS)
 
 
 @register(Project)
@@ -18,11 +47,79 @@ class ProjectAdmin(ModelAdmin):
 
     model = Project
     fields = ("category", "name", "slug")
-    list_display = ("name",)
+    list_display = ("name",) + ROLLUP_COLUMNS + ("schedule_link",)
     prepopulated_fields = {"slug": ("name",)}
     search_fields = ("category__name", "name")
     autocomplete_fields = ("category",)
 
+    def get_queryset(self, request):
+        """Fetch the action counters of the whole page in a single query"""
+        return super().get_queryset(request).prefetch_related("rollup_set")
+
+    autocomplete_models = (Project, Category)
+
+    def autocomplete_view(self, request):
+        """Cached prefix autocomplete of the project pickers, see todolist.autocomplete"""
+        return PrefixAutocompleteJsonView.as_view(model_admin=self)(request)
+
+    @staticmethod
+    def autocomplete_rows(term, offset, limit):
+        """(id, name) of the projects whose name, or category name, starts like the term"""
+        projects = Project.objects.order_by("name")
+        if term:  # A category subquery rather than a join, so that both sides of the OR use their prefix index
+            categories = Category.objects.filter(name__istartswith=term)
+            projects = projects.filter(Q(name__istartswith=term) | Q(category__in=categories))
+        return projects.values_list("pk", "name")[offset:offset + limit]
+
+    schedule_rows = 500  # Critical and late actions shown by the schedule view
+
+    @staticmethod
+    def schedule_link(obj):
+        """Link to the schedule of the project"""
+        url = reverse("admin:project_project_schedule", args=(obj.pk,))
+        return format_html('<a href="{}">{}</a>', url, _("Schedule"))
+    schedule_link.short_description = _("schedule")
+
+    def get_urls(self):
+        """Add the schedule view"""
+        return [
+            path(
+                "<path:object_id>/schedule/",
+                self.admin_site.admin_view(self.schedule_view),
+                name="project_project_schedule",
+            ),
+        ] + super().get_urls()
+
+    def schedule_view(self, request, object_id):
+        """Critical path and late actions of a project, see action.schedule"""
+        project = get_object_or_404(self.get_queryset(request), pk=object_id)
+        if not self.has_view_permission(request, project):
+            raise PermissionDenied
+        using = project._state.db  # pylint: disable=protected-access
+        try:
+            schedule, error = schedule_project(project.pk, using=using), None
+        except ValueError as cycle:
+            schedule, error = None, str(cycle)
+
+        rows = []
+        if schedule is not None:
+            critical = schedule.critical_path()
+            rows = (critical + [row for row in schedule.late() if not row.critical])[:self.schedule_rows]
+            actions = Action.objects.db_manager(using).non_polymorphic()
+            names = dict(actions.filter(pk__in=[row.id for row in rows]).values_list("pk", "name"))
+            rows = [(row, names[row.id]) for row in rows]
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,  # pylint: disable=protected-access
+            original=project,
+            title=_("Schedule of %(project)s") % {"project": project},
+            schedule=schedule,
+            error=error,
+            rows=rows,
+        )
+        return TemplateResponse(request, "admin/project/project/schedule.html", context)
+
     def get_prepopulated_fields(self, request, obj=None):
         """Do not pre-populate fields on a simple view page"""
         if obj is not None:
@@ -0,0 +1,19 @@
+"""# Factories"""
+
+from factory import Sequence, SubFactory
+from factory.django import DjangoModelFactory
+
+from category.factories import CategoryFactory
+from project.models import Project
+
+
+class ProjectFactory(DjangoModelFactory):
+    """Project with a unique (short, so that action slugs stay short) name"""
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """ProjectFactory Meta class"""
+
+        model = Project
+
+    category = SubFactory(CategoryFactory)
+    name = Sequence("p{}".format)
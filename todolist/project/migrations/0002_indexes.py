@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='category',
+            field=models.ForeignKey(blank=True, db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='project_set', to='category.Category', verbose_name='category'),
+        ),
+    ]
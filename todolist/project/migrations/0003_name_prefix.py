@@ -0,0 +1,35 @@
+"""Case-insensitive prefix index of the project names, for the autocomplete (name__istartswith)"""
+
+from django.db import migrations
+
+
+# SQLite LIKE ignores the ASCII case: its prefix optimization needs a NOCASE index. PostgreSQL compares
+# UPPER(name::text), text_pattern_ops answers LIKE prefixes whatever the collation.
+INDEXES = {
+    "sqlite": "CREATE INDEX project_project_name_prefix ON project_project (name COLLATE NOCASE)",
+    "postgresql": "CREATE INDEX project_project_name_prefix ON project_project (UPPER(name::text) text_pattern_ops)",
+}
+
+
+def create_index(apps, schema_editor):  # pylint: disable=unused-argument
+    """Create the prefix index, when the database engine has one"""
+    statement = INDEXES.get(schema_editor.connection.vendor)
+    if statement is not None:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):  # pylint: disable=unused-argument
+    """Drop the prefix index"""
+    if schema_editor.connection.vendor in INDEXES:
+        schema_editor.execute("DROP INDEX IF EXISTS project_project_name_prefix")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -24,7 +24,7 @@ class Project(Model):
         related_name="project_set",
         to=Category,
         blank=True,
-        db_index=True,
+        db_index=False,
         on_delete=PROTECT,
     )
 
@@ -1,10 +1,10 @@
 """App signals module"""
 
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils.text import slugify
 
 from project.models import Project
+from todolist import changes, slugs
 
 
 #
@@ -21,4 +21,13 @@ def project_pre_created(sender, instance, raw, using, update_fields, **kwargs):
     # from nose.tools import set_trace; set_trace()
 
     if not instance.slug:
-        instance.slug = slugify(instance.category.name + "__" + instance.name)
+        category_name = slugs.related_name(instance, "category", using)
+        slugs.assign_slugs([instance], lambda project: category_name + "__" + project.name, using)
+
+
+@receiver(post_save, sender=Project, dispatch_uid="project_name_saved")
+@receiver(post_delete, sender=Project, dispatch_uid="project_name_deleted")
+def project_name_changed(sender, instance, using, **kwargs):  # pylint: disable=unused-argument
+    """Forget the cached name of the project, outdate what depends on the projects"""
+    slugs.forget(Project, instance.pk, using)
+    changes.touch(Project)
@@ -1 +1,13 @@
-"""TODO"""
+"""# Project views"""
+
+from category.models import Category
+from project.models import Project
+from todolist.api import Resource
+
+
+PROJECTS = Resource(
+    "projects",
+    Project.objects.all(),
+    fields=("id", "category", "name", "slug"),
+    models=(Project, Category),
+)
@@ -0,0 +1,151 @@
+"""
+# Read-only JSON API
+
+Every resource has a list (/api/<name>/) and a detail (/api/<name>/<id>/) view, for staff members:
+
+* ?fields=name,slug selects the fields (id is always given),
+* ?include=notes,logs adds related rows, fetched with one query per include for the whole page,
+* lists are ordered by id and paginated by cursor: ?limit= rows (100, at most 1000) after ?cursor=,
+  the response gives the URL of the next page,
+* responses have an ETag made of the versions of the models they are read from (see todolist.changes) and
+  a Last-Modified of their latest change: conditional requests get a 304 from the cache, without reading the
+  application tables (the session and the user are still loaded, to check the staff status).
+
+Rows are read as dicts, models are never instantiated.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.urls import path
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from todolist import changes
+
+
+PAGE_SIZE = 100
+
+MAX_PAGE_SIZE = 1000
+
+
+class ApiError(Exception):
+    """Invalid request parameter, answered with a 400"""
+
+
+def encode_cursor(pk):
+    """Query string token of the position after a row"""
+    return urlsafe_b64encode(str(pk).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Row id of a query string token"""
+    try:
+        return int(urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (Base64Error, ValueError):
+        raise ApiError("Invalid cursor")
+
+
+def names(request, parameter, allowed):
+    """Comma separated names of a query string parameter, all of them allowed"""
+    selected = [name for name in request.GET.get(parameter, "").split(",") if name]
+    unknown = set(selected) - set(allowed)
+    if unknown:
+        raise ApiError("Unknown {}: {}".format(parameter, ", ".join(sorted(unknown))))
+    return selected
+
+
+class Resource:
+    """
+    ## Read-only resource
+
+    * fields: names given to values(), foreign keys giving the id of the related row,
+    * computed: {name: (source field, function of its value)},
+    * includes: {name: function of a list of ids returning {id: related rows}},
+    * models: every model the rows are read from, their changes outdate the responses.
+    """
+
+    def __init__(self, name, queryset, fields, computed=None, includes=None, models=None):
+        self.name = name
+        self.queryset = queryset
+        self.fields = tuple(fields)
+        self.computed = computed or {}
+        self.includes = includes or {}
+        self.models = tuple(models or (queryset.model,))
+
+    def rows(self, request, queryset):
+        """Serializable rows of a queryset, with the selected fields and includes"""
+        fields = names(request, "fields", self.fields + tuple(self.computed)) or self.fields + tuple(self.computed)
+        includes = names(request, "include", self.includes)
+        sources = ["id"] + [name for name in fields if name in self.fields and name != "id"]
+        sources += [self.computed[name][0] for name in fields if name in self.computed]
+
+        rows = list(queryset.values(*sources))
+        for row in rows:
+            for name in fields:
+                if name in self.computed:
+                    source, function = self.computed[name]
+                    row[name] = function(row[source])
+            for source in set(row) - set(fields) - {"id"}:
+                del row[source]
+        ids = [row["id"] for row in rows]
+        for name in includes:
+            related = self.includes[name](ids) if ids else {}
+            for row in rows:
+                row[name] = related.get(row["id"], [])
+        return rows
+
+    def list(self, request):
+        """Page of rows after the cursor"""
+        try:
+            limit = max(1, min(int(request.GET.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE))
+        except ValueError:
+            raise ApiError("Invalid limit")
+        queryset = self.queryset.order_by("pk")
+        if request.GET.get("cursor"):
+            queryset = queryset.filter(pk__gt=decode_cursor(request.GET["cursor"]))
+
+        rows = self.rows(request, queryset[:limit + 1])
+        following = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            parameters = request.GET.copy()
+            parameters["cursor"] = encode_cursor(rows[-1]["id"])
+            following = request.build_absolute_uri("?" + parameters.urlencode())
+        return JsonResponse({"results": rows, "next": following})
+
+    def detail(self, request, pk):
+        """A single row"""
+        rows = self.rows(request, self.queryset.filter(pk=pk))
+        if not rows:
+            return JsonResponse({"error": "Not found"}, status=404)
+        return JsonResponse(rows[0])
+
+    def view(self, method):
+        """Staff only, conditional, read-only view of a method"""
+        def etag(request, *args, **kwargs):  # pylint: disable=unused-argument
+            return changes.signature(self.models, request.get_full_path())
+
+        def last_modified(request, *args, **kwargs):  # pylint: disable=unused-argument
+            return changes.last_modified(self.models)
+
+        @staff_member_required
+        @require_safe
+        @condition(etag_func=etag, last_modified_func=last_modified)
+        def resource_view(request, *args, **kwargs):
+            try:
+                response = method(request, *args, **kwargs)
+            except ApiError as error:
+                response = JsonResponse({"error": str(error)}, status=400)
+            patch_cache_control(response, private=True, no_cache=True)  # Stored, but revalidated
+            return response
+        return resource_view
+
+    def urls(self):
+        """URL patterns of the list and detail views"""
+        return [
+            path("{}/".format(self.name), self.view(self.list), name="{}-list".format(self.name)),
+            path("{}/<int:pk>/".format(self.name), self.view(self.detail), name="{}-detail".format(self.name)),
+        ]
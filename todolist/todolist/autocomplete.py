@@ -0,0 +1,57 @@
+"""
+# Autocomplete
+
+The admin autocomplete view (select2 pickers) runs the admin search, e.g. icontains over several joined columns,
+then builds every matching object, on every keystroke. Pickers of large tables use this view instead:
+
+* the admin gives an indexed prefix search returning (pk, text) rows, see autocomplete_rows,
+* responses are small ({"results": [{"id", "text"}], "pagination": {"more"}}, what select2 reads) and cached
+  per model, term and page for AUTOCOMPLETE_CACHE_TIMEOUT seconds (300),
+* the cached responses are keyed by the versions of the model and of the models its texts depend on
+  (autocomplete_models of the model admin), they are outdated as soon as one of them changes, see todolist.changes.
+"""
+
+from django.conf import settings
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from todolist import changes
+
+
+PAGE_SIZE = 20
+
+
+class PrefixAutocompleteJsonView(AutocompleteJsonView):
+    """
+    ## Cached prefix autocomplete
+
+    The model admin must have an autocomplete_rows(term, offset, limit) method returning (pk, text) rows,
+    and may list the models the rows depend on in autocomplete_models (the model itself by default).
+    """
+
+    def get(self, request, *args, **kwargs):
+        """Matching (id, text) of a page, from the cache when possible"""
+        if not self.has_perm(request):
+            return JsonResponse({"error": "403 Forbidden"}, status=403)
+
+        term = " ".join(request.GET.get("term", "").lower().split())
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+
+        model = self.model_admin.model
+        models = getattr(self.model_admin, "autocomplete_models", (model,))
+        key = "autocomplete:{}:{}".format(
+            model._meta.label_lower, changes.signature(models, page, term)  # pylint: disable=protected-access
+        )
+        payload = cache.get(key)
+        if payload is None:
+            rows = list(self.model_admin.autocomplete_rows(term, (page - 1) * PAGE_SIZE, PAGE_SIZE + 1))
+            payload = {
+                "results": [{"id": str(pk), "text": str(text)} for pk, text in rows[:PAGE_SIZE]],
+                "pagination": {"more": len(rows) > PAGE_SIZE},
+            }
+            cache.set(key, payload, getattr(settings, "AUTOCOMPLETE_CACHE_TIMEOUT", 300))
+        return JsonResponse(payload)
@@ -0,0 +1,60 @@
+"""
+# Change tracking
+
+Signals (and bulk writers) touch a model whenever one of its rows is saved or deleted: its version number is
+incremented and its change time recorded, in the cache. Anything derived from some models can then be validated
+without a query: cached responses are keyed by the versions of their models, HTTP responses get an ETag made of
+them and a Last-Modified of the latest change time.
+
+Versions start from the current time in milliseconds, so that they do not repeat after a cache eviction.
+The cache has to be shared by the processes (memcached, files...), as the other cached data of the site.
+"""
+
+from hashlib import md5
+from time import time
+
+from django.core.cache import cache
+from django.utils.timezone import now
+
+
+def version_key(model):
+    """Cache key of the version of a model"""
+    return "changes:{}".format(model._meta.label_lower)  # pylint: disable=protected-access
+
+
+def time_key(model):
+    """Cache key of the last change time of a model"""
+    return version_key(model) + ":at"
+
+
+def touch(*models):
+    """Record that some rows of the models changed"""
+    for model in models:
+        try:
+            cache.incr(version_key(model))
+        except ValueError:  # Not cached yet (or evicted)
+            cache.set(version_key(model), int(time() * 1000), None)
+        cache.set(time_key(model), now(), None)
+
+
+def state(models):
+    """[(version, last change time)] of the models, started (touched) when unknown"""
+    keys = [key for model in models for key in (version_key(model), time_key(model))]
+    values = cache.get_many(keys)
+    missing = [model for model in models if version_key(model) not in values or time_key(model) not in values]
+    if missing:
+        touch(*missing)
+        values = cache.get_many(keys)
+    return [(values.get(version_key(model)), values.get(time_key(model))) for model in models]
+
+
+def signature(models, *parts):
+    """Digest of the versions of the models and of some other values, changing whenever one of the models does"""
+    versions = [version for version, _ in state(models)]
+    return md5(repr((versions, parts)).encode()).hexdigest()
+
+
+def last_modified(models):
+    """Latest change time of the models"""
+    times = [changed for _, changed in state(models) if changed is not None]
+    return max(times) if times else None
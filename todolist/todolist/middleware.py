@@ -0,0 +1,126 @@
+"""
+# Request instrumentation
+
+Lightweight replacement of the debug toolbar figures, meant to stay on in production:
+for a sample of the requests, every SQL statement goes through a `connection.execute_wrapper` hook that
+only counts it and adds up its duration. Once the response is built, the request is reported:
+
+* as a `Server-Timing` header (db and view durations), readable in the browser developer tools,
+* as a JSON log line on the `todolist.instrumentation` logger, at WARNING level when a threshold is crossed.
+
+Statements are grouped by fingerprint (their SQL with placeholders, IN lists collapsed), so that the same
+query issued for each row of a page (N+1) is reported with its number of executions.
+
+Settings (all optional):
+
+* INSTRUMENTATION_SAMPLE_RATE: share of the requests that are instrumented, from 0 to 1 (1),
+* INSTRUMENTATION_SERVER_TIMING: add the Server-Timing header (True),
+* INSTRUMENTATION_SLOW_MS: view duration (ms) above which the request is logged as a warning (500),
+* INSTRUMENTATION_MAX_QUERIES: query count above which the request is logged as a warning (50),
+* INSTRUMENTATION_DUPLICATES: executions of a fingerprint from which it is reported as duplicated (5).
+"""
+
+import json
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+from hashlib import md5
+from random import random
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("todolist.instrumentation")  # pylint: disable=invalid-name
+
+IN_LIST = re.compile(r"IN \((?:%s, )+%s\)")
+
+
+def fingerprint(sql):
+    """SQL of a statement with IN lists collapsed, and its short hash"""
+    sql = IN_LIST.sub("IN (%s, ...)", sql)
+    return md5(sql.encode()).hexdigest()[:8], sql
+
+
+class QueryRecorder:
+    """execute_wrapper hook counting statements by SQL and adding up their durations"""
+
+    def __init__(self):
+        self.statements = Counter()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.statements[sql] += 1
+
+    @property
+    def count(self):
+        """Number of executed statements"""
+        return sum(self.statements.values())
+
+    def duplicates(self, threshold):
+        """[(hash, executions, sql)] of the fingerprints executed at least threshold times, most executed first"""
+        grouped = Counter()
+        for sql, executions in self.statements.items():
+            grouped[fingerprint(sql)] += executions
+        return [
+            (digest, executions, sql)
+            for (digest, sql), executions in grouped.most_common()
+            if executions >= threshold
+        ]
+
+
+class InstrumentationMiddleware:
+    """Report the query count, DB time, duplicated queries and view time of a sample of the requests"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 1.0)
+        self.server_timing = getattr(settings, "INSTRUMENTATION_SERVER_TIMING", True)
+        self.slow_ms = getattr(settings, "INSTRUMENTATION_SLOW_MS", 500)
+        self.max_queries = getattr(settings, "INSTRUMENTATION_MAX_QUERIES", 50)
+        self.duplicate_threshold = getattr(settings, "INSTRUMENTATION_DUPLICATES", 5)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            start = perf_counter()
+            response = self.get_response(request)
+            view_ms = (perf_counter() - start) * 1000
+
+        db_ms = recorder.duration * 1000
+        count = recorder.count
+        if self.server_timing:
+            response["Server-Timing"] = 'db;dur={:.1f};desc="{} queries", view;dur={:.1f}'.format(db_ms, count, view_ms)
+        self.report(request, response, count, db_ms, view_ms, recorder.duplicates(self.duplicate_threshold))
+        return response
+
+    def report(self, request, response, count, db_ms, view_ms, duplicates):  # pylint: disable=too-many-arguments
+        """Log a request, as a warning if it crossed a threshold"""
+        warning = view_ms > self.slow_ms or count > self.max_queries or bool(duplicates)
+        level = logging.WARNING if warning else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(level, json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": count,
+            "db_ms": round(db_ms, 1),
+            "view_ms": round(view_ms, 1),
+            "duplicates": [
+                {"fingerprint": digest, "executions": executions, "sql": sql[:200]}
+                for digest, executions, sql in duplicates
+            ],
+        }))
@@ -0,0 +1,8 @@
+"""
+## Settings profiles
+
+* todolist.settings.development: debug toolbar, SQLite, secret key generated in secret.key (manage.py default),
+* todolist.settings.production: configured from the environment, see the module.
+
+Both extend todolist.settings.base.
+"""
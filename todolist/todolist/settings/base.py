@@ -1,5 +1,5 @@
 """
-## Django settings for todolist project.
+## Django settings for todolist project, common to every profile.
 
 Generated by 'django-admin startproject' using Django 2.1.5.
 
@@ -11,45 +11,18 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
-from random import SystemRandom
-from string import ascii_letters, digits, punctuation
 
 from django.utils.translation import ugettext_lazy as _
 
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
-
-
-# Make Django secret key secure
-def generate_secret_key():
-    """Generate secure secret key that is not visible in a versioned file"""
-    chars = "".join([ascii_letters, digits, punctuation]).replace("'", "").replace('"', "").replace("\\", "")
-    return "".join([SystemRandom().choice(chars) for _ in range(50)])
-
-
-#
-# Manage secret key auto generation
-#
-
-if not os.path.exists("secret.key"):
-    SECRET_KEY = generate_secret_key()
-    with open("secret.key", "w") as f:
-        f.write(SECRET_KEY)
-else:
-    with open("secret.key") as f:
-        SECRET_KEY = f.read()
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = False
 
 ALLOWED_HOSTS = []
-INTERNAL_IPS = ['127.0.0.1']
 
 
 # Application definition
@@ -68,13 +41,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    # Temporary
-    "debug_toolbar",
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'todolist.middleware.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -154,3 +125,33 @@ DEFAULT_LANGUAGE = 1
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Request instrumentation (see todolist.middleware), off unless a profile samples requests
+
+INSTRUMENTATION_SAMPLE_RATE = 0.0
+INSTRUMENTATION_SERVER_TIMING = True
+INSTRUMENTATION_SLOW_MS = 500
+INSTRUMENTATION_MAX_QUERIES = 50
+INSTRUMENTATION_DUPLICATES = 5
+
+
+# Event reminders (see action.reminders): the web processes notify the worker through this socket,
+# unless the database is PostgreSQL (LISTEN / NOTIFY)
+
+REMINDER_SOCKET_PATH = os.path.join(BASE_DIR, "reminders.sock")
+
+
+# Logging
+# https://docs.djangoproject.com/en/2.1/topics/logging/
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "todolist.instrumentation": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
@@ -0,0 +1,47 @@
+"""
+## Development settings
+
+Quick-start development settings - unsuitable for production
+See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
+"""
+
+import os
+from random import SystemRandom
+from string import ascii_letters, digits, punctuation
+
+from todolist.settings.base import *  # pylint: disable=wildcard-import,unused-wildcard-import
+
+
+# Make Django secret key secure
+def generate_secret_key():
+    """Generate secure secret key that is not visible in a versioned file"""
+    chars = "".join([ascii_letters, digits, punctuation]).replace("'", "").replace('"', "").replace("\\", "")
+    return "".join([SystemRandom().choice(chars) for _ in range(50)])
+
+
+#
+# Manage secret key auto generation, next to manage.py whatever the current directory
+#
+
+SECRET_KEY_PATH = os.path.join(BASE_DIR, "secret.key")
+
+if not os.path.exists(SECRET_KEY_PATH):
+    SECRET_KEY = generate_secret_key()
+    with open(SECRET_KEY_PATH, "w") as f:
+        f.write(SECRET_KEY)
+else:
+    with open(SECRET_KEY_PATH) as f:
+        SECRET_KEY = f.read()
+
+
+DEBUG = True
+
+INTERNAL_IPS = ['127.0.0.1']
+
+INSTALLED_APPS += [
+    # Temporary
+    "debug_toolbar",
+]
+
+MIDDLEWARE.insert(MIDDLEWARE.index('todolist.middleware.InstrumentationMiddleware') + 1,
+                  'debug_toolbar.middleware.DebugToolbarMiddleware')
@@ -0,0 +1,121 @@
+"""
+## Production settings
+
+Every deployment specific value comes from the environment:
+
+* DJANGO_SECRET_KEY (required),
+* DJANGO_ALLOWED_HOSTS: comma separated host names,
+* DJANGO_DB_ENGINE: sqlite (default) or postgresql,
+* DJANGO_DB_NAME, DJANGO_DB_USER, DJANGO_DB_PASSWORD, DJANGO_DB_HOST, DJANGO_DB_PORT,
+* DJANGO_CONN_MAX_AGE: seconds a database connection is kept open between requests (600),
+* DJANGO_MEMCACHED_LOCATION: comma separated memcached addresses, without it the cache is a file cache
+  in DJANGO_CACHE_DIR, shared by the workers of the node,
+* DJANGO_STATIC_ROOT: collectstatic target directory,
+* DJANGO_REMINDER_SOCKET_PATH: socket of the reminder worker, which runs on the node of the web processes
+  unless the database is PostgreSQL,
+* DJANGO_INSTRUMENTATION_SAMPLE_RATE: share of the requests instrumented by todolist.middleware (0.1).
+
+Serve with gunicorn and gunicorn.conf.py, which select these settings (todolist.wsgi defaults to development).
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from todolist.settings.base import *  # pylint: disable=wildcard-import,unused-wildcard-import
+
+
+def env_list(name):
+    """Comma separated list from an environment variable"""
+    return [item.strip() for item in os.environ.get(name, "").split(",") if item.strip()]
+
+
+try:
+    SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+except KeyError:
+    raise ImproperlyConfigured("The DJANGO_SECRET_KEY environment variable is required")
+
+DEBUG = False
+
+ALLOWED_HOSTS = env_list("DJANGO_ALLOWED_HOSTS")
+
+
+# Database: persistent connections, one per worker thread
+
+if os.environ.get("DJANGO_DB_ENGINE", "sqlite") == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DJANGO_DB_NAME", "todolist"),
+            "USER": os.environ.get("DJANGO_DB_USER", ""),
+            "PASSWORD": os.environ.get("DJANGO_DB_PASSWORD", ""),
+            "HOST": os.environ.get("DJANGO_DB_HOST", ""),
+            "PORT": os.environ.get("DJANGO_DB_PORT", ""),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DJANGO_DB_NAME", os.path.join(BASE_DIR, "db.sqlite3")),
+        }
+    }
+
+DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DJANGO_CONN_MAX_AGE", 600))
+
+
+# Templates: compiled once per process
+
+TEMPLATES = [dict(
+    TEMPLATES[0],
+    APP_DIRS=False,
+    OPTIONS=dict(
+        TEMPLATES[0]["OPTIONS"],
+        context_processors=[
+            processor for processor in TEMPLATES[0]["OPTIONS"]["context_processors"]
+            if processor != "django.template.context_processors.debug"
+        ],
+        loaders=[(
+            "django.template.loaders.cached.Loader", [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ]
+        )],
+    ),
+)]
+
+
+# Cache, shared by the workers so that invalidations (used dates, ...) reach every process
+
+if env_list("DJANGO_MEMCACHED_LOCATION"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+            "LOCATION": env_list("DJANGO_MEMCACHED_LOCATION"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("DJANGO_CACHE_DIR", os.path.join(BASE_DIR, "cache")),
+        }
+    }
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+
+# Reminder worker notifications (see action.reminders)
+
+REMINDER_SOCKET_PATH = os.environ.get("DJANGO_REMINDER_SOCKET_PATH", REMINDER_SOCKET_PATH)
+
+
+# Static files
+
+STATIC_ROOT = os.environ.get("DJANGO_STATIC_ROOT", os.path.join(BASE_DIR, "static"))
+
+
+# Request instrumentation (see todolist.middleware)
+
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get("DJANGO_INSTRUMENTATION_SAMPLE_RATE", 0.1))
+INSTRUMENTATION_SERVER_TIMING = False
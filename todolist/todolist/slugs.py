@@ -0,0 +1,156 @@
+"""
+# Slug service
+
+Categories, projects and actions get slugs built from names: an action slug starts with the name of its project,
+a project slug with the name of its category. This module:
+
+* keeps the names of the projects and categories in a process wide LRU cache (SLUG_NAME_CACHE_SIZE names, 1024),
+  so that saving an object knowing only its project_id or category_id does not fetch the related object,
+  the names are cached with the change version of their model (see todolist.changes, read from the shared cache),
+  so that a project or category saved or deleted by any process outdates the names cached by every process,
+* makes slugs unique: the slugs starting like the wanted ones are fetched in a single query for a whole batch,
+  then taken slugs get a "-2", "-3"... suffix, within the max length of the field.
+
+Two processes creating the same slug at the same time can still collide on the unique constraint.
+"""
+
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+from threading import Lock
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils.text import slugify
+
+from todolist import changes
+
+
+SUFFIX_LENGTH = 4  # Room kept for "-2" to "-999" by the prefix query
+
+QUERY_BATCH_SIZE = 500  # Prefixes per query, below the SQLite parameter limit
+
+
+class NameCache:
+    """
+    ## Least recently used names
+
+    Thread safe, workers may serve requests from several threads.
+    """
+
+    def __init__(self):
+        self.names = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key, version):
+        """Cached name, None when unknown or cached with another version"""
+        with self.lock:
+            cached_version, name = self.names.get(key, (None, None))
+            if cached_version != version:
+                return None
+            self.names.move_to_end(key)
+            return name
+
+    def set(self, key, version, name):
+        """Cache a name, dropping the least recently used ones beyond the size"""
+        with self.lock:
+            self.names[key] = (version, name)
+            self.names.move_to_end(key)
+            while len(self.names) > getattr(settings, "SLUG_NAME_CACHE_SIZE", 1024):
+                self.names.popitem(last=False)
+
+    def forget(self, key):
+        """Drop a cached name"""
+        with self.lock:
+            self.names.pop(key, None)
+
+    def clear(self):
+        """Drop every cached name"""
+        with self.lock:
+            self.names.clear()
+
+
+NAMES = NameCache()
+
+
+def name_key(model, pk, using):
+    """Cache key of the name of an object"""
+    return (using, model._meta.label_lower, pk)  # pylint: disable=protected-access
+
+
+def name_version(model):
+    """Shared change version of a model, names cached with another one are outdated"""
+    return changes.state([model])[0][0]
+
+
+def name_of(model, pk, using=DEFAULT_DB_ALIAS):
+    """Name of an object, fetched only when not cached"""
+    key, version = name_key(model, pk, using), name_version(model)  # Version first, a later change outdates the name
+    name = NAMES.get(key, version)
+    if name is None:
+        name = model._base_manager.using(using).values_list("name", flat=True).get(pk=pk)
+        NAMES.set(key, version, name)
+    return name
+
+
+def related_name(instance, field_name, using=DEFAULT_DB_ALIAS):
+    """Name of the object a foreign key points to, from the instance when it holds it, else from the cache"""
+    field = instance._meta.get_field(field_name)  # pylint: disable=protected-access
+    if field.is_cached(instance):
+        related = getattr(instance, field_name)
+        NAMES.set(name_key(field.related_model, related.pk, using), name_version(field.related_model), related.name)
+        return related.name
+    return name_of(field.related_model, getattr(instance, field.attname), using)
+
+
+def forget(model, pk, using=DEFAULT_DB_ALIAS):
+    """Forget the cached name of a saved or deleted object, right away in this process"""
+    NAMES.forget(name_key(model, pk, using))
+
+
+def taken_slugs(model, prefixes, using=DEFAULT_DB_ALIAS):
+    """Stored slugs starting with one of the prefixes, a query per QUERY_BATCH_SIZE prefixes"""
+    kept = []
+    for prefix in sorted(set(prefixes)):  # "a-b" covers "a-bc", which comes right after it
+        if not kept or not prefix.startswith(kept[-1]):
+            kept.append(prefix)
+    taken = set()
+    queryset = model._base_manager.using(using)  # pylint: disable=protected-access
+    for start in range(0, len(kept), QUERY_BATCH_SIZE):
+        condition = reduce(or_, (Q(slug__startswith=prefix) for prefix in kept[start:start + QUERY_BATCH_SIZE]))
+        taken.update(queryset.filter(condition).values_list("slug", flat=True))
+    return taken
+
+
+def unique_slugs(model, texts, using=DEFAULT_DB_ALIAS, taken=()):
+    """Slugs of the texts, unique among the stored slugs of the model, the taken ones and each other"""
+    max_length = model._meta.get_field("slug").max_length  # pylint: disable=protected-access
+    bases = [slugify(text)[:max_length] for text in texts]
+    used = set(taken) | taken_slugs(model, (base[:max_length - SUFFIX_LENGTH] for base in bases), using)
+    queryset = model._base_manager.using(using)  # pylint: disable=protected-access
+
+    slugs = []
+    for base in bases:
+        slug, number = base, 1
+        while slug in used:
+            number += 1
+            suffix = "-{}".format(number)
+            slug = base[:max_length - len(suffix)] + suffix
+            if len(suffix) > SUFFIX_LENGTH and queryset.filter(slug=slug).exists():  # Beyond the fetched prefix
+                used.add(slug)
+        used.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def assign_slugs(instances, text, using=DEFAULT_DB_ALIAS):
+    """Give a unique slug, built from text(instance), to the instances that have none"""
+    instances = list(instances)
+    missing = [instance for instance in instances if not instance.slug]
+    if not missing:
+        return
+    model = missing[0]._meta.get_field("slug").model  # pylint: disable=protected-access
+    taken = {instance.slug for instance in instances if instance.slug}
+    for instance, slug in zip(missing, unique_slugs(model, [text(instance) for instance in missing], using, taken)):
+        instance.slug = slug
@@ -0,0 +1,120 @@
+"""Project tests"""
+
+import json
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from action.models import Action
+from category.models import Category
+from project.models import Project
+from todolist import changes, slugs
+from todolist.middleware import InstrumentationMiddleware, fingerprint
+
+
+def n_plus_one_view(request):  # pylint: disable=unused-argument
+    """View fetching the categories one by one"""
+    for pk in Category.objects.values_list("pk", flat=True):
+        Category.objects.get(pk=pk)
+    return HttpResponse("ok")
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0)
+class InstrumentationTestCase(TestCase):
+    """Request instrumentation middleware"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(6):
+            Category.objects.create(name="category-{}".format(i))
+
+    def call(self):
+        """Response of the N+1 view through the middleware, and the logged records"""
+        with self.assertLogs("todolist.instrumentation", "INFO") as logs:
+            response = InstrumentationMiddleware(n_plus_one_view)(RequestFactory().get("/categories/"))
+        return response, logs.records
+
+    def test_fingerprint(self):
+        """IN lists of any length share a fingerprint"""
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM "t" WHERE "id" IN (%s, %s)'),
+            fingerprint('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s, %s)'),
+        )
+
+    def test_server_timing(self):
+        """Query count and durations are sent as a Server-Timing header"""
+        header = self.call()[0]["Server-Timing"]
+        self.assertRegex(header, r'^db;dur=\d+\.\d;desc="7 queries", view;dur=\d+\.\d$')
+
+    def test_duplicates(self):
+        """Repeated queries are logged as a warning, with their fingerprint"""
+        records = self.call()[1]
+        self.assertEqual(records[0].levelname, "WARNING")
+        record = json.loads(records[0].getMessage())
+        self.assertEqual((record["path"], record["status"], record["queries"]), ("/categories/", 200, 7))
+        self.assertEqual(len(record["duplicates"]), 1)
+        self.assertEqual(record["duplicates"][0]["executions"], 6)
+        self.assertIn('FROM "category_category"', record["duplicates"][0]["sql"])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0.0)
+    def test_sampling(self):
+        """Requests out of the sample are not instrumented"""
+        response = InstrumentationMiddleware(n_plus_one_view)(RequestFactory().get("/categories/"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class SlugTestCase(TestCase):
+    """Slug service"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="category")
+        cls.project = Project.objects.create(category=cls.category, name="project")
+
+    def setUp(self):
+        slugs.NAMES.clear()
+
+    def create(self, label):
+        """Action created knowing only the id of its project"""
+        return Action.objects.create(project_id=self.project.pk, label=label, description="d")
+
+    def test_cached_names(self):
+        """Project names are fetched once, and again after a save"""
+        self.create("first")
+        with CaptureQueriesContext(connection) as context:
+            self.create("second")
+        self.assertFalse([query for query in context if '"project_project"' in query["sql"]])
+        self.assertEqual(Action.objects.get(slug="project__second").name, "⇅ project – second")
+
+        Project.objects.filter(pk=self.project.pk).update(name="renamed")
+        Project.objects.get(pk=self.project.pk).save()
+        self.assertEqual(self.create("third").name, "⇅ renamed – third")
+
+    def test_other_process(self):
+        """Names saved by another process are outdated by the shared change version"""
+        self.create("first")
+        Project.objects.filter(pk=self.project.pk).update(name="renamed")  # The other process saves the project,
+        changes.touch(Project)  # its signals touch the shared version, but cannot forget the names of this process
+        self.assertEqual(self.create("second").name, "⇅ renamed – second")
+
+    def test_collisions(self):
+        """Taken slugs get a suffix, within the max length"""
+        self.assertEqual(
+            [self.create("same").slug for _ in range(3)], ["project__same", "project__same-2", "project__same-3"]
+        )
+        long_label = "x" * 40
+        self.assertEqual(
+            [self.create(long_label).slug for _ in range(2)],
+            ["project__" + "x" * 23, "project__" + "x" * 21 + "-2"],
+        )
+        self.assertEqual(Category.objects.create(name="Category!").slug, "category-2")
+
+    def test_batch(self):
+        """A batch of slugs takes a single query, and its slugs are unique"""
+        self.create("a")
+        with CaptureQueriesContext(connection) as context:
+            result = slugs.unique_slugs(Action, ["project__a", "project__a", "project__ab", "project__b"])
+        self.assertEqual(len(context), 1)
+        self.assertEqual(result, ["project__a-2", "project__a-3", "project__ab", "project__b"])
@@ -5,15 +5,22 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
-if settings.DEBUG:
+from action.views import ACTION_RESOURCES, transition
+from category.views import CATEGORIES
+from project.views import PROJECTS
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
     import debug_toolbar
 
 
 urlpatterns = [  # pylint: disable=invalid-name
     path('i18n/', include('django.conf.urls.i18n')),
+    path('export/', include('action.urls')),
+    path('api/actions/transition/', transition, name='transition'),
+    path('api/', include([url for resource in [CATEGORIES, PROJECTS] + ACTION_RESOURCES for url in resource.urls()])),
     path('', admin.site.urls),
 ]
 
 
-if settings.DEBUG:
+if "debug_toolbar" in settings.INSTALLED_APPS:
     urlpatterns = [path('__debug__/', include(debug_toolbar.urls))] + urlpatterns  # pylint: disable=invalid-name
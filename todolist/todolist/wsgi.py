@@ -11,6 +11,6 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings.development')
 
 application = get_wsgi_application()  # pylint: disable=invalid-name